@@ -0,0 +1,53 @@
+# benchmarks/bench_cleaner.py
+"""
+Throughput of the compiled cleaner vs the legacy multi-pass cleaner.
+
+Usage: python benchmarks/bench_cleaner.py [--rows 100000]
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE)
+
+from finsort.cleaner import clean_transaction, clean_transaction_legacy
+
+DATASET = os.path.join(BASE, "data", "finsort_dataset.csv")
+
+
+def load_corpus(rows):
+    with open(DATASET, "r", encoding="utf-8", newline="") as f:
+        texts = [r["transaction"] for r in csv.DictReader(f)]
+    reps = rows // len(texts) + 1
+    return (texts * reps)[:rows]
+
+
+def rows_per_sec(fn, texts):
+    start = time.perf_counter()
+    for t in texts:
+        fn(t)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100000)
+    args = ap.parse_args()
+
+    texts = load_corpus(args.rows)
+    mismatches = sum(1 for t in set(texts) if clean_transaction(t) != clean_transaction_legacy(t))
+    legacy = rows_per_sec(clean_transaction_legacy, texts)
+    compiled = rows_per_sec(clean_transaction, texts)
+
+    print("rows:", len(texts))
+    print("legacy   : {:>10,.0f} rows/s".format(legacy))
+    print("compiled : {:>10,.0f} rows/s  ({:.1f}x)".format(compiled, compiled / legacy))
+    print("output mismatches:", mismatches)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_features.py
+"""
+Compare the vocabulary TF-IDF featurizer with the hashed one.
+
+For each featurizer reports fit time, peak Python memory while fitting
+(tracemalloc), pickled size, transform throughput (rows/s) and, with
+--accuracy, held-out accuracy of a plain LogisticRegression on top.
+
+Usage:
+    python benchmarks/bench_features.py --rows 20000 --accuracy
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import tracemalloc
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE)
+
+from finsort.cleaner import clean_transaction
+from finsort.features import HashedTfidfVectorizer, DEFAULT_N_FEATURES
+
+TRAIN = os.path.join(BASE, "data", "finsort_train.csv")
+TEST = os.path.join(BASE, "data", "finsort_test.csv")
+
+
+def _load(path, rows=None):
+    df = pd.read_csv(path, nrows=rows)
+    label = "category" if "category" in df.columns else "tag"
+    return [clean_transaction(t) for t in df["transaction"].astype(str)], df[label].astype(str).tolist()
+
+
+def bench(name, vect, train_texts, test_texts, repeat=3, y_train=None, y_test=None):
+    tracemalloc.start()
+    start = time.perf_counter()
+    X_train = vect.fit_transform(train_texts)
+    fit_s = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        X_test = vect.transform(test_texts)
+        best = min(best, time.perf_counter() - start)
+
+    report = {
+        "featurizer": name,
+        "n_features": X_train.shape[1],
+        "fit_seconds": round(fit_s, 3),
+        "fit_peak_mb": round(peak / 2 ** 20, 1),
+        "pickle_kb": round(len(pickle.dumps(vect)) / 1024.0, 1),
+        "transform_rows_per_sec": round(len(test_texts) / best),
+    }
+    if y_train is not None:
+        clf = LogisticRegression(max_iter=1000).fit(X_train, y_train)
+        report["accuracy"] = round(float((clf.predict(X_test) == y_test).mean()), 4)
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="TF-IDF vs hashed featurizer benchmark")
+    ap.add_argument("--rows", type=int, default=None, help="training rows to use (default: all)")
+    ap.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    ap.add_argument("--accuracy", action="store_true", help="also fit a LogisticRegression and score the test split")
+    args = ap.parse_args()
+
+    train_texts, y_train = _load(TRAIN, args.rows)
+    test_texts, y_test = _load(TEST)
+    y_train = pd.Series(y_train).values if args.accuracy else None
+    y_test = pd.Series(y_test).values if args.accuracy else None
+
+    reports = [
+        bench("tfidf", TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), max_features=30000),
+              train_texts, test_texts, y_train=y_train, y_test=y_test),
+        bench("hashed", HashedTfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=args.n_features),
+              train_texts, test_texts, y_train=y_train, y_test=y_test),
+    ]
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
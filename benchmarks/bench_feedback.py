@@ -0,0 +1,74 @@
+# benchmarks/bench_feedback.py
+"""
+Feedback store throughput: single-event appends vs group commits, full
+reads, incremental reads from an offset, and compaction.
+
+Usage:
+    python benchmarks/bench_feedback.py --events 200000 [--fsync]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE)
+
+from finsort.feedback import FeedbackStore, FeedbackWriter, make_event
+
+
+def _events(n):
+    # ~10% distinct texts so compaction has something to do
+    return [make_event("MERCHANT {} UPI".format(i % max(1, n // 10)), "fuel", cleaned="merchant {}".format(i % max(1, n // 10)),
+                       ts=0.0) for i in range(n)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Feedback store benchmark")
+    ap.add_argument("--events", type=int, default=200000)
+    ap.add_argument("--single", type=int, default=2000, help="events for the one-commit-per-event run")
+    ap.add_argument("--batch", type=int, default=256)
+    ap.add_argument("--fsync", action="store_true")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="finsort-feedback-")
+    try:
+        report = {"events": args.events, "fsync": args.fsync}
+        store = FeedbackStore(os.path.join(tmp, "single"), fsync=args.fsync)
+        events = _events(args.single)
+        start = time.perf_counter()
+        for e in events:
+            store.append(e)
+        report["single_appends_per_sec"] = round(args.single / (time.perf_counter() - start))
+
+        store = FeedbackStore(os.path.join(tmp, "group"), fsync=args.fsync)
+        events = _events(args.events)
+        start = time.perf_counter()
+        with FeedbackWriter(store, max_batch=args.batch) as w:
+            for e in events:
+                w.add(e)
+        report["group_appends_per_sec"] = round(args.events / (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        n = sum(1 for _ in store.read())
+        report["full_read_events_per_sec"] = round(n / (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        tail = sum(1 for _ in store.read(args.events - 1000))
+        report["tail_read_1000_ms"] = round((time.perf_counter() - start) * 1000.0, 2)
+        assert tail == 1000
+
+        start = time.perf_counter()
+        report["compaction"] = store.compact()
+        report["compaction_seconds"] = round(time.perf_counter() - start, 3)
+        print(json.dumps(report, indent=2))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_threads.py
+"""
+Inference throughput against the number of threads sharing one Predictor.
+
+Three workloads per thread count, on a synthetic corpus (see suite.py):
+
+    single   Predictor.predict per row, rows split across the threads
+    many     Predictor.predict_many (dict path) on --chunk-size slices
+    batch    Predictor.predict_batch (columnar path) on --chunk-size slices
+
+The prediction cache is cleared before every run. Speedup is rows/s
+relative to one thread. The columnar path releases the GIL in its arrow
+and NumPy/SciPy kernels, so it is the one that should scale with cores.
+
+Usage: python benchmarks/bench_threads.py [--rows 50000] [--threads 1,2,4,8]
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE)
+
+from benchmarks.suite import synthesize
+from finsort import inference
+from finsort.predictor import Predictor
+
+MODES = ("single", "many", "batch")
+
+
+def run(predictor, mode, texts, threads, chunk_size):
+    if mode == "single":
+        step = -(-len(texts) // threads)
+        chunks = [texts[i:i + step] for i in range(0, len(texts), step)]
+        work = lambda c: [predictor.predict(t) for t in c]
+    else:
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        work = predictor.predict_many if mode == "many" else predictor.predict_batch
+    inference.cache_clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(work, chunks):
+            pass
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--threads", default="1,2,4,8", help="comma-separated thread counts")
+    ap.add_argument("--chunk-size", type=int, default=1024)
+    ap.add_argument("--modes", default=",".join(MODES))
+    args = ap.parse_args()
+
+    counts = [int(n) for n in args.threads.split(",")]
+    modes = [m for m in args.modes.split(",") if m in MODES]
+    texts = synthesize(args.rows)
+    predictor = Predictor()
+    predictor.predict_batch(texts[:args.chunk_size])  # warm up
+
+    print("rows: {}  cpus: {}  chunk size: {}  model: {}".format(
+        len(texts), os.cpu_count(), args.chunk_size, predictor.bundle or "legacy"))
+    print("{:>7} {:>8} {:>12} {:>8}".format("mode", "threads", "rows/s", "speedup"))
+    for mode in modes:
+        base = None
+        for n in counts:
+            rate = run(predictor, mode, texts, n, args.chunk_size)
+            base = base or rate
+            print("{:>7} {:>8} {:>12,.0f} {:>7.2f}x".format(mode, n, rate, rate / base))
+
+
+if __name__ == "__main__":
+    main()
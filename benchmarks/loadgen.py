@@ -0,0 +1,105 @@
+# benchmarks/loadgen.py
+"""
+Local load generator for finsort.server.
+
+Opens `--concurrency` keep-alive connections and sends /predict requests
+(or /predict/batch with --bulk N) for `--seconds`, then prints client-side
+p50/p99 latency, throughput and the server's own /stats.
+
+Usage:
+    python -m finsort.server --port 8080 &
+    python benchmarks/loadgen.py --port 8080 --concurrency 64 --seconds 10
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import asyncio
+import argparse
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET = os.path.join(BASE, "data", "finsort_dataset.csv")
+
+
+async def http_json(reader, writer, method, path, payload=None):
+    """
+    Send one request on an open keep-alive connection and return (status, json).
+    """
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = "{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n".format(
+        method, path, len(body))
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def _client(host, port, texts, deadline, bulk, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    rows = 0
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if bulk:
+                await http_json(reader, writer, "POST", "/predict/batch", {"texts": random.sample(texts, bulk)})
+                rows += bulk
+            else:
+                await http_json(reader, writer, "POST", "/predict", {"text": random.choice(texts)})
+                rows += 1
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    finally:
+        writer.close()
+    return rows
+
+
+async def run(host, port, concurrency, seconds, bulk):
+    with open(DATASET, "r", encoding="utf-8", newline="") as f:
+        texts = [r["transaction"] for r in csv.DictReader(f)]
+
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    rows = await asyncio.gather(*[_client(host, port, texts, deadline, bulk, latencies)
+                                  for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, server_stats = await http_json(reader, writer, "GET", "/stats")
+    writer.close()
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * (len(latencies) - 1)))] if latencies else None
+    return {
+        "requests": len(latencies),
+        "rows": sum(rows),
+        "rows_per_sec": sum(rows) / elapsed,
+        "client_latency_ms": {"p50": pct(0.50), "p99": pct(0.99)},
+        "server": server_stats,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load generator for finsort.server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--bulk", type=int, default=0, help="rows per /predict/batch request (0 = single /predict)")
+    args = ap.parse_args()
+    report = asyncio.run(run(args.host, args.port, args.concurrency, args.seconds, args.bulk))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
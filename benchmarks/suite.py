@@ -0,0 +1,270 @@
+# benchmarks/suite.py
+"""
+Stage-by-stage inference benchmark.
+
+Synthesizes transaction corpora from data/finsort_dataset.csv (fresh
+reference numbers, mixed case, card/UPI prefixes and separators) and
+times each stage on its own:
+
+    clean              clean_transaction, per row
+    normalize          normalize_for_rules, per row
+    rules              rule_override, per row
+    transform          vectorizer.transform, batched
+    predict_proba      model.predict_proba, batched
+    predict_category   end to end, per row, cache cleared first (--rowwise-limit rows)
+    predict_categories end to end, batched
+
+Per-row stages time every call: rows/s, then p50/p99 latency in µs.
+Batched stages report rows/s over --batch-size chunks. Their p50/p99 is
+for single-row calls on a sample of the corpus. Each size runs in a fresh
+process, so peak RSS covers that size alone. Results are written as JSON.
+--compare prints rows/s ratios against an earlier result file.
+
+Usage:
+    python benchmarks/suite.py                          # 10k,100k,1m
+    python benchmarks/suite.py --sizes 10k --compare benchmarks/results/<old>.json
+"""
+
+import os
+import re
+import sys
+import csv
+import json
+import time
+import random
+import platform
+import argparse
+import subprocess
+import multiprocessing
+
+import numpy as np
+
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE)
+
+DATASET = os.path.join(BASE, "data", "finsort_dataset.csv")
+RESULTS_DIR = os.path.join(BASE, "benchmarks", "results")
+
+PREFIXES = ["", "", "", "POS ", "UPI/", "IMPS ", "NEFT-", "ACH DR ", "VPS*", "SQ *", "PAYPAL *"]
+SUFFIXES = ["", "", " INTL", " IN", " MUMBAI", " BLR", " *PRIME", " ONLINE"]
+SEPARATORS = [" ", " ", "*", "-", "/"]
+_DIGITS = re.compile(r"\d+")
+
+ROWWISE = ("clean", "normalize", "rules", "predict_category")
+BATCHED = ("transform", "predict_proba", "predict_categories")
+
+
+# ---- Corpus ----
+
+def synthesize(rows, seed=0):
+    """
+    `rows` realistic transaction strings derived from the dataset.
+    """
+    with open(DATASET, "r", encoding="utf-8", newline="") as f:
+        seeds = [r["transaction"] for r in csv.DictReader(f)]
+    rng = random.Random(seed)
+    digits = lambda m: "".join(rng.choice("0123456789") for _ in m.group(0))
+    out = []
+    for _ in range(rows):
+        words = _DIGITS.sub(digits, rng.choice(seeds)).split()
+        text = rng.choice(SEPARATORS).join(words)
+        r = rng.random()
+        if r < 0.2:
+            text = text.lower()
+        elif r < 0.3:
+            text = text.title()
+        text = rng.choice(PREFIXES) + text + rng.choice(SUFFIXES)
+        if rng.random() < 0.3:
+            text += " REF{}".format(rng.randrange(10 ** 5, 10 ** 9))
+        out.append(text)
+    return out
+
+
+def parse_size(s):
+    s = s.strip().lower()
+    mult = {"k": 1000, "m": 1000000}.get(s[-1], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+
+# ---- Timing ----
+
+def _summary(latencies_s, rows, total_s):
+    lat_us = np.asarray(latencies_s) * 1e6
+    return {
+        "rows": rows,
+        "seconds": round(total_s, 4),
+        "rows_per_sec": round(rows / total_s) if total_s > 0 else None,
+        "p50_us": round(float(np.percentile(lat_us, 50)), 2) if len(lat_us) else None,
+        "p99_us": round(float(np.percentile(lat_us, 99)), 2) if len(lat_us) else None,
+    }
+
+
+def time_rowwise(fn, items):
+    clock = time.perf_counter
+    lat = np.empty(len(items))
+    for i, x in enumerate(items):
+        t0 = clock()
+        fn(x)
+        lat[i] = clock() - t0
+    return _summary(lat, len(items), float(lat.sum()))
+
+
+def time_batched(fn, items, batch_size, sample, single=None, reset=None):
+    n = items.shape[0] if hasattr(items, "shape") else len(items)
+    if reset:
+        reset()
+    start = time.perf_counter()
+    for i in range(0, n, batch_size):
+        fn(items[i:i + batch_size])
+    total = time.perf_counter() - start
+    if reset:
+        reset()
+    single = time_rowwise(single or (lambda x: fn([x])), sample)
+    out = _summary([], n, total)
+    out["p50_us"], out["p99_us"] = single["p50_us"], single["p99_us"]
+    return out
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def run_size(rows, batch_size=4096, sample=500, stages=None, seed=0, rowwise_limit=20000):
+    """
+    Benchmark every stage on a synthetic corpus of `rows` rows.
+    End-to-end predict_category is timed on the first `rowwise_limit` rows only.
+    """
+    from finsort import inference
+    from finsort.cleaner import clean_transaction, normalize_for_rules
+
+    stages = stages or ROWWISE + BATCHED
+    texts = synthesize(rows, seed)
+    snap = inference._load()
+    model, vectorizer, config = snap.model, snap.vectorizer, snap.config
+    cleaned = [clean_transaction(t) for t in texts]
+    ruled = [normalize_for_rules(c) for c in cleaned]
+    sample_idx = np.random.RandomState(seed).choice(rows, min(sample, rows), replace=False)
+
+    results = {}
+    if "clean" in stages:
+        results["clean"] = time_rowwise(clean_transaction, texts)
+    if "normalize" in stages:
+        results["normalize"] = time_rowwise(normalize_for_rules, cleaned)
+    if "rules" in stages:
+        results["rules"] = time_rowwise(lambda t: inference.rule_override(t, config), ruled)
+    if "transform" in stages:
+        results["transform"] = time_batched(vectorizer.transform, cleaned, batch_size,
+                                            [cleaned[i] for i in sample_idx])
+    if "predict_proba" in stages:
+        X = vectorizer.transform(cleaned)
+        results["predict_proba"] = time_batched(model.predict_proba, X, batch_size,
+                                                [X[i] for i in sample_idx], single=model.predict_proba)
+    if "predict_category" in stages:
+        inference.cache_clear()
+        results["predict_category"] = time_rowwise(inference.predict_category, texts[:rowwise_limit or None])
+    if "predict_categories" in stages:
+        results["predict_categories"] = time_batched(
+            lambda b: inference.predict_categories(b, chunk_size=batch_size), texts, batch_size,
+            [texts[i] for i in sample_idx], reset=inference.cache_clear)
+    return {"rows": rows, "stages": results, "cache": inference.cache_info(), "peak_rss_mb": peak_rss_mb()}
+
+
+def _run_isolated(args):
+    return run_size(*args)
+
+
+# ---- Reporting ----
+
+def environment():
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": os.environ.get("FINSORT_BACKEND", "pickle"),
+    }
+
+
+def compare(current, baseline):
+    """
+    Lines of rows/s ratios (current / baseline) per size and stage.
+    """
+    lines = []
+    for size, res in current["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base:
+            continue
+        for stage, m in res["stages"].items():
+            old = base["stages"].get(stage, {}).get("rows_per_sec")
+            if old and m["rows_per_sec"]:
+                lines.append("{:>8} {:<20} {:>12,} -> {:>12,} rows/s  x{:.2f}".format(
+                    size, stage, old, m["rows_per_sec"], m["rows_per_sec"] / old))
+    return lines
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="FinSort stage benchmark suite")
+    ap.add_argument("--sizes", default="10k,100k,1m", help="comma-separated corpus sizes (e.g. 10k,100k,1m)")
+    ap.add_argument("--stages", default=",".join(ROWWISE + BATCHED))
+    ap.add_argument("--batch-size", type=int, default=4096)
+    ap.add_argument("--sample", type=int, default=500, help="rows timed one by one for batched stages")
+    ap.add_argument("--rowwise-limit", type=int, default=20000,
+                    help="rows for the per-row predict_category stage (0 = all)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=None, help="result JSON (default: benchmarks/results/<time>-<commit>.json)")
+    ap.add_argument("--compare", default=None, help="earlier result JSON to compare rows/s against")
+    ap.add_argument("--no-isolate", action="store_true", help="run all sizes in this process")
+    args = ap.parse_args(argv)
+
+    stages = tuple(s.strip() for s in args.stages.split(",") if s.strip())
+    unknown = set(stages) - set(ROWWISE + BATCHED)
+    if unknown:
+        ap.error("unknown stages: {}".format(", ".join(sorted(unknown))))
+
+    report = {"environment": environment(), "batch_size": args.batch_size, "results": {}}
+    ctx = multiprocessing.get_context("spawn")
+    for size in [parse_size(s) for s in args.sizes.split(",")]:
+        job = (size, args.batch_size, args.sample, stages, args.seed, args.rowwise_limit)
+        if args.no_isolate:
+            res = run_size(*job)
+        else:
+            with ctx.Pool(1) as pool:
+                res = pool.apply(_run_isolated, (job,))
+        report["results"][str(size)] = res
+        for stage, m in res["stages"].items():
+            print("{:>8} {:<20} {:>12,} rows/s  p50 {:>9} us  p99 {:>9} us".format(
+                size, stage, m["rows_per_sec"], m["p50_us"], m["p99_us"]), file=sys.stderr)
+        print("{:>8} peak RSS {} MB".format(size, res["peak_rss_mb"]), file=sys.stderr)
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, "{}-{}.json".format(time.strftime("%Y%m%d-%H%M%S"),
+                                                             report["environment"]["commit"] or "nogit"))
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Wrote", out, file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            for line in compare(report, json.load(f)):
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,24 @@
 import os
 import pandas as pd
-from tqdm import tqdm
 
 BASE = os.path.dirname(__file__)
 TEST_CSV = os.path.join(BASE, "data", "finsort_test_hard20.csv")
 OUT_DIR = os.path.join(BASE, "reports")
 os.makedirs(OUT_DIR, exist_ok=True)
 
-from finsort.inference import predict_category
+from finsort import inference
+from finsort.frame import categorize_frame
+
+# reruns only score texts the persistent cache has not seen under this model
+# (category_map edits keep it valid); see finsort/diskcache.py
+inference.enable_disk_cache()
 
 df = pd.read_csv(TEST_CSV)
+if "transaction" not in df.columns:
+    df["transaction"] = ""
 
-preds = []
-for i, row in tqdm(df.iterrows(), total=len(df), desc="Predicting"):
-    tx = row.get("transaction", "")
-    try:
-        res = predict_category(tx)
-    except Exception as e:
-        res = {"tag": None, "category": None, "confidence": None, "error": str(e)}
-    preds.append(res)
-
-pred_df = pd.json_normalize(preds)
-combined = pd.concat([df.reset_index(drop=True), pred_df.reset_index(drop=True)], axis=1)
+# one vectorized pass over the whole column (see finsort/frame.py)
+combined = categorize_frame(df, column="transaction")
 
 combined["expected_tag"] = combined.get("expected_tag", None)
 combined["match_tag"] = combined["tag"] == combined["expected_tag"]
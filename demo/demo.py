@@ -1,6 +1,6 @@
 from finsort.inference import predict_category
 from finsort.explain import explain_prediction
-import os
+from finsort.feedback import record_feedback
 
 def interactive_demo():
     print("FinSort interactive demo. Make sure you ran training to create model.pkl and vectorizer.pkl.")
@@ -16,8 +16,8 @@ def interactive_demo():
         if result['confidence'] < 0.6:
             correct = input('Low confidence. Correct category if wrong (press enter to skip): ').strip()
             if correct:
-                with open(os.path.join(os.path.dirname(__file__), '..', 'finsort', 'feedback.log'), 'a') as f:
-                    f.write(f"{text},{correct}\n")
+                record_feedback(text, correct, predicted_tag=result['tag'], predicted_category=result['category'],
+                                confidence=result['confidence'], source='cli', cleaned=result['cleaned'])
                 print('Logged feedback.')
 if __name__ == '__main__':
     interactive_demo()
@@ -3,17 +3,16 @@
 import sys
 import os
 import json
-import datetime
 import streamlit as st
 
 # Add project root so finsort package imports work
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 from finsort.inference import predict_category
+from finsort.feedback import record_feedback
 
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 CONFIG_PATH = os.path.join(BASE_DIR, "finsort", "config.json")
-FEEDBACK_LOG = os.path.join(BASE_DIR, "finsort", "feedback.log")
 
 st.set_page_config(page_title="FinSort Demo", layout="centered")
 
@@ -25,7 +24,7 @@ tx = st.text_input("Transaction text", value="STARBUCKS INDIA *STAR 09")
 if st.button("Predict"):
 
     try:
-        res = predict_category(tx)
+        res = predict_category(tx, top_k=3)
     except Exception as e:
         st.error("Prediction error: {}".format(e))
         st.stop()
@@ -36,7 +35,10 @@ if st.button("Predict"):
     st.markdown("Confidence: **{:.2f}**".format(res.get("confidence")))
 
     if res.get("low_confidence"):
-        st.warning("Low confidence. Please review and correct if needed.")
+        if res.get("decision") == "abstain":
+            st.warning("The model abstained. Please choose a category.")
+        else:
+            st.warning("Low confidence. Please review and correct if needed.")
 
         # Load categories from config
         try:
@@ -46,6 +48,14 @@ if st.button("Predict"):
         except Exception:
             all_cats = []
 
+        # the model's suggestions first, best first, then the rest of the taxonomy
+        suggested = []
+        for s in res.get("top_k", []):
+            if s["category"] not in suggested:
+                suggested.append(s["category"])
+                st.write("Suggestion: {} ({:.2f})".format(s["category"], s["confidence"]))
+        all_cats = suggested + [c for c in all_cats if c not in suggested]
+
         choice = st.selectbox(
             "Correct category (if prediction is wrong):",
             ["(keep predicted)"] + all_cats
@@ -54,17 +64,15 @@ if st.button("Predict"):
         if st.button("Submit correction"):
             final_category = choice if choice != "(keep predicted)" else res.get("category")
 
-            entry = {
-                "timestamp": datetime.datetime.utcnow().isoformat(),
-                "raw": res.get("raw"),
-                "predicted_category": res.get("category"),
-                "corrected_category": final_category,
-                "confidence": float(res.get("confidence"))
-            }
-
-            os.makedirs(os.path.dirname(FEEDBACK_LOG), exist_ok=True)
-            with open(FEEDBACK_LOG, "a", encoding="utf-8") as f:
-                f.write(json.dumps(entry) + "\n")
+            record_feedback(
+                res.get("raw"),
+                final_category,
+                predicted_tag=res.get("tag"),
+                predicted_category=res.get("category"),
+                confidence=res.get("confidence"),
+                source="streamlit",
+                cleaned=res.get("cleaned"),
+            )
 
             st.success("Feedback recorded.")
     else:
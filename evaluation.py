@@ -1,12 +1,18 @@
 import pandas as pd, joblib, os
 from sklearn.metrics import classification_report, confusion_matrix
-from finsort.cleaner import clean_transaction
+from finsort.frame import clean_series
 BASE = os.path.dirname(__file__)
-model = joblib.load(os.path.join(BASE, 'finsort', 'model.pkl'))
-vectorizer = joblib.load(os.path.join(BASE, 'finsort', 'vectorizer.pkl'))
+from finsort import registry
+if registry.current_version():
+    model, vectorizer, _, manifest = registry.load_bundle()
+    print('Evaluating model', manifest['version'])
+else:
+    # legacy layout, from before the model registry
+    model = joblib.load(os.path.join(BASE, 'finsort', 'model.pkl'))
+    vectorizer = joblib.load(os.path.join(BASE, 'finsort', 'vectorizer.pkl'))
 
 df = pd.read_csv(os.path.join(BASE, 'data', 'finsort_test.csv'))
-df['cleaned'] = df['transaction'].apply(clean_transaction)
+df['cleaned'] = clean_series(df['transaction'])
 X = vectorizer.transform(df['cleaned'])
 preds = model.predict(X)
 print(classification_report(df['tag'], preds))
@@ -0,0 +1,240 @@
+# finsort/batch.py
+"""
+Streaming batch categorizer for large statement dumps.
+
+Reads CSV or JSONL in chunks, fans the chunks out to a process pool (each
+worker loads the model once) and writes results incrementally, in input
+order. At most `max_pending` chunks are in flight, so memory stays flat
+regardless of file size.
+
+Within a chunk, work is deduplicated before it is done: raw texts are
+factorized and each distinct one is cleaned once, the cleaned texts are
+factorized again, and rules, the fingerprint index and the model run only
+on the distinct cleaned texts (finsort.frame). The results are then
+scattered back to the rows through the inverse indices. Statement files
+repeat a few thousand descriptors across most rows, so larger chunks
+dedupe better. The run summary reports the dedupe ratio (rows per
+distinct cleaned text, summed over chunks) next to rows/s.
+
+With --disk-cache, model scores are read from and written to the
+persistent cache (finsort.diskcache), which all workers share. A rerun
+after a category_map-only config change then calls the model only for
+texts it has not seen.
+
+Usage:
+    python -m finsort.batch statements.csv categorized.csv --workers 4
+    python -m finsort.batch feed.jsonl out.jsonl --column description
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from . import inference
+from .diskcache import DEFAULT_CACHE_PATH
+
+RESULT_FIELDS = ["cleaned", "tag", "category", "confidence", "low_confidence", "by_rule", "by_index"]
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def _detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _read_rows(fh, fmt):
+    """
+    Yield input rows as dicts, one at a time.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+    else:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(cache_path=None):
+    # load model/vectorizer/config once per worker process
+    if cache_path:
+        inference.enable_disk_cache(cache_path)
+    inference._load()
+
+
+def _categorize_texts(texts, codes=None, dedupe=True):
+    """
+    Worker entry point: categorize a list of raw texts (and their merchant codes).
+    Returns (results, distinct): compact tuples in RESULT_FIELDS order, plus
+    by_code when codes are given (no raw text sent back), and the number of
+    distinct texts that were actually categorized. With dedupe=False every
+    row goes through predict_categories on its own.
+    """
+    fields = RESULT_FIELDS if codes is None else RESULT_FIELDS + ["by_code"]
+    if not dedupe:
+        out = []
+        for r in inference.predict_categories(texts, chunk_size=max(len(texts), 1), merchant_codes=codes):
+            out.append(tuple(r.get(f, False) for f in fields))
+        return out, len(out)
+
+    from .frame import _categorize_values
+    _, _, rows, columns = _categorize_values(texts, inference._load(), codes)
+    # one gather per column, then back to Python scalars for the writers
+    out = list(zip(*(columns[f][rows].tolist() for f in fields)))
+    return out, len(columns["tag"])
+
+
+class _Writer:
+    def __init__(self, fh, fmt, prefix="", fields=RESULT_FIELDS):
+        self.fh = fh
+        self.fmt = fmt
+        self.fields = [prefix + f for f in fields]
+        self._csv = None
+        self._checked = False
+
+    def write(self, row, result):
+        if not self._checked:
+            clash = set(row) & set(self.fields)
+            if clash:
+                raise ValueError("input already has column(s) {}; pass a prefix (e.g. --prefix pred_)".format(
+                    ", ".join(sorted(clash))))
+            self._checked = True
+        out = dict(row)
+        out.update(zip(self.fields, result))
+        if self.fmt == "csv":
+            if self._csv is None:
+                self._csv = csv.DictWriter(self.fh, fieldnames=list(out.keys()), extrasaction="ignore")
+                self._csv.writeheader()
+            self._csv.writerow(out)
+        else:
+            self.fh.write(json.dumps(out, ensure_ascii=False) + "\n")
+
+
+def categorize_file(input_path, output_path, column="transaction", workers=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, max_pending=None,
+                    input_format=None, output_format=None, prefix="", code_column=None, dedupe=True,
+                    cache_path=None):
+    """
+    Categorize every row of `input_path` into `output_path`.
+    Each output row is the input row plus RESULT_FIELDS (named with `prefix`),
+    and by_code when `code_column` names a merchant code field.
+    workers=0 runs in-process (no pool). dedupe=False categorizes row by row
+    (for comparison). `cache_path` enables the persistent prediction cache
+    there in every worker. Returns a summary dict.
+    """
+    in_fmt = _detect_format(input_path, input_format)
+    out_fmt = _detect_format(output_path, output_format)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * max(workers, 1)
+
+    start = time.perf_counter()
+    rows_done = distinct = 0
+    with open(input_path, "r", encoding="utf-8", newline="") as fin, \
+            open(output_path, "w", encoding="utf-8", newline="") as fout:
+        writer = _Writer(fout, out_fmt, prefix, RESULT_FIELDS + ["by_code"] if code_column else RESULT_FIELDS)
+
+        def codes(chunk):
+            return [r.get(code_column) for r in chunk] if code_column else None
+
+        def flush(chunk, done):
+            nonlocal distinct
+            results, n_distinct = done
+            distinct += n_distinct
+            for row, result in zip(chunk, results):
+                writer.write(row, result)
+            return len(chunk)
+
+        chunks = _chunks(_read_rows(fin, in_fmt), chunk_size)
+        if workers == 0:
+            previous = inference._DISK_CACHE
+            _init_worker(cache_path)
+            try:
+                for chunk in chunks:
+                    texts = [r.get(column) or "" for r in chunk]
+                    rows_done += flush(chunk, _categorize_texts(texts, codes(chunk), dedupe))
+            finally:
+                inference._DISK_CACHE = previous  # in-process: leave the caller's setting as it was
+        else:
+            pending = deque()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(cache_path,)) as pool:
+                for chunk in chunks:
+                    texts = [r.get(column) or "" for r in chunk]
+                    pending.append((chunk, pool.submit(_categorize_texts, texts, codes(chunk), dedupe)))
+                    if len(pending) >= max_pending:
+                        # oldest chunk first keeps output in input order
+                        c, fut = pending.popleft()
+                        rows_done += flush(c, fut.result())
+                while pending:
+                    c, fut = pending.popleft()
+                    rows_done += flush(c, fut.result())
+
+    seconds = time.perf_counter() - start
+    return {
+        "rows": rows_done,
+        "seconds": seconds,
+        "rows_per_sec": rows_done / seconds if seconds > 0 else 0.0,
+        "distinct": distinct,
+        "dedupe_ratio": rows_done / distinct if distinct else 1.0,
+        "workers": workers,
+        "chunk_size": chunk_size,
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.batch",
+                                 description="Stream-categorize a CSV/JSONL file of transactions.")
+    ap.add_argument("input", help="input .csv or .jsonl file")
+    ap.add_argument("output", help="output .csv or .jsonl file")
+    ap.add_argument("--column", default="transaction", help="field holding the raw transaction text")
+    ap.add_argument("--code-column", default=None,
+                    help="field holding a merchant code to look up in merchant_code_map, e.g. merchant_code")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (0 = in-process; default: CPU count)")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk sent to a worker")
+    ap.add_argument("--max-pending", type=int, default=None, help="chunks in flight (default: 2 x workers)")
+    ap.add_argument("--prefix", default="", help="prefix for result columns, e.g. pred_")
+    ap.add_argument("--input-format", choices=["csv", "jsonl"], default=None)
+    ap.add_argument("--output-format", choices=["csv", "jsonl"], default=None)
+    ap.add_argument("--disk-cache", nargs="?", const=DEFAULT_CACHE_PATH, default=None, metavar="PATH",
+                    help="share model scores through the persistent cache (default path: {})".format(
+                        DEFAULT_CACHE_PATH))
+    ap.add_argument("--no-dedupe", action="store_true",
+                    help="categorize row by row instead of once per distinct cleaned text (for comparison)")
+    args = ap.parse_args(argv)
+
+    if args.chunk_size < 1:
+        ap.error("--chunk-size must be positive")
+
+    summary = categorize_file(
+        args.input, args.output, column=args.column, workers=args.workers,
+        chunk_size=args.chunk_size, max_pending=args.max_pending,
+        input_format=args.input_format, output_format=args.output_format, prefix=args.prefix,
+        code_column=args.code_column, dedupe=not args.no_dedupe, cache_path=args.disk_cache,
+    )
+    print("Categorized {rows} rows in {seconds:.2f}s ({rows_per_sec:,.0f} rows/s, "
+          "{workers} workers); {distinct} distinct texts categorized, "
+          "dedupe ratio {dedupe_ratio:.1f}x".format(**summary), file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
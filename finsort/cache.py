@@ -0,0 +1,86 @@
+# finsort/cache.py
+# Small in-process LRU/TTL cache used to memoize predictions.
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Bounded LRU cache with an optional time-to-live and hit/miss counters.
+
+    maxsize=0 disables caching (every get is a miss, put is a no-op).
+    ttl is in seconds; None means entries never expire.
+    """
+
+    def __init__(self, maxsize=50000, ttl=None):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires = item
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Drop all entries (counted as one invalidation); counters are kept.
+        """
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def resize(self, maxsize=None, ttl=None):
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = int(maxsize)
+                while len(self._data) > max(self.maxsize, 0):
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+            if ttl is not None:
+                self.ttl = ttl or None
+
+    def __len__(self):
+        return len(self._data)
+
+    def info(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
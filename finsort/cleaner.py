@@ -2,8 +2,134 @@
 # Robust transaction text cleaning and normalization.
 
 import re
+import hashlib
 import unicodedata
 
+# ---- Cleaning tables (shared by the compiled and legacy cleaners) ----
+
+# Common alias normalizations (regex keys), applied in order
+ALIAS_REPLACEMENTS = [
+    (r"\bamzn\b", "amazon"),
+    (r"\bamz\b", "amazon"),
+    (r"\bamzn mk?tp\b", "amazon marketplace"),
+    (r"\bamzn mktp\b", "amazon marketplace"),
+    (r"\bmktp\b", "marketplace"),
+    (r"\bmkt\b", "marketplace"),
+    (r"\bflipkart\b", "flipkart"),
+    (r"\bmyntra\b", "myntra"),
+    (r"\bajio\b", "ajio"),
+    (r"\bpaytm billpay\b", "paytm billpay"),
+    (r"\bpaytm\b", "paytm"),
+    (r"\bphonepe\b", "phonepe"),
+    (r"\bgpay\b", "google pay"),
+    (r"\bccd\b", "coffee day"),
+    (r"\bstarbucks\b", "starbucks"),
+    (r"\bnetflixcom\b", "netflix"),
+    (r"\bnetflix\b", "netflix"),
+    (r"\bspotify\b", "spotify"),
+    (r"\bamazonpay\b", "amazon pay"),
+    (r"\bupi[-/]?\b", "upi "),
+    (r"\bpayu\b", "payu"),
+]
+
+# Common noise tokens, replaced by a space (useful short numbers are kept)
+NOISE_TOKENS = [
+    r"\btxn\b", r"\btrx\b", r"\bref\b", r"\breference\b",
+    r"\binv\b", r"\binvoice\b", r"\bord\b", r"\bpmts\b", r"\bpmts?\b",
+    r"\bcr\b", r"\bdr\b", r"\bautopay\b", r"\btransfer\b",
+    r"\bpaid\b", r"\bpayment\b"
+]
+
+# Long runs of digits (IDs, card fragments, phone numbers)
+LONG_DIGITS = r"\d{6,}"
+
+# Stray special characters (step 6) and separators / punctuation (step 7)
+SPECIAL_CHARS = "*#@!$%^&()_+=[]{};:<>/\\|~`"
+SEPARATOR_CHARS = "-_/,."
+
+# Bump when cleaning logic changes in a way the tables above do not show
+CLEANER_REVISION = 1
+# Identifies the cleaner's output: cached cleaned text is only valid for the same version
+CLEANER_VERSION = hashlib.sha1(repr((
+    CLEANER_REVISION, ALIAS_REPLACEMENTS, NOISE_TOKENS, LONG_DIGITS, SPECIAL_CHARS, SEPARATOR_CHARS,
+)).encode("utf-8")).hexdigest()[:12]
+
+
+class _ControlCharTable(dict):
+    """
+    str.translate table deleting Unicode category C characters.
+    Filled lazily per code point, so only characters actually seen are classified.
+    """
+
+    def __missing__(self, cp):
+        value = None if unicodedata.category(chr(cp))[0] == "C" else cp
+        self[cp] = value
+        return value
+
+
+def _strip_word_bounds(pattern):
+    if pattern.startswith(r"\b") and pattern.endswith(r"\b"):
+        return pattern[2:-2]
+    raise ValueError("expected a \\b...\\b pattern: " + pattern)
+
+
+class CompiledCleaner:
+    """
+    Precompiled, single-pass equivalent of clean_transaction_legacy.
+
+    - control characters are deleted with a translate table
+    - aliases, noise tokens and long digit runs share one combined regex
+      whose callback dispatches on the matched group
+    - special characters and separators are mapped to spaces with a second
+      translate table, then whitespace is collapsed with split/join
+
+    All alias and noise patterns are whole-word and letter-only, so matching
+    them in one left-to-right pass (alternatives tried in table order) gives
+    the same result as applying them one after another.
+    """
+
+    def __init__(self, aliases=None, noise_tokens=None):
+        aliases = ALIAS_REPLACEMENTS if aliases is None else aliases
+        noise_tokens = NOISE_TOKENS if noise_tokens is None else noise_tokens
+
+        parts = []
+        self._repl = {}
+        for i, (pat, repl) in enumerate(aliases):
+            name = "a%d" % i
+            parts.append("(?P<%s>%s)" % (name, _strip_word_bounds(pat)))
+            self._repl[name] = repl
+        for i, pat in enumerate(noise_tokens):
+            name = "n%d" % i
+            parts.append("(?P<%s>%s)" % (name, _strip_word_bounds(pat)))
+            self._repl[name] = " "
+        self._repl["d"] = " "
+        self._pattern = re.compile(
+            r"\b(?:%s)\b|(?P<d>%s)" % ("|".join(parts), LONG_DIGITS)
+        )
+        self._control = _ControlCharTable()
+        self._punct = {ord(ch): " " for ch in SPECIAL_CHARS + SEPARATOR_CHARS}
+
+    def _dispatch(self, m):
+        return self._repl[m.lastgroup]
+
+    def clean(self, text):
+        """
+        Clean one transaction string; output is identical to clean_transaction_legacy.
+        """
+        if not text:
+            return ""
+        s = unicodedata.normalize("NFKD", str(text))
+        s = s.translate(self._control).lower()
+        s = self._pattern.sub(self._dispatch, s)
+        s = s.translate(self._punct)
+        return " ".join(s.split())
+
+    __call__ = clean
+
+
+_CLEANER = CompiledCleaner()
+
+
 def clean_transaction(text):
     """
     Normalize transaction strings for model ingestion.
@@ -15,6 +141,16 @@ def clean_transaction(text):
     - remove long numeric sequences (IDs), keep short numbers (like '2kg')
     - remove common noise tokens
     - drop punctuation, collapse whitespace
+
+    Runs through the precompiled CompiledCleaner; clean_transaction_legacy
+    is the step-by-step reference implementation.
+    """
+    return _CLEANER.clean(text)
+
+
+def clean_transaction_legacy(text):
+    """
+    Original multi-pass cleaner, kept as the reference for parity tests and benchmarks.
     """
     if not text:
         return ""
@@ -29,45 +165,15 @@ def clean_transaction(text):
     s = s.lower()
 
     # 3. Common alias normalizations (regex keys)
-    replacements = {
-        r"\bamzn\b": "amazon",
-        r"\bamz\b": "amazon",
-        r"\bamzn mk?tp\b": "amazon marketplace",
-        r"\bamzn mktp\b": "amazon marketplace",
-        r"\bmktp\b": "marketplace",
-        r"\bmkt\b": "marketplace",
-        r"\bflipkart\b": "flipkart",
-        r"\bmyntra\b": "myntra",
-        r"\bajio\b": "ajio",
-        r"\bpaytm billpay\b": "paytm billpay",
-        r"\bpaytm\b": "paytm",
-        r"\bphonepe\b": "phonepe",
-        r"\bgpay\b": "google pay",
-        r"\bgpay\b": "google pay",
-        r"\bccd\b": "coffee day",
-        r"\bstarbucks\b": "starbucks",
-        r"\bnetflixcom\b": "netflix",
-        r"\bnetflix\b": "netflix",
-        r"\bspotify\b": "spotify",
-        r"\bamazonpay\b": "amazon pay",
-        r"\bupi[-/]?\b": "upi ",
-        r"\bpayu\b": "payu",
-    }
-    for pat, repl in replacements.items():
+    for pat, repl in ALIAS_REPLACEMENTS:
         s = re.sub(pat, repl, s)
 
     # 4. Remove/normalize common noise tokens (but keep useful short numbers)
-    noise_tokens = [
-        r"\btxn\b", r"\btrx\b", r"\bref\b", r"\breference\b",
-        r"\binv\b", r"\binvoice\b", r"\bord\b", r"\bpmts\b", r"\bpmts?\b",
-        r"\bcr\b", r"\bdr\b", r"\bautopay\b", r"\bautopay\b", r"\btransfer\b",
-        r"\bpaid\b", r"\bpayment\b"
-    ]
-    for nt in noise_tokens:
+    for nt in NOISE_TOKENS:
         s = re.sub(nt, " ", s)
 
     # 5. Remove long runs of digits (IDs, card fragments, phone numbers)
-    s = re.sub(r"\d{6,}", " ", s)
+    s = re.sub(LONG_DIGITS, " ", s)
 
     # 6. Remove stray special characters
     s = re.sub(r"[\*\#\@\!\$\%\^\&\(\)_\+\=\[\]\{\};:<>\/\\\|~`]", " ", s)
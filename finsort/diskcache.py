@@ -0,0 +1,199 @@
+# finsort/diskcache.py
+"""
+Persistent prediction cache shared by processes and runs.
+
+An SQLite database in WAL mode maps (model key, config key, cleaned text)
+to the model's tag and confidence for that text:
+
+    model key    hash of the served model: a registry bundle's manifest
+                 checksums plus the backend, else the model file stamps
+    config key   hash of the config without the keys that only turn a
+                 tag and confidence into a result (PRESENTATION_KEYS)
+
+Only model scores are stored. Rules, the fingerprint index and merchant
+codes are cheap and run on every call. Category, low_confidence and the
+review decision are worked out from the live config each time. A change
+to category_map or the thresholds therefore keeps every cached entry
+valid: the cached tags are only remapped. Retraining, switching backend or
+changing any other config key starts a new key space.
+
+WAL mode lets any number of readers run next to one writer. Each process
+and thread opens its own connection. Writers batch a whole chunk of
+misses into one transaction. finsort.inference consults the cache inside
+its single model call (enable_disk_cache() or FINSORT_DISK_CACHE=1|path).
+
+Usage:
+    python -m finsort.diskcache info
+    python -m finsort.diskcache prune      # drop entries of other model/config keys
+    python -m finsort.diskcache clear
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+
+import numpy as np
+
+BASE = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_CACHE_PATH = os.path.join(BASE, ".cache", "predictions.sqlite")
+# config keys that do not change which tag/confidence the model gives a text
+PRESENTATION_KEYS = ("category_map", "confidence_threshold", "per_tag_threshold", "abstain_threshold",
+                     "merchant_code_map")
+# host parameters per SELECT ... IN (...) (SQLite's historical minimum limit is 999)
+_BATCH = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    model TEXT NOT NULL,
+    config TEXT NOT NULL,
+    cleaned TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    PRIMARY KEY (model, config, cleaned)
+) WITHOUT ROWID
+"""
+
+
+def _digest(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:32]
+
+
+def model_key(stamp, manifest=None, backend=None):
+    """
+    Cache key of a model: its registry manifest checksums when it has one,
+    else its stamp (source, identity) from finsort.inference.
+    """
+    if manifest is not None:
+        return _digest({"files": manifest.get("files"), "source": os.path.basename(str(stamp[0])),
+                        "backend": backend})
+    return _digest({"stamp": stamp, "backend": backend})
+
+
+def config_key(config):
+    """
+    Cache key of a config: a hash of everything but the PRESENTATION_KEYS.
+    """
+    return _digest({k: v for k, v in (config or {}).items() if k not in PRESENTATION_KEYS})
+
+
+class PredictionCache:
+    """
+    SQLite-backed (model key, config key, cleaned text) -> (tag, confidence)
+    store. Safe to use from several threads and processes.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn()
+
+    def _conn(self):
+        # sqlite3 connections must not cross threads or a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, model, config, cleaned_texts):
+        """
+        (tags, confidences) for `cleaned_texts`: an object array with None
+        for misses and a float64 array (NaN for misses).
+        """
+        texts = list(cleaned_texts)
+        tags = np.full(len(texts), None, dtype=object)
+        conf = np.full(len(texts), np.nan)
+        if not texts:
+            return tags, conf
+        positions = {}
+        for i, t in enumerate(texts):
+            positions.setdefault(t, []).append(i)
+        distinct = list(positions)
+        conn = self._conn()
+        for start in range(0, len(distinct), _BATCH):
+            part = distinct[start:start + _BATCH]
+            rows = conn.execute(
+                "SELECT cleaned, tag, confidence FROM predictions WHERE model = ? AND config = ? "
+                "AND cleaned IN ({})".format(",".join("?" * len(part))), [model, config] + part)
+            for cleaned, tag, p in rows:
+                where = positions[cleaned]
+                tags[where] = tag
+                conf[where] = p
+        found = int(np.count_nonzero(np.not_equal(tags, None)))
+        with self._lock:
+            self.hits += found
+            self.misses += len(texts) - found
+        return tags, conf
+
+    def put_many(self, model, config, cleaned_texts, tags, confidences):
+        """
+        Store tag and confidence for each cleaned text, in one transaction.
+        """
+        rows = [(model, config, t, str(tag), float(p)) for t, tag, p in zip(cleaned_texts, tags, confidences)]
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)", rows)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def prune(self, model, config):
+        """
+        Delete entries stored under any other (model, config) key; returns how many.
+        """
+        cur = self._conn().execute("DELETE FROM predictions WHERE model != ? OR config != ?", (model, config))
+        return cur.rowcount
+
+    def clear(self):
+        self._conn().execute("DELETE FROM predictions")
+
+    def info(self):
+        """
+        Entry count, distinct (model, config) keys and this process's hit counters.
+        """
+        conn = self._conn()
+        entries = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        keys = conn.execute("SELECT COUNT(*) FROM (SELECT DISTINCT model, config FROM predictions)").fetchone()[0]
+        with self._lock:
+            return {"path": self.path, "entries": entries, "keys": keys, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.diskcache", description="Persistent prediction cache.")
+    ap.add_argument("cmd", choices=["info", "prune", "clear"])
+    ap.add_argument("--path", default=DEFAULT_CACHE_PATH)
+    args = ap.parse_args(argv)
+
+    cache = PredictionCache(args.path)
+    if args.cmd == "prune":
+        from . import inference
+        model, config = inference._disk_keys(inference._load())
+        print(json.dumps({"deleted": cache.prune(model, config)}))
+    elif args.cmd == "clear":
+        cache.clear()
+    print(json.dumps(cache.info()))
+
+
+if __name__ == "__main__":
+    main()
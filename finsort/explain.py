@@ -1,24 +1,156 @@
+# finsort/explain.py
+"""
+Per-feature explanations for ML predictions.
+
+An Explainer is built once per loaded model snapshot (shared with
+finsort.inference, so nothing is unpickled here). It precomputes a
+column -> feature name array and a per-class weight matrix W (n_features,
+n_classes); for calibrated models W averages the fold coefficients per
+class. A batch is explained with one transform: the contribution of
+feature j to row i is X[i, j] * W[j, class_i], computed over the sparse
+nonzeros only.
+"""
+
+import threading
+
+import numpy as np
+
+from . import inference
 from .cleaner import clean_transaction
-import joblib, os
-BASE = os.path.dirname(__file__)
-MODEL_PATH = os.path.join(BASE, "model.pkl")
-VECT_PATH = os.path.join(BASE, "vectorizer.pkl")
+from .export import ExportedModel, ExportedVectorizer, linear_params
 
-def explain_prediction(text: str, top_k: int = 5):
+
+def _class_weights(model):
+    """
+    Return (classes, W) with W[:, c] the mean linear weight for class c.
+    """
+    if isinstance(model, ExportedModel):
+        classes, coef, col_class = model.classes_, model.coef, model.col_class
+    else:
+        p = linear_params(model)
+        classes, coef, col_class = p["classes"], p["coef"], p["col_class"]
+    coef = np.asarray(coef, dtype=np.float64)
+    k = len(classes)
+
+    if k == 2:
+        # every column scores the positive class
+        w1 = coef.mean(axis=1)
+        return np.asarray(classes), np.column_stack([-w1, w1])
+
+    counts = np.bincount(col_class, minlength=k).astype(np.float64)
+    counts[counts == 0] = 1.0
+    avg = np.zeros((len(col_class), k))
+    avg[np.arange(len(col_class)), col_class] = 1.0 / counts[col_class]
+    return np.asarray(classes), np.ascontiguousarray(coef @ avg)
+
+
+def _feature_names(vectorizer):
+    """
+    Return an index -> n-gram array, or None when columns are hashed.
+    """
+    if isinstance(vectorizer, ExportedVectorizer):
+        names = np.empty(vectorizer.n_features, dtype=vectorizer.terms.dtype)
+        names[np.asarray(vectorizer.term_index)] = vectorizer.terms
+        return names
+    if hasattr(vectorizer, "get_feature_names_out"):
+        return np.asarray(vectorizer.get_feature_names_out())
+    return None
+
+
+class Explainer:
+    """
+    Batch explanations for one (model, vectorizer) pair.
+    """
+
+    def __init__(self, model, vectorizer):
+        self.model = model
+        self.vectorizer = vectorizer
+        self.classes, self.weights = _class_weights(model)
+        self.class_index = {c: i for i, c in enumerate(self.classes)}
+        self.feature_names = _feature_names(vectorizer)
+        self._analyzer = None
+        if self.feature_names is None:
+            from sklearn.utils import murmurhash3_32
+            self._analyzer = vectorizer.hasher.build_analyzer()
+            self._hash = lambda g: abs(murmurhash3_32(g, positive=False)) % vectorizer.n_features
+
+    def _hashed_names(self, cleaned, cols):
+        # hashed columns have no stored name: recover them from this row's own n-grams
+        wanted = set(cols)
+        names = {}
+        for g in self._analyzer(cleaned):
+            c = self._hash(g)
+            if c in wanted and c not in names:
+                names[c] = g
+        return [names.get(c, "#{}".format(c)) for c in cols]
+
+    def explain_many(self, cleaned_texts, top_k=5, tags=None):
+        """
+        Return, per cleaned text, up to `top_k` (feature, contribution) pairs
+        for its predicted class (or for `tags[i]` when given), largest first.
+        Rows whose tag is not a model class get [].
+        """
+        cleaned_texts = list(cleaned_texts)
+        if not cleaned_texts:
+            return []
+        X = self.vectorizer.transform(cleaned_texts).tocsr()
+        if tags is None:
+            pred = np.argmax(self.model.predict_proba(X), axis=1)
+        else:
+            pred = np.array([self.class_index.get(t, -1) for t in tags], dtype=np.int64)
+
+        indptr = X.indptr
+        nnz_rows = np.repeat(np.arange(X.shape[0]), np.diff(indptr))
+        contrib = X.data * self.weights[X.indices, pred[nnz_rows]]
+        # sort by contribution (descending) inside each row's segment
+        order = np.lexsort((-contrib, nnz_rows))
+
+        out = []
+        for i, cleaned in enumerate(cleaned_texts):
+            if pred[i] < 0:
+                out.append([])
+                continue
+            top = order[indptr[i]:min(indptr[i] + top_k, indptr[i + 1])]
+            cols = X.indices[top]
+            if self.feature_names is not None:
+                names = self.feature_names[cols].tolist()
+            else:
+                names = self._hashed_names(cleaned, cols.tolist())
+            out.append(list(zip(names, contrib[top].tolist())))
+        return out
+
+
+# one Explainer per inference snapshot version
+_EXPLAINER = (None, None)
+_explainer_lock = threading.Lock()
+
+
+def get_explainer():
+    """
+    Return the Explainer for the current inference snapshot, building it on first use.
+    """
+    global _EXPLAINER
+    snap = inference._load()
+    version, explainer = _EXPLAINER
+    if version != snap.version:
+        with _explainer_lock:
+            version, explainer = _EXPLAINER
+            if version != snap.version:
+                explainer = Explainer(snap.model, snap.vectorizer)
+                _EXPLAINER = (snap.version, explainer)
+    return explainer
+
+
+def explain_predictions(texts, top_k=5):
+    """
+    Explain a batch of raw transaction strings; returns one list per text.
+    """
     try:
-        model = joblib.load(MODEL_PATH)
-        vectorizer = joblib.load(VECT_PATH)
+        explainer = get_explainer()
     except Exception:
-        return []
-    cleaned = clean_transaction(text)
-    vec = vectorizer.transform([cleaned])
-    if hasattr(model, 'coef_'):
-        pred = model.predict(vec)[0]
-        idx = list(model.classes_).index(pred)
-        feature_names = vectorizer.get_feature_names_out()
-        coefs = model.coef_[idx]
-        nz = vec.nonzero()[1]
-        word_weights = [(feature_names[i], float(coefs[i])) for i in nz]
-        word_weights = sorted(word_weights, key=lambda x: x[1], reverse=True)
-        return word_weights[:top_k]
-    return []
+        return [[] for _ in texts]
+    return explainer.explain_many([clean_transaction(t) for t in texts], top_k=top_k)
+
+
+def explain_prediction(text: str, top_k: int = 5):
+    return explain_predictions([text], top_k=top_k)[0]
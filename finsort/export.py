@@ -0,0 +1,497 @@
+# finsort/export.py
+"""
+Export a trained model + vectorizer to plain NumPy arrays.
+
+The export directory holds one .npy file per array plus meta.json:
+    terms      sorted vocabulary n-grams (fixed-width unicode), binary-searched
+    term_index column index of each sorted term
+    idf        idf weights per column
+    coef       (n_features, n_columns) weights of every fold/class column
+    intercept, calib_a, calib_b, col_member, col_class   per column
+
+Arrays are loaded with mmap_mode="r", so cold start is a few page maps
+instead of unpickling sklearn objects, and worker processes share the
+same physical pages. ExportedVectorizer / ExportedModel reproduce
+TfidfVectorizer.transform and (calibrated) LogisticRegression.predict_proba
+with NumPy/SciPy only.
+
+With --collapse the calibrated folds are compiled into a single linear
+scorer (see collapse_params) and written to finsort/export_linear; a
+parity report against a labelled CSV is printed.
+
+Usage:
+    python -m finsort.export [--model finsort/model.pkl] [--vectorizer finsort/vectorizer.pkl] [--out finsort/export]
+    python -m finsort.export --collapse [--report data/finsort_test.csv]
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import argparse
+import numpy as np
+
+BASE = os.path.dirname(__file__)
+DEFAULT_EXPORT_DIR = os.path.join(BASE, "export")
+DEFAULT_LINEAR_DIR = os.path.join(BASE, "export_linear")
+DEFAULT_ONLINE_DIR = os.path.join(BASE, "export_online")
+FORMAT_VERSION = 1
+
+_WHITE_SPACES = re.compile(r"\s\s+")
+
+
+# ---- Reading linear parameters out of sklearn models ----
+
+def _calibrated_members(cc, n_classes):
+    """
+    Yield (coef, intercept, class positions, calib_a, calib_b) per calibrated fold.
+    """
+    all_classes = np.asarray(cc.classes_)
+    for member in cc.calibrated_classifiers_:
+        est = getattr(member, "estimator", None)
+        if est is None:
+            est = member.base_estimator  # scikit-learn < 1.2
+        if getattr(member, "method", "sigmoid") != "sigmoid":
+            raise ValueError("only sigmoid calibration can be exported")
+        coef = np.asarray(est.coef_, dtype=np.float64)
+        intercept = np.asarray(est.intercept_, dtype=np.float64)
+        if n_classes == 2:
+            # binary: one decision column, calibrated as the positive class
+            pos = np.array([1])
+        else:
+            pos = np.searchsorted(all_classes, np.asarray(est.classes_))
+        a = np.array([c.a_ for c in member.calibrators], dtype=np.float64)
+        b = np.array([c.b_ for c in member.calibrators], dtype=np.float64)
+        yield coef, intercept, pos, a, b
+
+
+def linear_params(model):
+    """
+    Flatten a supported classifier into per-column linear parameters.
+
+    Supports LogisticRegression, SGDClassifier(loss="log_loss"),
+    CalibratedClassifierCV(LogisticRegression, method="sigmoid") and
+    finsort.model.WrappedModel around any of them.
+    Returns a dict with kind ("logistic" or "calibrated_sigmoid"), classes
+    and arrays coef (F, C), intercept/calib_a/calib_b/col_member/col_class (C,).
+    """
+    classes = np.asarray(model.classes_)
+    inner = getattr(model, "model", model)
+    n_classes = len(classes)
+
+    if hasattr(inner, "calibrated_classifiers_"):
+        coefs, intercepts, pos, a, b, member_ids = [], [], [], [], [], []
+        for m, (coef, intercept, p, ca, cb) in enumerate(_calibrated_members(inner, n_classes)):
+            coefs.append(coef)
+            intercepts.append(intercept)
+            pos.append(p)
+            a.append(ca)
+            b.append(cb)
+            member_ids.append(np.full(len(p), m))
+        return {
+            "kind": "calibrated_sigmoid",
+            "classes": classes,
+            "n_members": len(coefs),
+            "coef": np.ascontiguousarray(np.vstack(coefs).T),
+            "intercept": np.concatenate(intercepts),
+            "calib_a": np.concatenate(a),
+            "calib_b": np.concatenate(b),
+            "col_member": np.concatenate(member_ids).astype(np.int32),
+            "col_class": np.concatenate(pos).astype(np.int32),
+        }
+
+    if hasattr(inner, "coef_") and getattr(inner, "loss", None) in ("log_loss", "log") and n_classes > 2:
+        # SGDClassifier(loss="log_loss"): one-vs-rest sigmoids normalized per row,
+        # i.e. a single "calibrated" member with identity calibration
+        coef = np.asarray(inner.coef_, dtype=np.float64)
+        return {
+            "kind": "calibrated_sigmoid",
+            "classes": classes,
+            "n_members": 1,
+            "coef": np.ascontiguousarray(coef.T),
+            "intercept": np.asarray(inner.intercept_, dtype=np.float64),
+            "calib_a": -np.ones(n_classes),
+            "calib_b": np.zeros(n_classes),
+            "col_member": np.zeros(n_classes, dtype=np.int32),
+            "col_class": np.arange(n_classes, dtype=np.int32),
+        }
+
+    if hasattr(inner, "coef_"):
+        coef = np.asarray(inner.coef_, dtype=np.float64)
+        ncols = coef.shape[0]
+        return {
+            "kind": "logistic",
+            "classes": classes,
+            "n_members": 1,
+            "coef": np.ascontiguousarray(coef.T),
+            "intercept": np.asarray(inner.intercept_, dtype=np.float64),
+            "calib_a": np.zeros(ncols),
+            "calib_b": np.zeros(ncols),
+            "col_member": np.zeros(ncols, dtype=np.int32),
+            "col_class": (np.array([1]) if n_classes == 2 else np.arange(ncols)).astype(np.int32),
+        }
+
+    raise ValueError("cannot export model of type {}".format(type(inner).__name__))
+
+
+def collapse_params(params):
+    """
+    Compile sigmoid-calibrated folds into one (F, k) linear scorer.
+
+    Each fold's calibrated logit -(a * (x.w + b0) + b) is linear in x, so the
+    mean calibrated logit per class over the folds is a single weight matrix.
+    Scoring is then one matmul + sigmoid + row normalization instead of one
+    per fold. This approximates (mean of sigmoids != sigmoid of mean) the
+    exact ensemble; see parity_report for how close it is.
+    """
+    if params["kind"] != "calibrated_sigmoid" or params["n_members"] == 1:
+        return params
+
+    n_classes = len(params["classes"])
+    binary = n_classes == 2
+    n_out = 1 if binary else n_classes
+    cols = params["col_class"] - 1 if binary else params["col_class"]
+    a, b = params["calib_a"], params["calib_b"]
+
+    # averaging matrix: output class t = mean over the fold columns j that score class t
+    counts = np.bincount(cols, minlength=n_out).astype(np.float64)
+    avg = np.zeros((len(cols), n_out))
+    avg[np.arange(len(cols)), cols] = 1.0 / counts[cols]
+    coef = params["coef"] @ (-a[:, None] * avg)
+    intercept = -(a * params["intercept"] + b) @ avg
+    # a class no fold ever saw gets ~zero probability
+    intercept[counts == 0] = -50.0
+
+    return {
+        "kind": "calibrated_sigmoid",
+        "classes": params["classes"],
+        "n_members": 1,
+        "collapsed": True,
+        "coef": np.ascontiguousarray(coef),
+        "intercept": intercept,
+        "calib_a": -np.ones(n_out),
+        "calib_b": np.zeros(n_out),
+        "col_member": np.zeros(n_out, dtype=np.int32),
+        "col_class": (np.array([1]) if binary else np.arange(n_out)).astype(np.int32),
+    }
+
+
+def _vectorizer_params(vectorizer):
+    """
+    Return (meta, arrays) describing a fitted TfidfVectorizer or HashedTfidfVectorizer.
+    """
+    if hasattr(vectorizer, "hasher"):
+        # hashed features: only the idf array is state; hashing itself is stateless
+        meta = {"type": "hashed", "params": dict(vectorizer.get_params(), ngram_range=list(vectorizer.ngram_range)),
+                "n_features": vectorizer.n_features}
+        return meta, {"idf": np.asarray(vectorizer.idf_, dtype=np.float64)}
+
+    p = vectorizer.get_params()
+    unsupported = [k for k in ("preprocessor", "tokenizer", "stop_words", "strip_accents")
+                   if p.get(k) is not None]
+    if unsupported or p.get("binary") or p.get("analyzer") not in ("char_wb", "char", "word"):
+        raise ValueError("cannot export vectorizer with settings: {}".format(unsupported or p.get("analyzer")))
+    if p["analyzer"] == "word" and p.get("token_pattern") is None:
+        raise ValueError("word analyzer needs a token_pattern")
+
+    vocab = vectorizer.vocabulary_
+    terms = np.array(sorted(vocab))
+    meta = {
+        "type": "tfidf",
+        "analyzer": p["analyzer"],
+        "ngram_range": list(p["ngram_range"]),
+        "lowercase": bool(p["lowercase"]),
+        "token_pattern": p.get("token_pattern"),
+        "norm": p.get("norm"),
+        "use_idf": bool(p.get("use_idf", True)),
+        "sublinear_tf": bool(p.get("sublinear_tf", False)),
+        "n_features": len(vocab),
+    }
+    arrays = {
+        "terms": terms,
+        "term_index": np.array([vocab[t] for t in terms], dtype=np.int32),
+    }
+    if meta["use_idf"]:
+        arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float64)
+    return meta, arrays
+
+
+def export_model(model, vectorizer, out_dir=DEFAULT_EXPORT_DIR, collapse=False):
+    """
+    Write model + vectorizer arrays to `out_dir` (collapse=True: single linear scorer).
+    Array files carry a per-export id and meta.json is replaced last, so
+    readers always see a complete, matching set.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    vmeta, arrays = _vectorizer_params(vectorizer)
+    params = linear_params(model)
+    if collapse:
+        params = collapse_params(params)
+    for name in ("coef", "intercept", "calib_a", "calib_b", "col_member", "col_class"):
+        arrays[name] = params[name]
+
+    export_id = uuid.uuid4().hex[:12]
+    files = {}
+    for name, arr in arrays.items():
+        fname = "{}.{}.npy".format(name, export_id)
+        np.save(os.path.join(out_dir, fname), arr)
+        files[name] = fname
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "export_id": export_id,
+        "kind": params["kind"],
+        "classes": [str(c) for c in params["classes"]],
+        "n_members": params["n_members"],
+        "collapsed": bool(params.get("collapsed", False)),
+        "vectorizer": vmeta,
+        "files": files,
+    }
+    meta_path = os.path.join(out_dir, "meta.json")
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+    # drop arrays from earlier exports (best effort: may still be mapped on Windows)
+    keep = set(files.values())
+    for fname in os.listdir(out_dir):
+        if fname.endswith(".npy") and fname not in keep:
+            try:
+                os.remove(os.path.join(out_dir, fname))
+            except OSError:
+                pass
+    return meta
+
+
+# ---- NumPy-only inference ----
+
+class ExportedVectorizer:
+    """
+    Reproduces TfidfVectorizer.transform from exported arrays.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.analyzer = meta["analyzer"]
+        self.min_n, self.max_n = meta["ngram_range"]
+        self.lowercase = meta["lowercase"]
+        self.norm = meta["norm"]
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.n_features = meta["n_features"]
+        self.terms = arrays["terms"]
+        self.term_index = arrays["term_index"]
+        self.idf = arrays.get("idf")
+        self._token_re = re.compile(meta["token_pattern"]) if meta.get("token_pattern") else None
+
+    def _char_wb_ngrams(self, text):
+        min_n, max_n = self.min_n, self.max_n
+        out = []
+        for w in _WHITE_SPACES.sub(" ", text).split():
+            w = " " + w + " "
+            w_len = len(w)
+            for n in range(min_n, max_n + 1):
+                offset = 0
+                out.append(w[offset:offset + n])
+                while offset + n < w_len:
+                    offset += 1
+                    out.append(w[offset:offset + n])
+                if offset == 0:  # a short word (w_len < n) is counted only once
+                    break
+        return out
+
+    def _char_ngrams(self, text):
+        text = _WHITE_SPACES.sub(" ", text)
+        text_len = len(text)
+        return [text[i:i + n]
+                for n in range(self.min_n, min(self.max_n + 1, text_len + 1))
+                for i in range(text_len - n + 1)]
+
+    def _word_ngrams(self, text):
+        tokens = self._token_re.findall(text)
+        if self.max_n == 1:
+            return tokens
+        out = list(tokens) if self.min_n == 1 else []
+        n_tok = len(tokens)
+        for n in range(max(self.min_n, 2), min(self.max_n + 1, n_tok + 1)):
+            out.extend(" ".join(tokens[i:i + n]) for i in range(n_tok - n + 1))
+        return out
+
+    def analyze(self, text):
+        text = text.lower() if self.lowercase else text
+        if self.analyzer == "char_wb":
+            return self._char_wb_ngrams(text)
+        if self.analyzer == "char":
+            return self._char_ngrams(text)
+        return self._word_ngrams(text)
+
+    def transform(self, texts):
+        from scipy.sparse import csr_matrix
+
+        grams, lengths = [], []
+        for t in texts:
+            g = self.analyze(t)
+            grams.extend(g)
+            lengths.append(len(g))
+        n_rows = len(lengths)
+        if not grams:
+            return csr_matrix((n_rows, self.n_features), dtype=np.float64)
+
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), lengths)
+        grams = np.array(grams)
+        pos = np.searchsorted(self.terms, grams)
+        pos[pos == len(self.terms)] = 0
+        found = self.terms[pos] == grams
+        rows = rows[found]
+        cols = self.term_index[pos[found]].astype(np.int64)
+
+        # term counts per (row, col); keys come back sorted by row then col
+        keys, counts = np.unique(rows * self.n_features + cols, return_counts=True)
+        rows, cols = keys // self.n_features, keys % self.n_features
+        data = counts.astype(np.float64)
+        if self.sublinear_tf:
+            data = np.log(data) + 1.0
+        if self.idf is not None:
+            data *= self.idf[cols]
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        if self.norm in ("l1", "l2"):
+            sq = np.abs(data) if self.norm == "l1" else data * data
+            sums = np.bincount(rows, weights=sq, minlength=n_rows)
+            norms = sums if self.norm == "l1" else np.sqrt(sums)
+            norms[norms == 0.0] = 1.0
+            data /= norms[rows]
+        return csr_matrix((data, cols, indptr), shape=(n_rows, self.n_features))
+
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class ExportedModel:
+    """
+    Reproduces (calibrated) LogisticRegression.predict_proba from exported arrays.
+    """
+
+    def __init__(self, meta, arrays):
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.classes_ = np.array(meta["classes"], dtype=object)
+        self.n_members = meta["n_members"]
+        self.coef = arrays["coef"]
+        self.intercept = arrays["intercept"]
+        self.calib_a = arrays["calib_a"]
+        self.calib_b = arrays["calib_b"]
+        self.col_member = arrays["col_member"]
+        self.col_class = arrays["col_class"]
+
+    def decision_function(self, X):
+        return np.asarray(X @ self.coef) + self.intercept
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        n, k = scores.shape[0], len(self.classes_)
+
+        if self.kind == "logistic":
+            if k == 2:
+                p1 = _expit(scores[:, 0])
+                return np.column_stack([1.0 - p1, p1])
+            scores = scores - scores.max(axis=1, keepdims=True)
+            np.exp(scores, out=scores)
+            scores /= scores.sum(axis=1, keepdims=True)
+            return scores
+
+        # sigmoid-calibrated one-vs-rest columns, normalized per fold, averaged over folds
+        cal = _expit(-(self.calib_a * scores + self.calib_b))
+        proba = np.zeros((n, self.n_members, k))
+        proba[:, self.col_member, self.col_class] = cal
+        if k == 2:
+            proba[:, :, 0] = 1.0 - proba[:, :, 1]
+        else:
+            denom = proba.sum(axis=2, keepdims=True)
+            proba = np.divide(proba, denom, out=np.full_like(proba, 1.0 / k), where=denom != 0)
+        proba[(1.0 < proba) & (proba <= 1.0 + 1e-5)] = 1.0
+        return proba.mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_exported(out_dir=DEFAULT_EXPORT_DIR, mmap=True):
+    """
+    Load an export written by export_model. Returns (model, vectorizer).
+    """
+    with open(os.path.join(out_dir, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError("unsupported export format: {}".format(meta.get("format")))
+    mode = "r" if mmap else None
+    arrays = {name: np.load(os.path.join(out_dir, fname), mmap_mode=mode)
+              for name, fname in meta["files"].items()}
+    vmeta = meta["vectorizer"]
+    if vmeta.get("type") == "hashed":
+        from .features import HashedTfidfVectorizer
+        vectorizer = HashedTfidfVectorizer.from_idf(vmeta["params"], arrays["idf"])
+    else:
+        vectorizer = ExportedVectorizer(vmeta, arrays)
+    return ExportedModel(meta, arrays), vectorizer
+
+
+def parity_report(reference, candidate, texts, labels):
+    """
+    Compare two (model, vectorizer) pairs on cleaned `texts` with true `labels`.
+    Returns accuracy of both, argmax agreement, probability differences and timings.
+    """
+    out = {"rows": len(texts)}
+    probs = {}
+    for name, (model, vectorizer) in (("reference", reference), ("candidate", candidate)):
+        start = time.perf_counter()
+        p = np.asarray(model.predict_proba(vectorizer.transform(texts)))
+        out[name + "_seconds"] = time.perf_counter() - start
+        pred = np.asarray(model.classes_)[np.argmax(p, axis=1)]
+        out[name + "_accuracy"] = float(np.mean(pred.astype(str) == np.asarray(labels, dtype=str)))
+        probs[name] = (p, pred)
+    (p_ref, pred_ref), (p_cand, pred_cand) = probs["reference"], probs["candidate"]
+    out["argmax_agreement"] = float(np.mean(pred_ref.astype(str) == pred_cand.astype(str)))
+    top_ref, top_cand = p_ref.max(axis=1), p_cand.max(axis=1)
+    out["max_abs_confidence_diff"] = float(np.max(np.abs(top_ref - top_cand))) if len(texts) else 0.0
+    out["mean_abs_confidence_diff"] = float(np.mean(np.abs(top_ref - top_cand))) if len(texts) else 0.0
+    return out
+
+
+def main(argv=None):
+    import joblib
+
+    ap = argparse.ArgumentParser(prog="python -m finsort.export", description="Export model arrays for fast loading.")
+    ap.add_argument("--model", default=os.path.join(BASE, "model.pkl"))
+    ap.add_argument("--vectorizer", default=os.path.join(BASE, "vectorizer.pkl"))
+    ap.add_argument("--out", default=None, help="output dir (default: finsort/export, or finsort/export_linear with --collapse)")
+    ap.add_argument("--collapse", action="store_true", help="compile calibrated folds into one linear scorer")
+    ap.add_argument("--report", default=os.path.join(BASE, "..", "data", "finsort_test.csv"),
+                    help="labelled CSV (transaction, tag) for the parity report; '' to skip")
+    args = ap.parse_args(argv)
+    out_dir = args.out or (DEFAULT_LINEAR_DIR if args.collapse else DEFAULT_EXPORT_DIR)
+
+    model, vectorizer = joblib.load(args.model), joblib.load(args.vectorizer)
+    meta = export_model(model, vectorizer, out_dir, collapse=args.collapse)
+    print("Exported {} model ({} classes, {} {} features{}) -> {}".format(
+        meta["kind"], len(meta["classes"]), meta["vectorizer"]["n_features"], meta["vectorizer"]["type"],
+        ", collapsed" if meta["collapsed"] else "", out_dir))
+
+    if args.report and os.path.exists(args.report):
+        import pandas as pd
+        from .cleaner import clean_transaction
+
+        df = pd.read_csv(args.report)
+        label_col = "tag" if "tag" in df.columns else df.columns[-1]
+        texts = [clean_transaction(t) for t in df["transaction"].astype(str)]
+        report = parity_report((model, vectorizer), load_exported(out_dir), texts, df[label_col].astype(str))
+        print("Parity vs pickled model on {} ({} rows):".format(os.path.basename(args.report), report["rows"]))
+        for key in ("reference_accuracy", "candidate_accuracy", "argmax_agreement",
+                    "max_abs_confidence_diff", "mean_abs_confidence_diff", "reference_seconds", "candidate_seconds"):
+            print("  {:<26} {:.6f}".format(key, report[key]))
+
+
+if __name__ == "__main__":
+    main()
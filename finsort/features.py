@@ -0,0 +1,112 @@
+# finsort/features.py
+# Hashed TF-IDF featurizer: char n-grams without a vocabulary dict.
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_N_FEATURES = 2 ** 16
+
+
+class HashedTfidfVectorizer:
+    """
+    Stateless hashed char n-gram featurizer with a precomputed IDF array.
+
+    Stands in for TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5)):
+    n-grams are hashed into `n_features` columns, so no vocabulary dict is
+    built or kept, and the only fitted state is one float array of IDF
+    weights (smooth idf, as TfidfTransformer computes it). partial_fit
+    accumulates document frequencies chunk by chunk, so fitting can stream
+    over data that does not fit in memory.
+    """
+
+    def __init__(self, analyzer="char_wb", ngram_range=(3, 5), n_features=DEFAULT_N_FEATURES,
+                 lowercase=True, norm="l2", sublinear_tf=False):
+        self.analyzer = analyzer
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = int(n_features)
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self.df_ = np.zeros(self.n_features, dtype=np.int64)
+        self.n_docs_ = 0
+        self.idf_ = None
+        self._hasher = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_hasher"] = None  # rebuilt on demand; nothing fitted in it
+        return state
+
+    @property
+    def hasher(self):
+        if self._hasher is None:
+            self._hasher = HashingVectorizer(
+                analyzer=self.analyzer, ngram_range=self.ngram_range, n_features=self.n_features,
+                lowercase=self.lowercase, alternate_sign=False, norm=None,
+            )
+        return self._hasher
+
+    def get_params(self, deep=True):
+        return {"analyzer": self.analyzer, "ngram_range": self.ngram_range, "n_features": self.n_features,
+                "lowercase": self.lowercase, "norm": self.norm, "sublinear_tf": self.sublinear_tf}
+
+    def partial_fit(self, texts):
+        """
+        Add a chunk of documents to the document-frequency counts and refresh idf_.
+        """
+        texts = list(texts)
+        if texts:  # HashingVectorizer cannot transform an empty chunk
+            counts = self.hasher.transform(texts)
+            self.df_ += np.bincount(counts.indices, minlength=self.n_features)
+            self.n_docs_ += counts.shape[0]
+        self.idf_ = np.log((1.0 + self.n_docs_) / (1.0 + self.df_)) + 1.0
+        return self
+
+    def fit(self, texts, chunk_size=10000):
+        """
+        Fit idf_ from an iterable of texts, reading `chunk_size` at a time.
+        """
+        self.df_ = np.zeros(self.n_features, dtype=np.int64)
+        self.n_docs_ = 0
+        self.idf_ = None
+        chunk = []
+        for t in texts:
+            chunk.append(t)
+            if len(chunk) >= chunk_size:
+                self.partial_fit(chunk)
+                chunk = []
+        if chunk or self.idf_ is None:
+            self.partial_fit(chunk)
+        return self
+
+    def transform(self, texts):
+        if self.idf_ is None:
+            raise ValueError("HashedTfidfVectorizer is not fitted")
+        return self._weight(self.hasher.transform(texts))
+
+    def _weight(self, X):
+        if self.sublinear_tf:
+            np.log(X.data, out=X.data)
+            X.data += 1.0
+        X.data *= self.idf_[X.indices]
+        if self.norm:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+    def fit_transform(self, texts):
+        # one hashing pass: counts feed both the df update and the output
+        counts = self.hasher.transform(list(texts))
+        self.df_ = np.bincount(counts.indices, minlength=self.n_features).astype(np.int64)
+        self.n_docs_ = counts.shape[0]
+        self.idf_ = np.log((1.0 + self.n_docs_) / (1.0 + self.df_)) + 1.0
+        return self._weight(counts.astype(np.float64))
+
+    @classmethod
+    def from_idf(cls, params, idf):
+        """
+        Rebuild a fitted featurizer from its params and an (optionally mmap'ed) idf array.
+        """
+        vect = cls(**params)
+        vect.idf_ = idf
+        return vect
@@ -0,0 +1,447 @@
+# finsort/feedback.py
+"""
+Append-only, crash-safe feedback store.
+
+Every correction is one event with a single schema (EVENT_FIELDS), stored
+as a JSON line. A store directory holds:
+    MANIFEST.json   {"format": 1, "segments": [{"name": ..., "base": ...}, ...]}
+    <name>.log      events, one JSON object per line
+    <name>.idx      committed events as little-endian uint64 pairs (offset, end byte)
+    .lock           flock'ed by writers and compaction
+
+Offsets are store-wide event numbers. An append writes the log lines
+first and the index entries second. An event only exists once its index
+entry does, so a crash mid-append leaves at most an unindexed tail; the
+next writer truncates it. Readers seek straight to an offset through the
+index and only read committed bytes. Appends from several threads or
+processes serialize on the lock file. FeedbackWriter batches events so
+one lock, one write and one fsync cover a whole group.
+
+compact() keeps only the latest correction per cleaned text. It writes
+the survivors, with their original offsets, into a new segment, swaps the
+manifest and then deletes the old files.
+
+Usage:
+    python -m finsort.feedback stats
+    python -m finsort.feedback compact
+    python -m finsort.feedback import-legacy [--log finsort/feedback.log]
+"""
+
+import os
+import json
+import time
+import uuid
+import argparse
+import threading
+
+import numpy as np
+
+from .cleaner import clean_transaction
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer process assumed
+    fcntl = None
+
+BASE = os.path.dirname(__file__)
+DEFAULT_STORE_DIR = os.path.join(BASE, "feedback")
+LEGACY_LOG = os.path.join(BASE, "feedback.log")
+FORMAT_VERSION = 1
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+
+EVENT_FIELDS = ("ts", "raw", "cleaned", "predicted_tag", "predicted_category",
+                "confidence", "corrected", "source")
+
+_MANIFEST = "MANIFEST.json"
+_IDX_DTYPE = np.dtype("<u8")
+
+
+def make_event(raw, corrected, predicted_tag=None, predicted_category=None, confidence=None,
+               source=None, ts=None, cleaned=None):
+    """
+    Build a feedback event. `corrected` is the user's tag or category.
+    """
+    return {
+        "ts": time.time() if ts is None else float(ts),
+        "raw": str(raw),
+        "cleaned": clean_transaction(raw) if cleaned is None else cleaned,
+        "predicted_tag": predicted_tag,
+        "predicted_category": predicted_category,
+        "confidence": None if confidence is None else float(confidence),
+        "corrected": str(corrected),
+        "source": source,
+    }
+
+
+class DirLock:
+    """
+    Exclusive advisory lock on `directory`/.lock. Each holder opens its own
+    file description, so the flock serializes threads as well as processes.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, ".lock")
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self.path, "a")
+        if fcntl is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+        self._fh.close()
+
+
+def _fsync_write(path, data, fsync):
+    with open(path, "ab") as f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+
+
+class FeedbackStore:
+    """
+    Segmented feedback log in `path` (see module docstring).
+    """
+
+    def __init__(self, path=DEFAULT_STORE_DIR, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync=True):
+        self.path = path
+        self.segment_bytes = int(segment_bytes)
+        self.fsync = fsync
+        os.makedirs(path, exist_ok=True)
+
+    # ---- manifest and segment files ----
+
+    def _file(self, name, ext):
+        return os.path.join(self.path, name + ext)
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, _MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return {"format": FORMAT_VERSION, "segments": []}
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError("unsupported feedback store format: {}".format(manifest.get("format")))
+        return manifest
+
+    def _write_manifest(self, manifest):
+        path = os.path.join(self.path, _MANIFEST)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _new_segment(self, manifest, base):
+        name = "{:020d}-{}".format(base, uuid.uuid4().hex[:8])
+        open(self._file(name, ".log"), "ab").close()
+        open(self._file(name, ".idx"), "ab").close()
+        manifest["segments"].append({"name": name, "base": base})
+        self._write_manifest(manifest)
+        return manifest["segments"][-1]
+
+    def _index(self, name):
+        """
+        (offsets, ends) of a segment's committed events; a torn last entry is ignored.
+        """
+        raw = np.fromfile(self._file(name, ".idx"), dtype=np.uint8)
+        pairs = raw[:len(raw) - len(raw) % 16].view(_IDX_DTYPE).reshape(-1, 2)
+        return pairs[:, 0], pairs[:, 1]
+
+    def _last_entry(self, name):
+        """
+        (offset, end) of a segment's last index entry, reading only its 16
+        bytes; None for an empty index, or one with a torn entry (size not a
+        multiple of 16).
+        """
+        idx_path = self._file(name, ".idx")
+        size = os.path.getsize(idx_path)
+        if size == 0 or size % 16:
+            return None
+        with open(idx_path, "rb") as f:
+            f.seek(size - 16)
+            offset, end = np.frombuffer(f.read(16), dtype=_IDX_DTYPE)
+        return int(offset), int(end)
+
+    def _tail(self, seg):
+        """
+        (next offset, log size) of the active segment (call under the lock).
+        A clean segment's last index entry ends exactly at the log size,
+        which costs one 16-byte read and two stats. Anything else goes
+        through the full _recover.
+        """
+        idx_size = os.path.getsize(self._file(seg["name"], ".idx"))
+        log_size = os.path.getsize(self._file(seg["name"], ".log"))
+        if idx_size == 0 and log_size == 0:
+            return seg["base"], 0
+        last = self._last_entry(seg["name"])
+        if last is not None and last[1] == log_size:
+            return last[0] + 1, log_size
+        return self._recover(seg)
+
+    def _recover(self, seg):
+        """
+        Make the active segment consistent after a crash (call under the lock):
+        drop torn or dangling index entries, then any unindexed log tail.
+        Returns (next offset, log size).
+        """
+        log_path, idx_path = self._file(seg["name"], ".log"), self._file(seg["name"], ".idx")
+        offsets, ends = self._index(seg["name"])
+        log_size = os.path.getsize(log_path)
+        keep = int(np.searchsorted(ends, log_size, side="right"))
+        if keep * 16 != os.path.getsize(idx_path):
+            with open(idx_path, "r+b") as f:
+                f.truncate(keep * 16)
+        end = int(ends[keep - 1]) if keep else 0
+        if log_size != end:
+            with open(log_path, "r+b") as f:
+                f.truncate(end)
+        next_offset = int(offsets[keep - 1]) + 1 if keep else seg["base"]
+        return next_offset, end
+
+    # ---- writing ----
+
+    def append_many(self, events):
+        """
+        Durably append events as one group commit. Returns the first offset.
+        """
+        lines = [(json.dumps({k: e.get(k) for k in EVENT_FIELDS}, ensure_ascii=False) + "\n").encode("utf-8")
+                 for e in events]
+        if not lines:
+            return self.end_offset()
+        with DirLock(self.path):
+            manifest = self._read_manifest()
+            seg = manifest["segments"][-1] if manifest["segments"] else self._new_segment(manifest, 0)
+            first, size = self._tail(seg)
+            if size >= self.segment_bytes:
+                seg = self._new_segment(manifest, first)
+                size = 0
+
+            ends = size + np.cumsum([len(line) for line in lines], dtype=np.uint64)
+            index = np.empty((len(lines), 2), dtype=_IDX_DTYPE)
+            index[:, 0] = np.arange(first, first + len(lines), dtype=np.uint64)
+            index[:, 1] = ends
+            _fsync_write(self._file(seg["name"], ".log"), b"".join(lines), self.fsync)
+            _fsync_write(self._file(seg["name"], ".idx"), index.tobytes(), self.fsync)
+        return first
+
+    def append(self, event):
+        return self.append_many([event])
+
+    # ---- reading ----
+
+    def end_offset(self):
+        """
+        Offset the next appended event will get.
+        """
+        manifest = self._read_manifest()
+        for seg in reversed(manifest["segments"]):
+            last = self._last_entry(seg["name"])
+            if last is None:
+                offsets, _ = self._index(seg["name"])  # empty, or a torn entry to skip
+                last = (int(offsets[-1]), None) if len(offsets) else None
+            if last is not None:
+                return last[0] + 1
+        return manifest["segments"][-1]["base"] if manifest["segments"] else 0
+
+    def read(self, from_offset=0):
+        """
+        Yield (offset, event) for committed events with offset >= from_offset, in order.
+        """
+        for attempt in range(3):
+            try:
+                for offset, event in self._read(from_offset):
+                    from_offset = offset + 1
+                    yield offset, event
+                return
+            except FileNotFoundError:
+                # a compaction replaced the segments under us: resume from the last offset seen
+                if attempt == 2:
+                    raise
+
+    def _read(self, from_offset):
+        segments = self._read_manifest()["segments"]
+        for i, seg in enumerate(segments):
+            if i + 1 < len(segments) and segments[i + 1]["base"] <= from_offset:
+                continue
+            offsets, ends = self._index(seg["name"])
+            start = int(np.searchsorted(offsets, from_offset))
+            if start == len(offsets):
+                continue
+            begin = int(ends[start - 1]) if start else 0
+            with open(self._file(seg["name"], ".log"), "rb") as f:
+                f.seek(begin)
+                data = f.read(int(ends[-1]) - begin)
+            for offset, line in zip(offsets[start:].tolist(), data.splitlines()):
+                yield offset, json.loads(line)
+
+    def stats(self):
+        manifest = self._read_manifest()
+        events = sum(len(self._index(s["name"])[0]) for s in manifest["segments"])
+        size = sum(os.path.getsize(self._file(s["name"], ".log")) for s in manifest["segments"])
+        return {"segments": len(manifest["segments"]), "events": events, "bytes": size,
+                "end_offset": self.end_offset()}
+
+    # ---- compaction ----
+
+    def compact(self):
+        """
+        Replace all sealed segments by one holding only the latest event per
+        cleaned text (original offsets kept). The active segment is sealed
+        first, so new appends go to a fresh segment. Returns a summary dict.
+        """
+        with DirLock(self.path):
+            manifest = self._read_manifest()
+            if not manifest["segments"]:
+                return {"before": 0, "after": 0}
+            next_offset, size = self._recover(manifest["segments"][-1])
+            if size:
+                self._new_segment(manifest, next_offset)
+            sealed, active = manifest["segments"][:-1], manifest["segments"][-1]
+            if not sealed:
+                return {"before": 0, "after": 0}
+
+            latest, before = {}, 0
+            for offset, event in self._read(0):
+                if offset >= active["base"]:
+                    break
+                before += 1
+                latest[event.get("cleaned") or clean_transaction(event.get("raw", ""))] = offset, event
+            survivors = sorted(latest.values(), key=lambda oe: oe[0])
+
+            name = "{:020d}-{}".format(survivors[0][0] if survivors else active["base"], uuid.uuid4().hex[:8])
+            lines = [(json.dumps(e, ensure_ascii=False) + "\n").encode("utf-8") for _, e in survivors]
+            index = np.empty((len(lines), 2), dtype=_IDX_DTYPE)
+            index[:, 0] = [o for o, _ in survivors]
+            index[:, 1] = np.cumsum([len(line) for line in lines], dtype=np.uint64)
+            _fsync_write(self._file(name, ".log"), b"".join(lines), self.fsync)
+            _fsync_write(self._file(name, ".idx"), index.tobytes(), self.fsync)
+
+            self._write_manifest({"format": FORMAT_VERSION,
+                                  "segments": [{"name": name, "base": sealed[0]["base"]}, active]})
+            for seg in sealed:
+                for ext in (".log", ".idx"):
+                    try:
+                        os.remove(self._file(seg["name"], ext))
+                    except OSError:
+                        pass
+        return {"before": before, "after": len(survivors)}
+
+
+class FeedbackWriter:
+    """
+    Group-commit buffer in front of a FeedbackStore, safe to share between threads.
+    Buffered events are committed once `max_batch` are waiting or the oldest is
+    `max_delay` seconds old (checked on add), and on flush()/close().
+    """
+
+    def __init__(self, store=None, max_batch=256, max_delay=0.05):
+        self.store = store or FeedbackStore()
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = float(max_delay)
+        self._buffer = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def add(self, event):
+        with self._lock:
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(event)
+            due = len(self._buffer) >= self.max_batch or time.monotonic() - self._oldest >= self.max_delay
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            if events:
+                self.store.append_many(events)
+
+    close = flush
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record_feedback(raw, corrected, store_dir=DEFAULT_STORE_DIR, **fields):
+    """
+    Append one correction to the store at `store_dir` and return its offset.
+    """
+    return FeedbackStore(store_dir).append(make_event(raw, corrected, **fields))
+
+
+# ---- Legacy feedback.log (mixed JSON / `text,correct` lines) ----
+
+def parse_legacy_line(line):
+    """
+    Return an event from one old feedback.log line, or None.
+    Accepts the Streamlit JSON lines and the CLI demo's `text,correct` lines.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            e = json.loads(line)
+        except ValueError:
+            return None
+        raw = e.get("raw") or e.get("transaction")
+        corrected = e.get("corrected_tag") or e.get("corrected_category")
+        if not raw or not corrected:
+            return None
+        return make_event(raw, corrected, predicted_tag=e.get("predicted_tag"),
+                          predicted_category=e.get("predicted_category"), confidence=e.get("confidence"),
+                          source="streamlit", cleaned=e.get("cleaned"))
+    raw, _, corrected = line.rpartition(",")
+    if not raw or not corrected.strip():
+        return None
+    return make_event(raw, corrected.strip(), source="cli")
+
+
+def import_legacy_log(log_path=LEGACY_LOG, store=None):
+    """
+    Copy a legacy feedback.log into the store. Returns (imported, skipped).
+    """
+    store = store or FeedbackStore()
+    events, skipped = [], 0
+    with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            event = parse_legacy_line(line)
+            if event is None:
+                skipped += bool(line.strip())
+            else:
+                events.append(event)
+    store.append_many(events)
+    return len(events), skipped
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.feedback", description="Feedback store maintenance.")
+    ap.add_argument("cmd", choices=["stats", "compact", "import-legacy"])
+    ap.add_argument("--store", default=DEFAULT_STORE_DIR)
+    ap.add_argument("--log", default=LEGACY_LOG, help="legacy log for import-legacy")
+    args = ap.parse_args(argv)
+
+    store = FeedbackStore(args.store)
+    if args.cmd == "compact":
+        print(json.dumps(store.compact()))
+    elif args.cmd == "import-legacy":
+        imported, skipped = import_legacy_log(args.log, store)
+        print(json.dumps({"imported": imported, "skipped": skipped}))
+    print(json.dumps(store.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+# finsort/fingerprint.py
+"""
+Fingerprint index: exact-match labels for cleaned descriptors seen before.
+
+Every cleaned text in the labelled data (training CSVs plus confirmed
+feedback corrections) is hashed to 64 bits. The index stores the sorted
+hashes and a label id per hash as two .npy arrays plus meta.json (label
+names, sources, counts), and they are memory-mapped on load, so a lookup
+is one binary search over a shared read-only array and no text is kept in
+memory. finsort.inference consults it between rule_override and the ML
+model: a repeat merchant returns without vectorizing.
+
+A cleaned text whose training labels disagree (less than `min_agreement`
+of its rows share one label) is left out and goes to the model. Feedback
+overrides training data, and the latest correction for a text wins. With
+64-bit hashes a collision between distinct texts is negligible at these
+sizes (~n^2 / 2^65).
+
+Usage:
+    python -m finsort.fingerprint build [--csv data/finsort_dataset.csv ...] [--store finsort/feedback]
+    python -m finsort.fingerprint stats [--eval data/finsort_test.csv]
+"""
+
+import os
+import json
+import uuid
+import hashlib
+import argparse
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from .cleaner import clean_transaction, CLEANER_VERSION
+
+BASE = os.path.dirname(__file__)
+DEFAULT_INDEX_DIR = os.path.join(BASE, "fingerprints")
+DEFAULT_SOURCES = [os.path.join(os.path.dirname(BASE), "data", "finsort_dataset.csv")]
+CONFIG_PATH = os.path.join(BASE, "config.json")
+FORMAT_VERSION = 1
+# confidence reported for an index hit: an exact, confirmed label, just below a merchant rule
+INDEX_CONFIDENCE = 0.98
+
+
+def fingerprint(cleaned):
+    """
+    64-bit fingerprint of a cleaned text.
+    """
+    return int.from_bytes(hashlib.blake2b(cleaned.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def fingerprints(cleaned_texts):
+    return np.fromiter((fingerprint(t) for t in cleaned_texts), dtype=np.uint64, count=len(cleaned_texts))
+
+
+class FingerprintIndex:
+    """
+    Sorted uint64 fingerprints -> label ids. Counts lookups and hits.
+    """
+
+    def __init__(self, hashes, label_ids, labels, meta=None):
+        self.hashes = hashes
+        self.label_ids = label_ids
+        self.labels = list(labels)
+        self._labels = np.asarray(self.labels, dtype=object)
+        self.meta = meta or {}
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def _find(self, keys):
+        pos = np.searchsorted(self.hashes, keys)
+        pos[pos == len(self.hashes)] = 0
+        found = (self.hashes[pos] == keys) if len(self.hashes) else np.zeros(len(keys), dtype=bool)
+        return pos, found
+
+    def lookup(self, cleaned):
+        """
+        Label of `cleaned`, or None if it is not in the index.
+        """
+        key = fingerprint(cleaned)
+        i = int(np.searchsorted(self.hashes, key))
+        hit = i < len(self.hashes) and int(self.hashes[i]) == key
+        with self._lock:
+            self.lookups += 1
+            self.hits += hit
+        return self.labels[self.label_ids[i]] if hit else None
+
+    def lookup_many(self, cleaned_texts):
+        """
+        Object array of labels (None where not indexed), one per text.
+        """
+        out = np.full(len(cleaned_texts), None, dtype=object)
+        if len(cleaned_texts):
+            pos, found = self._find(fingerprints(cleaned_texts))
+            out[found] = self._labels[np.asarray(self.label_ids[pos[found]], dtype=np.intp)]
+            with self._lock:
+                self.lookups += len(cleaned_texts)
+                self.hits += int(found.sum())
+        return out
+
+    def info(self):
+        with self._lock:
+            lookups, hits = self.lookups, self.hits
+        return {
+            "entries": len(self),
+            "labels": len(self.labels),
+            "lookups": lookups,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+
+# ---- Building ----
+
+def collect_labels(csv_paths=(), store_dir=None, category_map=None, min_agreement=0.9):
+    """
+    {cleaned text: tag} from labelled CSVs and feedback corrections.
+    Feedback is resolved to tags known from the CSVs (or the category map).
+    """
+    from .frame import clean_series
+    from .pipeline import load_training_data
+    from .online import resolve_tag
+
+    votes = defaultdict(Counter)
+    for path in csv_paths:
+        texts, labels = load_training_data(path, category_map)
+        for cleaned, label in zip(clean_series(texts), labels):
+            votes[cleaned][label] += 1
+
+    out = {}
+    for cleaned, counts in votes.items():
+        label, n = counts.most_common(1)[0]
+        if cleaned and n >= min_agreement * sum(counts.values()):
+            out[cleaned] = label
+
+    if store_dir:
+        from .feedback import FeedbackStore
+
+        known = {label for counts in votes.values() for label in counts} | set(category_map or {})
+        for _, event in FeedbackStore(store_dir).read(0):
+            cleaned = event.get("cleaned") or clean_transaction(event.get("raw"))
+            tag = resolve_tag(event.get("corrected"), known, category_map or {})
+            if cleaned and tag is not None:
+                out[cleaned] = tag
+    return out
+
+
+def build_index(mapping, out_dir=DEFAULT_INDEX_DIR, sources=()):
+    """
+    Write {cleaned text: label} as an index in `out_dir`. Array files carry a
+    per-build id and meta.json is replaced last, so readers always see a
+    complete, matching set. Returns the meta dict.
+    """
+    labels = sorted(set(mapping.values()))
+    label_id = {label: i for i, label in enumerate(labels)}
+    texts = list(mapping)
+    hashes = fingerprints(texts)
+    ids = np.fromiter((label_id[mapping[t]] for t in texts), dtype=np.uint16, count=len(texts))
+    order = np.argsort(hashes, kind="stable")
+    hashes, ids = hashes[order], ids[order]
+    # a (practically impossible) 64-bit collision: keep neither entry
+    dup = np.zeros(len(hashes), dtype=bool)
+    if len(hashes) > 1:
+        same = hashes[1:] == hashes[:-1]
+        dup[1:] |= same
+        dup[:-1] |= same
+    hashes, ids = hashes[~dup], ids[~dup]
+
+    os.makedirs(out_dir, exist_ok=True)
+    build_id = uuid.uuid4().hex[:12]
+    files = {"hashes": "hashes.{}.npy".format(build_id), "labels": "labels.{}.npy".format(build_id)}
+    np.save(os.path.join(out_dir, files["hashes"]), hashes)
+    np.save(os.path.join(out_dir, files["labels"]), ids)
+    meta = {
+        "format": FORMAT_VERSION,
+        "build_id": build_id,
+        "cleaner_version": CLEANER_VERSION,
+        "entries": int(len(hashes)),
+        "labels": labels,
+        "sources": [os.path.abspath(s) for s in sources],
+        "files": files,
+    }
+    meta_path = os.path.join(out_dir, "meta.json")
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, meta_path)
+
+    keep = set(files.values())
+    for fname in os.listdir(out_dir):
+        if fname.endswith(".npy") and fname not in keep:
+            try:
+                os.remove(os.path.join(out_dir, fname))
+            except OSError:
+                pass
+    return meta
+
+
+def load_index(out_dir=DEFAULT_INDEX_DIR, mmap=True):
+    """
+    Load an index written by build_index, or None if there is none.
+    An index built with a different cleaner version is ignored (its keys would not match).
+    """
+    try:
+        with open(os.path.join(out_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError("unsupported fingerprint index format: {}".format(meta.get("format")))
+    if meta.get("cleaner_version") != CLEANER_VERSION:
+        return None
+    mode = "r" if mmap else None
+    hashes = np.load(os.path.join(out_dir, meta["files"]["hashes"]), mmap_mode=mode)
+    ids = np.load(os.path.join(out_dir, meta["files"]["labels"]), mmap_mode=mode)
+    return FingerprintIndex(hashes, ids, meta["labels"], meta)
+
+
+def evaluate(index, csv_path):
+    """
+    Coverage of `index` on a labelled CSV: share of rows hit and accuracy on those rows.
+    """
+    from .frame import clean_series
+    from .pipeline import load_training_data
+
+    texts, labels = load_training_data(csv_path)
+    found = index.lookup_many(clean_series(texts).tolist())
+    hit = np.array([f is not None for f in found], dtype=bool)
+    correct = sum(f == y for f, y in zip(found[hit], np.asarray(labels, dtype=object)[hit]))
+    return {
+        "rows": len(texts),
+        "hit_rate": float(hit.mean()) if len(texts) else 0.0,
+        "hit_accuracy": correct / int(hit.sum()) if hit.any() else None,
+    }
+
+
+def _category_map():
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("category_map", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def main(argv=None):
+    from .feedback import DEFAULT_STORE_DIR
+
+    ap = argparse.ArgumentParser(prog="python -m finsort.fingerprint", description="Exact-match fingerprint index.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="build the index from labelled CSVs and feedback")
+    b.add_argument("--csv", action="append", help="labelled CSV (repeatable; default data/finsort_dataset.csv)")
+    b.add_argument("--store", default=DEFAULT_STORE_DIR, help="feedback store ('' to skip)")
+    b.add_argument("--min-agreement", type=float, default=0.9)
+    s = sub.add_parser("stats", help="index size, and coverage on a labelled CSV")
+    s.add_argument("--eval", default=None)
+    for p in (b, s):
+        p.add_argument("--out", default=DEFAULT_INDEX_DIR)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        sources = args.csv or DEFAULT_SOURCES
+        mapping = collect_labels(sources, args.store or None, _category_map(), args.min_agreement)
+        meta = build_index(mapping, args.out, sources)
+        print(json.dumps({"entries": meta["entries"], "labels": len(meta["labels"]), "out": args.out}))
+        return
+    index = load_index(args.out)
+    if index is None:
+        raise SystemExit("no fingerprint index in {} (or built with another cleaner version)".format(args.out))
+    report = {"entries": len(index), "labels": len(index.labels)}
+    if args.eval:
+        report.update(evaluate(index, args.eval))
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
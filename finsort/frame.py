@@ -0,0 +1,261 @@
+# finsort/frame.py
+"""
+Column-at-a-time categorization of pandas DataFrames.
+
+categorize_frame never builds per-row dicts:
+- with a merchant code column, mapped codes are answered first and their
+  rows skip everything below;
+- the text column is factorized, so every distinct string is handled once;
+- distinct ASCII strings are cleaned with pyarrow.compute regex kernels
+  (the multi-pass cleaner, stage by stage over the whole column); other
+  strings, or all of them without pyarrow, go through the compiled cleaner;
+- rules and the fingerprint index run once per distinct text;
+- the rows neither matched are scored with one transform/predict_proba call;
+- results are scattered back to rows as typed columns.
+
+Output is identical to predict_categories, except that missing values are
+treated as empty strings.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import inference
+from .batch import RESULT_FIELDS
+from .cleaner import (ALIAS_REPLACEMENTS, NOISE_TOKENS, LONG_DIGITS, SPECIAL_CHARS, SEPARATOR_CHARS,
+                      clean_transaction, normalize_for_rules)
+from .structured import CODE_CONFIDENCE, lookup_codes
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional: the compiled cleaner handles every value
+    pa = pc = None
+
+_PUNCT_RUN = "[" + re.escape(SPECIAL_CHARS + SEPARATOR_CHARS) + "]+"
+
+
+def _arrow_clean_ascii(arr):
+    """
+    clean_transaction over an ASCII-only pyarrow string array.
+    For ASCII, NFKD is a no-op, control characters are \\x00-\\x1f and \\x7f,
+    and RE2's \\b and \\d agree with Python's.
+    """
+    a = pc.replace_substring_regex(arr, r"[\x00-\x1f\x7f]", "")
+    a = pc.ascii_lower(a)
+    for pat, repl in ALIAS_REPLACEMENTS:
+        a = pc.replace_substring_regex(a, pat, repl)
+    for pat in NOISE_TOKENS:
+        a = pc.replace_substring_regex(a, pat, " ")
+    a = pc.replace_substring_regex(a, LONG_DIGITS, " ")
+    a = pc.replace_substring_regex(a, _PUNCT_RUN, " ")
+    a = pc.replace_substring_regex(a, " +", " ")
+    return pc.utf8_trim(a, " ")
+
+
+def _clean_distinct(values):
+    """
+    Clean an object array of distinct values; returns an object array.
+    """
+    out = np.empty(len(values), dtype=object)
+    pending = np.arange(len(values))
+    if pc is not None and len(values):
+        is_str = np.fromiter((type(v) is str for v in values), dtype=bool, count=len(values))
+        str_idx = np.flatnonzero(is_str)
+        arr = pa.array(values[str_idx], type=pa.string())
+        ascii_mask = pc.string_is_ascii(arr).to_numpy(zero_copy_only=False)
+        ascii_idx = str_idx[ascii_mask]
+        out[ascii_idx] = _arrow_clean_ascii(arr.filter(pa.array(ascii_mask))).to_numpy(zero_copy_only=False)
+        done = np.zeros(len(values), dtype=bool)
+        done[ascii_idx] = True
+        pending = np.flatnonzero(~done)
+    for i in pending:
+        out[i] = clean_transaction(values[i])
+    return out
+
+
+def _factorize(values):
+    codes, uniques = pd.factorize(pd.Series(values, copy=False).fillna(""), sort=False)
+    return codes, np.asarray(uniques, dtype=object)
+
+
+def clean_series(values):
+    """
+    clean_transaction over a column (Series, array or list); returns an
+    object Series aligned with `values`. Missing values clean to "".
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    codes, uniques = _factorize(values)
+    return pd.Series(_clean_distinct(uniques)[codes], index=index, dtype=object)
+
+
+def _normalize_distinct(cleaned):
+    # cleaned text only holds single ASCII spaces, so RE2's \s and $ match Python's here
+    if pc is None:
+        return np.array([normalize_for_rules(c) for c in cleaned], dtype=object)
+    a = pa.array(cleaned, type=pa.string())
+    a = pc.replace_substring_regex(a, r"^(to|for)\s+", "")
+    a = pc.replace_substring_regex(a, r"\s+(inc|ltd|pvt|india|co|company)$", "")
+    return pc.utf8_trim(a, " ").to_numpy(zero_copy_only=False)
+
+
+def _categorize_distinct(cleaned_distinct, snap, k=None):
+    """
+    Results for an object array of distinct cleaned texts: rules, then the
+    fingerprint index, then one model call for the rest. Returns a dict of
+    arrays (tag, category, confidence, low_confidence, by_rule, by_index,
+    decision), plus (n, k) top_tags/top_confidence with `k`: a rule or index
+    hit suggests only itself, unused slots are None/NaN.
+    """
+    cfg = snap.config or {}
+    cfg_map = cfg.get("category_map", {})
+    n = len(cleaned_distinct)
+
+    tags = np.full(n, "unknown", dtype=object)
+    cats = np.full(n, "Unknown", dtype=object)
+    conf = np.zeros(n, dtype=np.float64)
+    low = np.ones(n, dtype=bool)
+    by_rule = np.zeros(n, dtype=bool)
+    by_index = np.zeros(n, dtype=bool)
+    decision = np.full(n, inference.ABSTAIN, dtype=np.uint8)
+
+    pending = []
+    for i, text in enumerate(_normalize_distinct(cleaned_distinct)):
+        r = inference.rule_override(text, cfg)
+        if r:
+            tags[i], cats[i], conf[i], low[i] = r["tag"], r["category"], r["confidence"], r["low_confidence"]
+            by_rule[i] = True
+        else:
+            pending.append(i)
+
+    pending = np.asarray(pending, dtype=np.int64)
+    if len(pending) and snap.index is not None:
+        found = snap.index.lookup_many(cleaned_distinct[pending])
+        hit = np.array([f is not None for f in found], dtype=bool)
+        hits, found = pending[hit], found[hit]
+        tags[hits] = found
+        cats[hits] = [cfg_map.get(t, t) for t in found]
+        conf[hits] = inference.INDEX_CONFIDENCE
+        low[hits] = False
+        by_index[hits] = True
+        pending = pending[~hit]
+    hits = by_rule | by_index
+    decision[hits] = np.where(low[hits], inference.REVIEW, inference.ACCEPT)
+    columns = {"tag": tags, "category": cats, "confidence": conf, "low_confidence": low,
+               "by_rule": by_rule, "by_index": by_index, "decision": decision}
+    if k:
+        top_tags = columns["top_tags"] = np.full((n, k), None, dtype=object)
+        top_conf = columns["top_confidence"] = np.full((n, k), np.nan)
+        top_tags[hits, 0], top_conf[hits, 0] = tags[hits], conf[hits]
+
+    scores = inference._ml_scores(cleaned_distinct[pending], snap, k=k) if len(pending) else None
+    if scores is not None:
+        tags[pending] = scores.tags
+        conf[pending] = scores.confidence
+        tag_s = pd.Series(scores.tags, dtype=object)
+        cats[pending] = tag_s.map(cfg_map).fillna(tag_s).to_numpy(dtype=object)
+        low[pending] = scores.low_confidence
+        decision[pending] = scores.decision
+        if k:
+            width = scores.top_tags.shape[1]
+            top_tags[pending, :width] = scores.top_tags
+            top_conf[pending, :width] = scores.top_confidence
+    return columns
+
+
+def _categorize_values(values, snap, codes=None, k=None):
+    """
+    Factorize raw `values` down to distinct cleaned texts and categorize those.
+    Rows whose merchant code (parallel `codes`) is in the snapshot's
+    merchant_code_map are answered from it and their text is never cleaned.
+    Returns (raw_codes, raw_uniques, result_codes, columns): row i has raw
+    text raw_uniques[raw_codes[i]] and result columns[...][result_codes[i]];
+    columns holds cleaned, tag, category, confidence, decision, the flag
+    arrays and, with `k`, top_tags/top_confidence.
+    """
+    raw_codes, raw_uniques = _factorize(values)
+    coded_tags = lookup_codes(codes, snap.codes) if codes is not None else None
+    coded = pd.notna(coded_tags) if coded_tags is not None else None
+    if coded is not None and not coded.any():
+        coded = None
+
+    # raw -> cleaned -> result: each distinct raw string is cleaned once, each
+    # distinct cleaned string categorized once; with merchant codes, only the
+    # raw strings of uncoded rows are cleaned at all
+    if coded is None:
+        c_codes, cleaned_distinct = pd.factorize(_clean_distinct(raw_uniques), sort=False)
+    else:
+        needed = np.zeros(len(raw_uniques), dtype=bool)
+        needed[raw_codes[~coded]] = True
+        c_needed, cleaned_distinct = pd.factorize(_clean_distinct(raw_uniques[needed]), sort=False)
+        c_codes = np.zeros(len(raw_uniques), dtype=np.intp)  # rows of unneeded strings are all coded
+        c_codes[needed] = c_needed
+    cleaned_distinct = np.asarray(cleaned_distinct, dtype=object)
+    columns = _categorize_distinct(cleaned_distinct, snap, k)
+    columns["cleaned"] = cleaned_distinct
+    columns["by_code"] = np.zeros(len(cleaned_distinct), dtype=bool)
+    result_codes = c_codes[raw_codes]
+    if coded is None:
+        return raw_codes, raw_uniques, result_codes, columns
+
+    # merchant-code hits become extra result entries after the cleaned ones
+    t_codes, code_tags = pd.factorize(coded_tags[coded], sort=False)
+    code_tags = np.asarray(code_tags, dtype=object)
+    cfg_map = (snap.config or {}).get("category_map", {})
+    n = len(code_tags)
+    extra = {
+        "cleaned": np.full(n, "", dtype=object),
+        "tag": code_tags,
+        "category": np.array([cfg_map.get(t, t) for t in code_tags], dtype=object),
+        "confidence": np.full(n, CODE_CONFIDENCE),
+        "low_confidence": np.zeros(n, dtype=bool),
+        "by_rule": np.zeros(n, dtype=bool),
+        "by_index": np.zeros(n, dtype=bool),
+        "by_code": np.ones(n, dtype=bool),
+        "decision": np.full(n, inference.ACCEPT, dtype=np.uint8),
+    }
+    if k:
+        extra["top_tags"] = np.full((n, k), None, dtype=object)
+        extra["top_tags"][:, 0] = code_tags
+        extra["top_confidence"] = np.full((n, k), np.nan)
+        extra["top_confidence"][:, 0] = CODE_CONFIDENCE
+    columns = {name: np.concatenate([columns[name], extra[name]]) for name in columns}
+    result_codes[coded] = len(cleaned_distinct) + t_codes
+    return raw_codes, raw_uniques, result_codes, columns
+
+
+def categorize_frame(df, column="transaction", prefix="", code_column=None, top_k=None):
+    """
+    Categorize `df[column]` and return a copy of `df` with the RESULT_FIELDS
+    columns (cleaned, tag, category, confidence, low_confidence, by_rule,
+    by_index) added, each name prefixed with `prefix`. With `code_column`
+    (e.g. "merchant_code"), mapped merchant codes are answered first and a
+    by_code column is added too. With `top_k`, a decision column
+    (accept/review/abstain) and top1_tag, top1_confidence, ... columns are
+    added as well.
+    """
+    if column not in df.columns:
+        raise KeyError("column {!r} not found; available: {}".format(column, list(df.columns)))
+    if code_column is not None and code_column not in df.columns:
+        raise KeyError("column {!r} not found; available: {}".format(code_column, list(df.columns)))
+    fields = RESULT_FIELDS + ["by_code"] if code_column is not None else list(RESULT_FIELDS)
+    top_fields = ["top{}_{}".format(i + 1, f) for i in range(top_k or 0) for f in ("tag", "confidence")]
+    if top_k:
+        fields.append("decision")
+    clash = [prefix + f for f in fields + top_fields
+             if prefix + f in df.columns and prefix + f not in (column, code_column)]
+    if clash:
+        raise ValueError("output columns {} already exist; pass prefix=...".format(clash))
+
+    codes = df[code_column] if code_column is not None else None
+    _, _, rows, columns = _categorize_values(df[column], inference._load(), codes, top_k)
+    out = {prefix + name: columns[name][rows] for name in fields if name != "decision"}
+    if top_k:
+        out[prefix + "decision"] = np.asarray(inference.DECISIONS, dtype=object)[columns["decision"][rows]]
+        top_tags, top_conf = columns["top_tags"][rows], columns["top_confidence"][rows]
+        for i in range(top_k):
+            out["{}top{}_tag".format(prefix, i + 1)] = top_tags[:, i]
+            out["{}top{}_confidence".format(prefix, i + 1)] = top_conf[:, i]
+    return df.assign(**out)
@@ -2,24 +2,100 @@
 import os
 import json
 import time
+import warnings
+import threading
+from collections import namedtuple
 import joblib
 import numpy as np
 
 # local cleaner import
 from .cleaner import clean_transaction, normalize_for_rules
+from .matcher import MerchantMatcher
+from .cache import LRUCache
+from .metrics import MetricsRegistry
+from .export import DEFAULT_EXPORT_DIR, DEFAULT_LINEAR_DIR, DEFAULT_ONLINE_DIR, load_exported
+from . import registry
+from .fingerprint import DEFAULT_INDEX_DIR, INDEX_CONFIDENCE, load_index
+from .structured import CODE_CONFIDENCE, code_map, normalize_code
+from .diskcache import DEFAULT_CACHE_PATH, PredictionCache, config_key, model_key
 
 # ---- Configurable paths ----
 BASE = os.path.dirname(__file__)
 _MODEL_PATH = os.path.join(BASE, "model.pkl")
 _VECT_PATH = os.path.join(BASE, "vectorizer.pkl")
 _CONFIG_PATH = os.path.join(BASE, "config.json")
+_EXPORT_DIR = DEFAULT_EXPORT_DIR
+_LINEAR_DIR = DEFAULT_LINEAR_DIR
+_ONLINE_DIR = DEFAULT_ONLINE_DIR
+_REGISTRY_DIR = registry.DEFAULT_REGISTRY_DIR
+# exact-match fingerprint index (python -m finsort.fingerprint build); FINSORT_INDEX=0 disables it
+_INDEX_DIR = DEFAULT_INDEX_DIR if os.environ.get("FINSORT_INDEX", "1").lower() not in ("0", "false", "no") else None
 
-# ---- Globals that get lazy-loaded and reloaded on change ----
-_model = None
-_vectorizer = None
-_model_mtime = None
-_vectorizer_mtime = None
-_CONFIG = None
+# model source: the current bundle of the model registry (finsort/models, see
+# finsort.registry) when there is one, else the legacy files below.
+# model backend:
+#   "pickle" - model.pkl/vectorizer.pkl via joblib (reference)
+#   "npy"    - exact NumPy copy from `python -m finsort.export`, memory-mapped
+#   "linear" - folds collapsed into one scorer (`python -m finsort.export --collapse`);
+#              fastest, probabilities within the parity report's tolerance
+#   "online" - SGD model updated from feedback by `python -m finsort.online`
+# "npy"/"linear" use the bundle's export; all fall back to the pickles if their export does not exist.
+BACKENDS = ("pickle", "npy", "linear", "online")
+BACKEND = os.environ.get("FINSORT_BACKEND", "pickle")
+
+# rows per transform/predict_proba call in the batch API
+DEFAULT_CHUNK_SIZE = 4096
+
+# with top_k, results carry a review decision: accept the prediction, send it
+# to review with the top-k suggestions, or abstain (no usable guess)
+DECISIONS = ("accept", "review", "abstain")
+ACCEPT, REVIEW, ABSTAIN = range(3)
+MLScores = namedtuple("MLScores", ["tags", "confidence", "low_confidence", "decision", "top_tags", "top_confidence"])
+
+# ---- Model snapshot, lazy-loaded and reloaded on change ----
+# model, vectorizer and config are swapped in as one immutable object; every
+# prediction reads _SNAPSHOT once, so a reload can never pair a new model with
+# an old vectorizer. `stamps` identify the files the snapshot was loaded from,
+# `bundle` the registry version (None for legacy files), `base_config` the
+# bundle's own config, which the live config.json overrides key by key,
+# `index` the fingerprint index (None when there is none) and `codes` the
+# config's merchant_code_map with normalized keys.
+Snapshot = namedtuple("Snapshot", ["model", "vectorizer", "config", "stamps", "version", "bundle", "base_config",
+                                   "index", "codes"], defaults=(None, None, None, None))
+_SNAPSHOT = Snapshot(None, None, {}, None, 0)
+# the snapshot served before the last model swap, kept loaded for instant rollback
+_PREVIOUS = None
+
+# files are stat'ed at most once per interval (0 = every call), or only by the watcher thread
+RELOAD_INTERVAL = float(os.environ.get("FINSORT_RELOAD_INTERVAL", "5"))
+_last_check = 0.0
+_reload_lock = threading.Lock()
+_watcher = None
+
+# ---- Prediction cache, keyed on (snapshot version, cleaned text); cleared on reload ----
+_ttl = os.environ.get("FINSORT_CACHE_TTL")
+_CACHE = LRUCache(
+    maxsize=int(os.environ.get("FINSORT_CACHE_SIZE", "50000")),
+    ttl=float(_ttl) if _ttl else None,
+)
+
+# ---- Opt-in metrics (enable_metrics() or FINSORT_METRICS=1) ----
+# every hook is guarded by one `_METRICS is not None` check, so disabled costs ~nothing
+_METRIC_HELP = {
+    "stage_seconds": "Per-call time of each predict_category stage.",
+    "batch_stage_seconds": "Per-chunk time of each predict_categories stage.",
+    "predictions_total": "Results by source: rule, index, ml or unknown (no model).",
+    "cache_total": "Prediction cache lookups by result.",
+    "disk_cache_total": "Persistent prediction cache lookups by result.",
+    "reloads_total": "Model/config reload attempts by result.",
+    "snapshot_version": "Version of the serving model snapshot.",
+}
+_METRICS = None
+
+# ---- Opt-in persistent model-score cache (enable_disk_cache() or FINSORT_DISK_CACHE=1|path) ----
+# shared by processes and runs; see finsort.diskcache
+_DISK_CACHE = None
+_DISK_KEYS = (None, None)  # (snapshot, (model key, config key)) of the last snapshot asked about
 
 # ---------- Fast rule-based overrides (quick fix) -------------
 MERCHANT_MAP = {
@@ -72,6 +148,16 @@ MERCHANT_MAP = {
     "refund": ("refund", "Refund"),
     "reversal": ("refund", "Refund"),
 }
+# compiled once; call compile_merchant_map() after editing MERCHANT_MAP at runtime
+_MERCHANT_MATCHER = MerchantMatcher(MERCHANT_MAP)
+
+def compile_merchant_map():
+    """
+    Rebuild the merchant matcher from the current MERCHANT_MAP.
+    """
+    global _MERCHANT_MATCHER
+    _MERCHANT_MATCHER = MerchantMatcher(MERCHANT_MAP)
+
 GROCERY_KEYWORDS = {
     "tomato", "potato", "onion", "vegetable", "fruit",
     "milk", "bread", "eggs", "rice", "atta"
@@ -85,17 +171,18 @@ def rule_override(cleaned_text, config):
     txt = (cleaned_text or "").lower()
     cfg_map = (config or {}).get("category_map", {})
 
-    # merchant contains match
-    for k, (tag, cat) in MERCHANT_MAP.items():
-        if k in txt:
-            final_cat = cfg_map.get(tag, cat)
-            return {
-                "tag": tag,
-                "category": final_cat,
-                "confidence": 0.99,
-                "low_confidence": False,
-                "by_rule": True
-            }
+    # merchant match (word-start anchored, longest key wins; see finsort.matcher)
+    hit = _MERCHANT_MATCHER.find(txt)
+    if hit:
+        tag, cat = hit[1]
+        final_cat = cfg_map.get(tag, cat)
+        return {
+            "tag": tag,
+            "category": final_cat,
+            "confidence": 0.99,
+            "low_confidence": False,
+            "by_rule": True
+        }
 
     # grocery keywords
     tokens = set(txt.split())
@@ -124,112 +211,739 @@ def rule_override(cleaned_text, config):
 
 # --------------------------------------------------------------
 
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def _read_config():
+    try:
+        with open(_CONFIG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _warm_up(model, vectorizer):
+    """
+    Score one empty string; raises if the model and vectorizer do not fit together.
+    """
+    if model is not None and vectorizer is not None:
+        model.predict_proba(vectorizer.transform([""]))
+
+def _model_stamp():
+    """
+    (source, identity) of the model/vectorizer pair to serve: the online export,
+    the registry's current bundle (identified by its version, as bundles never
+    change), or the legacy export/pickle files (identified by file stamps).
+    """
+    if BACKEND == "online":
+        meta = _file_stamp(os.path.join(_ONLINE_DIR, "meta.json"))
+        if meta is not None:
+            return (_ONLINE_DIR, meta)
+    version = registry.current_version(_REGISTRY_DIR)
+    if version is not None:
+        sub = registry.EXPORTS.get(BACKEND)
+        export_dir = os.path.join(registry.bundle_path(version, _REGISTRY_DIR), sub) if sub else None
+        if export_dir and os.path.exists(os.path.join(export_dir, "meta.json")):
+            return (export_dir, version)
+        return ("registry", version)
+    export_dir = {"npy": _EXPORT_DIR, "linear": _LINEAR_DIR}.get(BACKEND)
+    if export_dir is not None:
+        meta = _file_stamp(os.path.join(export_dir, "meta.json"))
+        if meta is not None:
+            return (export_dir, meta)
+    return ("pickle", (_file_stamp(_MODEL_PATH), _file_stamp(_VECT_PATH)))
+
+def _load_pair(model_stamp, old):
+    """
+    Load (model, vectorizer, bundle config, bundle version) for `model_stamp`.
+    """
+    source, ident = model_stamp
+    if source == "registry":
+        model, vectorizer, config, _ = registry.load_bundle(ident, _REGISTRY_DIR)
+        return model, vectorizer, config, ident
+    if source != "pickle":
+        model, vectorizer = load_exported(source, mmap=True)
+        if isinstance(ident, str):  # export inside a registry bundle
+            return model, vectorizer, registry.load_config(ident, _REGISTRY_DIR), ident
+        return model, vectorizer, None, None
+    # a missing file keeps the previously loaded object
+    model = joblib.load(_MODEL_PATH) if ident[0] else old.model
+    vectorizer = joblib.load(_VECT_PATH) if ident[1] else old.vectorizer
+    return model, vectorizer, None, None
+
+def _merge_config(base, live):
+    config = dict(base or {})
+    config.update(live)
+    return config
+
+def _refresh(force=False):
+    """
+    Stat model, vectorizer and config and, if any changed, load them and swap
+    in a new snapshot. Model and vectorizer are always reloaded together, and
+    warmed up before the swap. A model that was served just before the current
+    one is still resident, so switching back to it loads nothing.
+    If a reload fails (e.g. a half-written pickle) the previous snapshot keeps
+    serving and the next check retries. Returns the current snapshot.
+    """
+    global _SNAPSHOT, _PREVIOUS, _last_check
+    checked = _last_check
+    with _reload_lock:
+        if not force and _last_check != checked and _SNAPSHOT.stamps is not None:
+            # another thread checked while this one waited for the lock
+            return _SNAPSHOT
+        _last_check = time.monotonic()
+        old = _SNAPSHOT
+        index_meta = os.path.join(_INDEX_DIR, "meta.json") if _INDEX_DIR else None
+        stamps = (_model_stamp(), _file_stamp(_CONFIG_PATH), index_meta and _file_stamp(index_meta))
+        if not force and old.stamps == stamps:
+            return old
+
+        first = old.stamps is None
+        model, vectorizer, bundle, base_config = old.model, old.vectorizer, old.bundle, old.base_config
+        index = old.index
+        swapped = force or first or stamps[0] != old.stamps[0]
+        m, start = _METRICS, time.perf_counter()
+        try:
+            prev = _PREVIOUS
+            if swapped and not force and prev is not None and prev.stamps[0] == stamps[0]:
+                model, vectorizer, bundle, base_config = prev.model, prev.vectorizer, prev.bundle, prev.base_config
+            elif swapped:
+                model, vectorizer, base_config, bundle = _load_pair(stamps[0], old)
+                _warm_up(model, vectorizer)
+            config = _merge_config(base_config, _read_config() if stamps[1] else {})
+            if force or first or stamps[2] != old.stamps[2]:
+                index = load_index(_INDEX_DIR) if stamps[2] else None
+        except Exception as e:
+            if m is not None:
+                m.inc("reloads_total", labels={"result": "failed"})
+            if first:
+                raise
+            warnings.warn("finsort: reload failed, keeping previous model: {}".format(e))
+            return old
+
+        if swapped and old.model is not None and old.stamps[0] != stamps[0]:
+            _PREVIOUS = old
+        _SNAPSHOT = Snapshot(model, vectorizer, config, stamps, old.version + 1, bundle, base_config, index,
+                             code_map(config))
+        _CACHE.clear()
+        if m is not None:
+            m.inc("reloads_total", labels={"result": "ok"})
+            m.observe("stage_seconds", time.perf_counter() - start, labels={"stage": "reload"})
+            m.set("snapshot_version", _SNAPSHOT.version)
+        return _SNAPSHOT
+
+def set_backend(name):
+    """
+    Switch the model backend ("pickle", "npy", "linear" or "online") and reload.
+    """
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError("unknown backend {!r}; expected one of {}".format(name, BACKENDS))
+    BACKEND = name
+    return _refresh(force=True)
+
+def rollback():
+    """
+    Serve the model bundle that was active before the current one again. It is
+    still resident, so the switch is immediate; the registry's CURRENT pointer
+    is moved back too, so reload checks and other processes follow.
+    Returns the new snapshot.
+    """
+    prev = _PREVIOUS
+    if prev is None or prev.bundle is None:
+        raise RuntimeError("no previous registry bundle is resident")
+    registry.activate(prev.bundle, _REGISTRY_DIR)
+    return _refresh()
+
+def model_version():
+    """
+    Registry version of the serving model, or None for legacy model files.
+    """
+    return _load().bundle
+
+def index_info():
+    """
+    Fingerprint index size and hit counters since it was loaded, or None without an index.
+    """
+    index = _load().index
+    return index.info() if index is not None else None
+
 def _load(force=False):
     """
-    Load model, vectorizer and config if not loaded or if files changed on disk.
-    Call at start of predict_category.
+    Return the current (model, vectorizer, config) snapshot, loading it on first use.
+    Files are checked for changes at most once per RELOAD_INTERVAL seconds, and
+    never on the prediction path while the watcher thread is running.
     """
-    global _model, _vectorizer, _model_mtime, _vectorizer_mtime, _CONFIG
+    snap = _SNAPSHOT
+    if not force and snap.stamps is not None:
+        if _watcher is not None or time.monotonic() - _last_check < RELOAD_INTERVAL:
+            return snap
+    return _refresh(force)
 
-    # load config
-    try:
-        if _CONFIG is None or force:
-            if os.path.exists(_CONFIG_PATH):
-                with open(_CONFIG_PATH, "r", encoding="utf-8") as f:
-                    _CONFIG = json.load(f)
-            else:
-                _CONFIG = {}
-    except Exception:
-        _CONFIG = {}
-
-    # load model
-    if os.path.exists(_MODEL_PATH):
-        mtime = os.path.getmtime(_MODEL_PATH)
-        if _model is None or _model_mtime != mtime or force:
-            _model = joblib.load(_MODEL_PATH)
-            _model_mtime = mtime
-
-    # load vectorizer
-    if os.path.exists(_VECT_PATH):
-        vmtime = os.path.getmtime(_VECT_PATH)
-        if _vectorizer is None or _vectorizer_mtime != vmtime or force:
-            _vectorizer = joblib.load(_VECT_PATH)
-            _vectorizer_mtime = vmtime
-
-def _is_low_confidence(tag, confidence, config):
+class _Watcher(threading.Thread):
+    """
+    Daemon thread that checks for model/config changes every `interval` seconds.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name="finsort-reload-watcher", daemon=True)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                _refresh()
+            except Exception as e:
+                warnings.warn("finsort: reload check failed: {}".format(e))
+
+    def stop(self):
+        self._stop_event.set()
+
+def start_watcher(interval=None):
+    """
+    Move reload checks off the prediction path into a background thread.
+    """
+    global _watcher
+    if _watcher is None:
+        _refresh()
+        _watcher = _Watcher(RELOAD_INTERVAL if interval is None else interval)
+        _watcher.start()
+    return _watcher
+
+def stop_watcher():
+    """
+    Stop the background watcher; _load() goes back to throttled checks.
+    """
+    global _watcher
+    w, _watcher = _watcher, None
+    if w is not None:
+        w.stop()
+        w.join()
+
+def cache_info():
+    """
+    Prediction cache counters: hits, misses, evictions, expirations, invalidations, size.
+    """
+    return _CACHE.info()
+
+def cache_clear():
+    """
+    Drop all cached predictions.
+    """
+    _CACHE.clear()
+
+def configure_cache(maxsize=None, ttl=None):
+    """
+    Resize the prediction cache (maxsize=0 disables it) and/or set its TTL in seconds.
+    """
+    _CACHE.resize(maxsize=maxsize, ttl=ttl)
+
+def enable_metrics(registry=None):
+    """
+    Start recording stage timings, result counters and reload events into
+    `registry` (a new finsort.metrics.MetricsRegistry by default). Returns it.
+    """
+    global _METRICS
+    _METRICS = registry or MetricsRegistry(help=_METRIC_HELP)
+    return _METRICS
+
+def disable_metrics():
+    """
+    Stop recording metrics; returns the registry that was in use (or None).
+    """
+    global _METRICS
+    m, _METRICS = _METRICS, None
+    return m
+
+def enable_disk_cache(path=None):
+    """
+    Look up and store model scores in the persistent cache at `path`
+    (finsort.diskcache.DEFAULT_CACHE_PATH by default). Returns the cache.
+    """
+    global _DISK_CACHE
+    _DISK_CACHE = PredictionCache(path or DEFAULT_CACHE_PATH)
+    return _DISK_CACHE
+
+def disable_disk_cache():
+    """
+    Stop using the persistent cache; returns the one that was in use (or None).
+    """
+    global _DISK_CACHE
+    dc, _DISK_CACHE = _DISK_CACHE, None
+    return dc
+
+def disk_cache_info():
+    """
+    Persistent cache entries and this process's hit counters, or None when it is disabled.
+    """
+    dc = _DISK_CACHE
+    return dc.info() if dc is not None else None
+
+def _disk_keys(snap):
+    """
+    (model key, config key) of a snapshot in the persistent cache, worked out once per snapshot.
+    """
+    global _DISK_KEYS
+    held, keys = _DISK_KEYS
+    if held is not snap:
+        stamp = snap.stamps[0] if snap.stamps else None
+        manifest = None
+        if snap.bundle is not None and stamp is not None and stamp[1] == snap.bundle:
+            try:
+                manifest = registry.load_manifest(snap.bundle, _REGISTRY_DIR)
+            except (OSError, ValueError):
+                manifest = None
+        keys = (model_key(stamp, manifest, BACKEND), config_key(snap.config))
+        _DISK_KEYS = (snap, keys)
+    return keys
+
+def metrics_registry():
+    """
+    The active MetricsRegistry, or None when metrics are disabled.
+    """
+    return _METRICS
+
+def _decide(labels, idxs, confidence, config):
+    """
+    Vectorized low_confidence flags and decision codes (into DECISIONS) for
+    model predictions: below its tag's threshold (per_tag_threshold, else
+    confidence_threshold) a row goes to review, and below abstain_threshold
+    (default 0, i.e. never) the model abstains.
+    """
     default = config.get("confidence_threshold", 0.60)
     per = config.get("per_tag_threshold", {})
-    tag_thresh = per.get(tag, default)
-    return confidence < tag_thresh
+    thresholds = np.array([per.get(t, default) for t in labels], dtype=np.float64)[idxs]
+    low = confidence < thresholds
+    abstain = confidence < config.get("abstain_threshold", 0.0)
+    decision = np.where(low, np.where(abstain, ABSTAIN, REVIEW), ACCEPT).astype(np.uint8)
+    return low, decision
 
-def _ml_predict(cleaned_text):
+def top_k_per_row(probs, k):
     """
-    Run ML model prediction (assumes _load() has ensured model & vectorizer exist).
-    Returns dict with tag, category, confidence and low_confidence flag.
+    (column indices, probabilities) of the k largest entries of each row of
+    `probs`, best first. One argpartition over the whole matrix, then only
+    k columns per row are sorted.
     """
-    global _model, _vectorizer, _CONFIG
-    if _model is None or _vectorizer is None:
+    n, c = probs.shape
+    k = min(k, c)
+    if k < c:
+        idx = np.argpartition(probs, c - k, axis=1)[:, c - k:]
+    else:
+        idx = np.broadcast_to(np.arange(c), (n, c))
+    p = np.take_along_axis(probs, idx, axis=1)
+    order = np.argsort(-p, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(p, order, axis=1)
+
+def _ml_scores(cleaned_texts, snap, metric="batch_stage_seconds", k=None):
+    """
+    Score cleaned texts with a single transform/predict_proba call on the given
+    snapshot (timed under `metric` when metrics are enabled).
+    Returns MLScores arrays (top_tags/top_confidence only with `k`), or None
+    if no model is loaded. Without `k`, the persistent cache is consulted
+    first when it is enabled.
+    """
+    model, vectorizer = snap.model, snap.vectorizer
+    if model is None or vectorizer is None:
         return None
+    classes = getattr(model, "classes_", None)
+    if not len(cleaned_texts):
+        width = min(k, len(classes)) if k and classes is not None else 0
+        return MLScores(np.array([], dtype=object), np.array([], dtype=np.float64), np.array([], dtype=bool),
+                        np.array([], dtype=np.uint8), np.empty((0, width), dtype=object) if k else None,
+                        np.empty((0, width)) if k else None)
 
-    X = _vectorizer.transform([cleaned_text])
-    probs = _model.predict_proba(X)[0]
-    idx = int(np.argmax(probs))
-    tag = _model.classes_[idx] if hasattr(_model, "classes_") else str(idx)
-    confidence = float(probs[idx])
-    # map tag -> category via config if available
-    cfg_map = (_CONFIG or {}).get("category_map", {})
-    category = cfg_map.get(tag, tag)
-    low_conf = _is_low_confidence(tag, confidence, _CONFIG or {})
-    return {"tag": tag, "category": category, "confidence": confidence, "low_confidence": low_conf}
+    dc = _DISK_CACHE
+    if dc is not None and not k:
+        return _ml_scores_cached(cleaned_texts, snap, metric, dc)
+    probs, labels = _probabilities(cleaned_texts, snap, metric)
+    idxs = np.argmax(probs, axis=1)
+    confidence = probs[np.arange(len(idxs)), idxs].astype(np.float64)
+    low, decision = _decide(labels, idxs, confidence, snap.config or {})
+    top_tags = top_conf = None
+    if k:
+        top_idx, top_conf = top_k_per_row(probs, k)
+        top_tags = labels[top_idx]
+    return MLScores(labels[idxs], confidence, low, decision, top_tags, top_conf)
 
-def predict_category(raw_text):
+def _probabilities(cleaned_texts, snap, metric):
     """
-    Public inference function used by demo and scripts.
-    Returns a dict: raw, cleaned, tag, category, confidence, low_confidence, maybe by_rule.
+    (probability matrix, class labels) from one transform/predict_proba call.
     """
-    _load()  # ensure latest model/vectorizer/config
+    model, vectorizer = snap.model, snap.vectorizer
+    m = _METRICS
+    if m is None:
+        X = vectorizer.transform(cleaned_texts)
+        probs = model.predict_proba(X)
+    else:
+        t0 = time.perf_counter()
+        X = vectorizer.transform(cleaned_texts)
+        t1 = time.perf_counter()
+        probs = model.predict_proba(X)
+        m.observe(metric, t1 - t0, labels={"stage": "transform"})
+        m.observe(metric, time.perf_counter() - t1, labels={"stage": "predict_proba"})
+    classes = getattr(model, "classes_", None)
+    if classes is not None:
+        labels = np.asarray(classes, dtype=object)
+    else:
+        labels = np.arange(probs.shape[1]).astype(str).astype(object)
+    return probs, labels
 
-    raw = raw_text or ""
-    cleaned = clean_transaction(raw)
-    # normalized for rules (optional)
-    cleaned_for_rules = normalize_for_rules(cleaned)
+def _ml_scores_cached(cleaned_texts, snap, metric, dc):
+    """
+    _ml_scores through the persistent cache: cached texts keep their stored
+    tag and confidence, and only the misses reach the model (in one call)
+    and are written back. Low confidence and the decision always come from
+    the snapshot's config.
+    """
+    model_k, config_k = _disk_keys(snap)
+    tags, confidence = dc.get_many(model_k, config_k, cleaned_texts)
+    miss = np.flatnonzero(np.equal(tags, None))
+    m = _METRICS
+    if m is not None:
+        m.inc("disk_cache_total", len(tags) - len(miss), labels={"result": "hit"})
+        m.inc("disk_cache_total", len(miss), labels={"result": "miss"})
+    if len(miss):
+        texts = np.asarray(cleaned_texts, dtype=object)[miss]
+        probs, labels = _probabilities(texts, snap, metric)
+        idxs = np.argmax(probs, axis=1)
+        tags[miss] = labels[idxs]
+        confidence[miss] = probs[np.arange(len(idxs)), idxs]
+        dc.put_many(model_k, config_k, texts, tags[miss], confidence[miss])
+    labels, idxs = np.unique(tags.astype(str), return_inverse=True)
+    low, decision = _decide(labels.astype(object), idxs, confidence, snap.config or {})
+    return MLScores(tags, confidence, low, decision, None, None)
+
+def _suggestions(tags, confidences, cfg_map):
+    return [{"tag": t, "category": cfg_map.get(t, t), "confidence": p} for t, p in zip(tags, confidences)]
 
-    # 1) Rule override
-    r = rule_override(cleaned_for_rules, _CONFIG)
+def _ml_predict_many(cleaned_texts, snap, metric="batch_stage_seconds", k=None):
+    """
+    Run ML model prediction for a list of cleaned texts with a single
+    transform/predict_proba call on the given snapshot.
+    Returns a list of dicts (same shape as _ml_predict) or None if no model is loaded.
+    With `k`, each dict also has "decision" and the "top_k" suggestions.
+    """
+    scores = _ml_scores(cleaned_texts, snap, metric, k)
+    if scores is None:
+        return None
+    cfg = snap.config or {}
+    cfg_map = cfg.get("category_map", {})
+
+    out = []
+    rows = zip(scores.tags.tolist(), scores.confidence.tolist(), scores.low_confidence.tolist())
+    for i, (tag, confidence, low_conf) in enumerate(rows):
+        # map tag -> category via config if available
+        category = cfg_map.get(tag, tag)
+        pred = {"tag": tag, "category": category, "confidence": confidence, "low_confidence": low_conf}
+        if k:
+            pred["decision"] = DECISIONS[scores.decision[i]]
+            pred["top_k"] = _suggestions(scores.top_tags[i].tolist(), scores.top_confidence[i].tolist(), cfg_map)
+        out.append(pred)
+    return out
+
+def _index_result(tag, config):
+    return {
+        "tag": tag,
+        "category": config.get("category_map", {}).get(tag, tag),
+        "confidence": INDEX_CONFIDENCE,
+        "low_confidence": False,
+        "by_index": True
+    }
+
+def _code_result(tag, config):
+    return {
+        "tag": tag,
+        "category": config.get("category_map", {}).get(tag, tag),
+        "confidence": CODE_CONFIDENCE,
+        "low_confidence": False,
+        "by_code": True
+    }
+
+def _code_lookup(merchant_code, snap):
+    """
+    Result core for a mapped merchant code, or None.
+    """
+    if not snap.codes or merchant_code is None:
+        return None
+    tag = snap.codes.get(normalize_code(merchant_code))
+    return _code_result(tag, snap.config or {}) if tag is not None else None
+
+def _index_lookup(cleaned_text, snap):
+    """
+    Label of a cleaned text from the fingerprint index, as a rule-style hit, or None.
+    """
+    if snap.index is None or not cleaned_text:
+        return None
+    tag = snap.index.lookup(cleaned_text)
+    return _index_result(tag, snap.config or {}) if tag is not None else None
+
+def _ml_predict(cleaned_text, snap=None, k=None):
+    """
+    Run ML model prediction (assumes _load() has ensured model & vectorizer exist).
+    Returns dict with tag, category, confidence and low_confidence flag.
+    """
+    preds = _ml_predict_many([cleaned_text], snap or _SNAPSHOT, metric="stage_seconds", k=k)
+    if preds is None:
+        return None
+    return preds[0]
+
+def _core_result(r, ml, k=None):
+    """
+    The part of a result that depends only on the cleaned text: from a rule,
+    fingerprint index or merchant code hit `r`, or an ML prediction `ml`.
+    This is what the prediction cache stores (merchant code hits are not cached).
+    With `k`, it also has "decision" and "top_k"; a hit's only suggestion is itself.
+    """
     if r:
-        return {
-            "raw": raw,
-            "cleaned": cleaned,
+        core = {
             "tag": r["tag"],
             "category": r["category"],
             "confidence": float(r["confidence"]),
             "low_confidence": bool(r["low_confidence"]),
-            "by_rule": True
         }
+        core["by_code" if r.get("by_code") else "by_index" if r.get("by_index") else "by_rule"] = True
+        if k:
+            core["decision"] = DECISIONS[REVIEW if core["low_confidence"] else ACCEPT]
+            core["top_k"] = [{"tag": core["tag"], "category": core["category"], "confidence": core["confidence"]}]
+        return core
 
-    # 2) ML fallback
-    ml = _ml_predict(cleaned)
     if ml is None:
         # model not available; default safe return
-        return {
-            "raw": raw,
-            "cleaned": cleaned,
+        core = {
             "tag": "unknown",
             "category": "Unknown",
             "confidence": 0.0,
             "low_confidence": True
         }
+        if k:
+            core["decision"] = DECISIONS[ABSTAIN]
+            core["top_k"] = []
+        return core
 
-    result = {
-        "raw": raw,
-        "cleaned": cleaned,
+    core = {
         "tag": ml["tag"],
         "category": ml["category"],
         "confidence": ml["confidence"],
         "low_confidence": ml["low_confidence"]
     }
+    if k:
+        core["decision"] = ml["decision"]
+        core["top_k"] = ml["top_k"]
+    return core
+
+def _build_result(raw, cleaned, core):
+    """
+    Assemble the public result dict.
+    """
+    result = {"raw": raw, "cleaned": cleaned}
+    result.update(core)
     return result
 
+def predict_category(raw_text, merchant_code=None, top_k=None):
+    """
+    Public inference function used by demo and scripts.
+    Returns a dict: raw, cleaned, tag, category, confidence, low_confidence,
+    maybe by_rule, by_index or by_code. A `merchant_code` found in the config's
+    merchant_code_map decides the tag on its own; the text is then not even
+    cleaned ("cleaned" is "").
+    With `top_k`, the dict also has "decision" (accept/review/abstain) and
+    "top_k": up to top_k {tag, category, confidence} suggestions, best first.
+    """
+    m = _METRICS
+    if m is not None:
+        return _predict_category_timed(raw_text, m, merchant_code=merchant_code, k=top_k)
+
+    snap = _load()  # latest model/vectorizer/config, checked at most every RELOAD_INTERVAL
+    return _predict_with(raw_text, snap, merchant_code, top_k)
+
+def _cache_key(snap, cleaned, k):
+    return (snap.version, cleaned, k) if k else (snap.version, cleaned)
+
+def _predict_with(raw_text, snap, merchant_code=None, k=None):
+    """
+    predict_category on a given snapshot (untimed).
+    """
+    raw = raw_text or ""
+    coded = _code_lookup(merchant_code, snap)
+    if coded:
+        return _build_result(raw, "", _core_result(coded, None, k))
+    cleaned = clean_transaction(raw)
+
+    key = _cache_key(snap, cleaned, k)
+    core = _CACHE.get(key)
+    if core is None:
+        # normalized for rules (optional)
+        cleaned_for_rules = normalize_for_rules(cleaned)
+
+        # 1) Rule override, 2) fingerprint index, 3) ML fallback
+        r = rule_override(cleaned_for_rules, snap.config) or _index_lookup(cleaned, snap)
+        core = _core_result(r, None if r else _ml_predict(cleaned, snap, k), k)
+        _CACHE.put(key, core)
+
+    return _build_result(raw, cleaned, core)
+
+def _source(core):
+    if core.get("by_code"):
+        return "code"
+    if core.get("by_rule"):
+        return "rule"
+    if core.get("by_index"):
+        return "index"
+    return "unknown" if core["tag"] == "unknown" and core["confidence"] == 0.0 else "ml"
+
+def _predict_category_timed(raw_text, m, snap=None, merchant_code=None, k=None):
+    """
+    predict_category with every stage timed into registry `m`.
+    Kept separate so the uninstrumented path pays a single None check.
+    """
+    clock = time.perf_counter
+    t0 = clock()
+    snap = snap or _load()
+    t1 = clock()
+    raw = raw_text or ""
+    coded = _code_lookup(merchant_code, snap)
+    if coded:
+        m.observe("stage_seconds", t1 - t0, labels={"stage": "load"})
+        m.inc("predictions_total", labels={"source": "code"})
+        m.observe("stage_seconds", clock() - t0, labels={"stage": "total"})
+        return _build_result(raw, "", _core_result(coded, None, k))
+    cleaned = clean_transaction(raw)
+    t2 = clock()
+    key = _cache_key(snap, cleaned, k)
+    core = _CACHE.get(key)
+    t3 = clock()
+    m.observe("stage_seconds", t1 - t0, labels={"stage": "load"})
+    m.observe("stage_seconds", t2 - t1, labels={"stage": "clean"})
+    m.observe("stage_seconds", t3 - t2, labels={"stage": "cache"})
+    m.inc("cache_total", labels={"result": "miss" if core is None else "hit"})
+    if core is None:
+        r = rule_override(normalize_for_rules(cleaned), snap.config)
+        t4 = clock()
+        m.observe("stage_seconds", t4 - t3, labels={"stage": "rules"})
+        if not r and snap.index is not None:
+            r = _index_lookup(cleaned, snap)
+            m.observe("stage_seconds", clock() - t4, labels={"stage": "index"})
+        core = _core_result(r, None if r else _ml_predict(cleaned, snap, k), k)
+        _CACHE.put(key, core)
+    m.inc("predictions_total", labels={"source": _source(core)})
+    m.observe("stage_seconds", clock() - t0, labels={"stage": "total"})
+    return _build_result(raw, cleaned, core)
+
+def _predict_chunk(raw_texts, snap, merchant_codes=None, k=None):
+    """
+    Predict one chunk: answer mapped merchant codes, clean every other row,
+    answer what the cache and the rules can, then send all remaining rows
+    through one ML call.
+    """
+    m = _METRICS
+    if m is not None:
+        clock = time.perf_counter
+        t0 = clock()
+    raws = [t or "" for t in raw_texts]
+    coded = [_code_lookup(c, snap) for c in merchant_codes] if merchant_codes is not None and snap.codes else None
+    if coded is None:
+        cleaned = [clean_transaction(t) for t in raws]
+    else:
+        cleaned = ["" if r else clean_transaction(t) for t, r in zip(raws, coded)]
+    if m is not None:
+        t1 = clock()
+    keys = [_cache_key(snap, c, k) for c in cleaned]
+    if coded is None:
+        cores = [_CACHE.get(key) for key in keys]
+    else:
+        cores = [_core_result(r, None, k) if r else _CACHE.get(key) for r, key in zip(coded, keys)]
+    if m is not None:
+        t2 = clock()
+        n_coded = sum(r is not None for r in coded) if coded is not None else 0
+        hits = sum(c is not None for c in cores) - n_coded
+
+    pending = []
+    for i, core in enumerate(cores):
+        if core is not None:
+            continue
+        r = rule_override(normalize_for_rules(cleaned[i]), snap.config)
+        if r:
+            cores[i] = _core_result(r, None, k)
+            _CACHE.put(keys[i], cores[i])
+        else:
+            pending.append(i)
+    if m is not None:
+        t3 = clock()
+        m.observe("batch_stage_seconds", t1 - t0, labels={"stage": "clean"})
+        m.observe("batch_stage_seconds", t2 - t1, labels={"stage": "cache"})
+        m.observe("batch_stage_seconds", t3 - t2, labels={"stage": "rules"})
+
+    if pending and snap.index is not None:
+        cfg = snap.config or {}
+        found = snap.index.lookup_many([cleaned[i] for i in pending])
+        rest = []
+        for i, tag in zip(pending, found):
+            if tag is None:
+                rest.append(i)
+            else:
+                cores[i] = _core_result(_index_result(tag, cfg), None, k)
+                _CACHE.put(keys[i], cores[i])
+        pending = rest
+        if m is not None:
+            m.observe("batch_stage_seconds", clock() - t3, labels={"stage": "index"})
+
+    ml = _ml_predict_many([cleaned[i] for i in pending], snap, k=k) if pending else []
+    for j, i in enumerate(pending):
+        cores[i] = _core_result(None, ml[j] if ml is not None else None, k)
+        _CACHE.put(keys[i], cores[i])
+
+    if m is not None:
+        m.inc("cache_total", hits, labels={"result": "hit"})
+        m.inc("cache_total", len(cores) - hits - n_coded, labels={"result": "miss"})
+        for source in ("code", "rule", "index", "ml", "unknown"):
+            n = sum(_source(c) == source for c in cores)
+            if n:
+                m.inc("predictions_total", n, labels={"source": source})
+        m.observe("batch_stage_seconds", clock() - t0, labels={"stage": "total"})
+    return [_build_result(raws[i], cleaned[i], cores[i]) for i in range(len(raws))]
+
+def iter_categories(raw_texts, chunk_size=DEFAULT_CHUNK_SIZE, merchant_codes=None, top_k=None):
+    """
+    Lazily predict an iterable of raw transaction strings, `chunk_size` rows at a time.
+    Yields the same dicts as predict_category, in input order. Only one chunk's
+    feature matrix and probabilities are held in memory at once.
+    `merchant_codes`, if given, is a parallel iterable of merchant codes.
+    With `top_k`, each dict has "decision" and "top_k" (see predict_category),
+    taken from the same predict_proba call as the prediction.
+    """
+    if chunk_size is None or chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+
+    codes = iter(merchant_codes) if merchant_codes is not None else None
+    chunk, code_chunk = [], []
+    for t in raw_texts:
+        chunk.append(t)
+        if codes is not None:
+            code_chunk.append(next(codes, None))
+        if len(chunk) >= chunk_size:
+            yield from _predict_chunk(chunk, _load(), code_chunk if codes is not None else None, top_k)
+            chunk, code_chunk = [], []
+    if chunk:
+        yield from _predict_chunk(chunk, _load(), code_chunk if codes is not None else None, top_k)
+
+def predict_categories(raw_texts, chunk_size=DEFAULT_CHUNK_SIZE, merchant_codes=None, top_k=None):
+    """
+    Batch counterpart of predict_category.
+    Returns a list with one result dict per input text, in input order.
+    """
+    return list(iter_categories(raw_texts, chunk_size=chunk_size, merchant_codes=merchant_codes, top_k=top_k))
+
+if os.environ.get("FINSORT_METRICS", "").lower() in ("1", "true", "yes"):
+    enable_metrics()
+
+_disk = os.environ.get("FINSORT_DISK_CACHE", "")
+if _disk and _disk.lower() not in ("0", "false", "no"):
+    enable_disk_cache(None if _disk.lower() in ("1", "true", "yes") else _disk)
+
 if __name__ == "__main__":
     tests = [
         "AMZN MKTP AY12B3 *PRIME",
@@ -0,0 +1,69 @@
+# finsort/matcher.py
+# Multi-pattern merchant matcher used by the rule layer.
+
+_END = ""  # trie marker; edges are single characters so "" never collides
+
+
+class MerchantMatcher:
+    """
+    Character trie compiled once from a {merchant key: value} table.
+
+    Matching rules:
+    - a key must start at the beginning of a word ("ola" does not match
+      inside "cola" or "granola"), but may run into trailing characters
+      ("netflix572", "swiggyonline" still match)
+    - keys may span words ("coffee day"); whitespace is compared as a single space
+    - when several keys match, the longest key wins; ties go to the leftmost match
+
+    Lookup walks the trie from each word start, so its cost depends on the
+    text length and the longest key, not on the number of keys.
+    """
+
+    def __init__(self, mapping):
+        self._root = {}
+        self._size = 0
+        for key, value in mapping.items():
+            key = " ".join(str(key).lower().split())
+            if not key:
+                continue
+            node = self._root
+            for ch in key:
+                node = node.setdefault(ch, {})
+            if _END not in node:
+                self._size += 1
+            node[_END] = (key, value)
+
+    def __len__(self):
+        return self._size
+
+    def find(self, text):
+        """
+        Return (key, value) for the best match in `text`, or None.
+        """
+        s = " ".join((text or "").lower().split())
+        n = len(s)
+        root = self._root
+        best = None
+        best_len = 0
+        start = 0
+        while start < n:
+            node = root
+            pos = start
+            while True:
+                hit = node.get(_END)
+                # strictly longer only: on a tie the earlier start is kept
+                if hit is not None and pos - start > best_len:
+                    best = hit
+                    best_len = pos - start
+                if pos >= n:
+                    break
+                node = node.get(s[pos])
+                if node is None:
+                    break
+                pos += 1
+            # jump to the next word start
+            nxt = s.find(" ", start)
+            if nxt < 0:
+                break
+            start = nxt + 1
+        return best
@@ -0,0 +1,164 @@
+# finsort/metrics.py
+"""
+Small in-process metrics registry: counters, gauges and latency histograms,
+dumpable as JSON or Prometheus text exposition format.
+
+Metrics are identified by name plus an optional label dict:
+    reg.inc("predictions_total", labels={"source": "rule"})
+    reg.observe("stage_seconds", 0.00012, labels={"stage": "clean"})
+    print(reg.to_prometheus())
+"""
+
+import json
+import math
+import threading
+from bisect import bisect_left
+
+# latency buckets (seconds): 5 us .. 2.5 s
+DEFAULT_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def _label_str(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join('{}="{}"'.format(k, esc(v)) for k, v in pairs) + "}"
+
+
+def _fmt(v):
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)  # last slot: above the largest bound
+        self.count = 0
+        self.sum = 0.0
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms. `prefix` is prepended to
+    every name in the Prometheus output; `help` maps names to HELP text.
+    """
+
+    def __init__(self, prefix="finsort", buckets=DEFAULT_BUCKETS, help=None):
+        self.prefix = prefix
+        self.buckets = tuple(sorted(buckets))
+        self.help = dict(help or {})
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, labels=None):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, labels=None):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name, seconds, labels=None):
+        key = _key(name, labels)
+        slot = bisect_left(self.buckets, seconds)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = _Histogram(len(self.buckets))
+            h.counts[slot] += 1
+            h.count += 1
+            h.sum += seconds
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    # ---- export ----
+
+    def snapshot(self):
+        """
+        Plain-dict view: {"counters": {name: {labels: value}}, "gauges": ..., "histograms": ...}.
+        Label sets are rendered as `k=v,k=v` ("" when unlabelled).
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            hists = {k: (list(h.counts), h.count, h.sum) for k, h in self._histograms.items()}
+
+        lbl = lambda labels: ",".join("{}={}".format(k, v) for k, v in labels)
+        out = {"counters": {}, "gauges": {}, "histograms": {}}
+        for (name, labels), v in sorted(counters.items()):
+            out["counters"].setdefault(name, {})[lbl(labels)] = v
+        for (name, labels), v in sorted(gauges.items()):
+            out["gauges"].setdefault(name, {})[lbl(labels)] = v
+        for (name, labels), (counts, count, total) in sorted(hists.items()):
+            out["histograms"].setdefault(name, {})[lbl(labels)] = {
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "p50": self._quantile(counts, count, 0.50),
+                "p99": self._quantile(counts, count, 0.99),
+            }
+        return out
+
+    def _quantile(self, counts, count, q):
+        # upper bound of the bucket holding the q-th observation
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else math.inf
+        return math.inf
+
+    def to_json(self, indent=None):
+        return json.dumps(self.snapshot(), indent=indent, default=str)
+
+    def to_prometheus(self):
+        """
+        Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            hists = sorted((k, (list(h.counts), h.count, h.sum)) for k, h in self._histograms.items())
+
+        lines, typed = [], set()
+
+        def header(name, kind):
+            full = "{}_{}".format(self.prefix, name) if self.prefix else name
+            if full not in typed:
+                typed.add(full)
+                if name in self.help:
+                    lines.append("# HELP {} {}".format(full, self.help[name]))
+                lines.append("# TYPE {} {}".format(full, kind))
+            return full
+
+        for (name, labels), v in counters:
+            lines.append("{}{} {}".format(header(name, "counter"), _label_str(labels), _fmt(v)))
+        for (name, labels), v in gauges:
+            lines.append("{}{} {}".format(header(name, "gauge"), _label_str(labels), _fmt(v)))
+        for (name, labels), (counts, count, total) in hists:
+            full = header(name, "histogram")
+            cum = 0
+            for bound, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                lines.append("{}_bucket{} {}".format(full, _label_str(labels, [("le", _fmt(bound))]), cum))
+            lines.append("{}_sum{} {}".format(full, _label_str(labels), _fmt(total)))
+            lines.append("{}_count{} {}".format(full, _label_str(labels), count))
+        return "\n".join(lines) + "\n"
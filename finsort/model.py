@@ -1,21 +1,47 @@
-import joblib
+import json
+import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, f1_score
-from .cleaner import clean_transaction
+from .frame import clean_series
+from .pipeline import load_training_data
+from . import registry
 import os
 
 BASE = os.path.dirname(__file__)
-MODEL_PATH = os.path.join(BASE, "model.pkl")
-VECT_PATH = os.path.join(BASE, "vectorizer.pkl")
+CONFIG_PATH = os.path.join(BASE, "config.json")
+
+class WrappedModel:
+    """
+    Classifier trained on label-encoded targets that restores the original
+    labels on predict. Lives here (not in train.py) so pickles load anywhere.
+    """
+
+    def __init__(self, model, label_encoder):
+        self.model = model
+        self.le = label_encoder
+        # sklearn CalibratedClassifierCV keeps classes_ as encoded integers
+        self.classes_ = self.le.inverse_transform(np.arange(len(self.le.classes_)))
+
+    def predict_proba(self, X):
+        return self.model.predict_proba(X)
+
+    def predict(self, X):
+        preds = self.model.predict(X)
+        return self.le.inverse_transform(preds)
 
 def train_model(csv_path: str = None, save=True):
     if csv_path is None:
         csv_path = os.path.join(BASE, "..", "data", "finsort_train.csv")
-    df = pd.read_csv(csv_path)
-    df['cleaned'] = df['transaction'].apply(clean_transaction)
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        config = {}
+    texts, labels = load_training_data(csv_path, config.get("category_map", {}))
+    df = pd.DataFrame({'cleaned': clean_series(texts), 'tag': labels})
     X_train, X_test, y_train, y_test = train_test_split(
         df['cleaned'], df['tag'], test_size=0.2, random_state=42, stratify=df['tag']
     )
@@ -28,9 +54,8 @@ def train_model(csv_path: str = None, save=True):
     print("Classification report:\n", classification_report(y_test, preds))
     print("Macro F1:", f1_score(y_test, preds, average='macro'))
     if save:
-        joblib.dump(model, MODEL_PATH)
-        joblib.dump(vectorizer, VECT_PATH)
-        print(f"Saved model to {MODEL_PATH} and vectorizer to {VECT_PATH}")
+        manifest = registry.publish(model, vectorizer, config, meta={"trainer": "finsort.model", "rows": len(df)})
+        print(f"Published model {manifest['version']} to {registry.bundle_path(manifest['version'])}")
     return model, vectorizer
 
 if __name__ == '__main__':
@@ -0,0 +1,201 @@
+# finsort/online.py
+"""
+Incremental learning from user feedback, without a full retrain.
+
+A bootstrap fits an SGDClassifier(loss="log_loss") over hashed TF-IDF
+features (finsort.features) on the training CSV once. After that, each
+update reads only the events appended to the feedback store
+(finsort.feedback) since the stored offset and partial_fit's them into
+the model. The result is published with export_model into
+finsort/export_online: new array files are written first and meta.json
+is swapped last. Processes serving with
+FINSORT_BACKEND=online pick it up on their next reload check and keep
+answering from the previous snapshot until then.
+
+State (model, vectorizer, store offset, version) lives in
+finsort/export_online/state.pkl next to the published arrays.
+
+Usage:
+    python -m finsort.online bootstrap [--train data/finsort_train.csv]
+    python -m finsort.online update [--store finsort/feedback] [--epochs 3]
+    python -m finsort.online watch [--interval 2]
+"""
+
+import os
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+from .cleaner import clean_transaction
+from .features import HashedTfidfVectorizer, DEFAULT_N_FEATURES
+from .export import export_model, DEFAULT_ONLINE_DIR
+from .feedback import FeedbackStore, DirLock, DEFAULT_STORE_DIR
+
+BASE = os.path.dirname(__file__)
+TRAIN_PATH = os.path.join(os.path.dirname(BASE), "data", "finsort_train.csv")
+CONFIG_PATH = os.path.join(BASE, "config.json")
+STATE_FILE = "state.pkl"
+
+
+# ---- State ----
+
+def _state_path(out_dir):
+    return os.path.join(out_dir, STATE_FILE)
+
+
+def load_state(out_dir=DEFAULT_ONLINE_DIR):
+    """
+    Return the stored state dict, or None if the online model was never bootstrapped.
+    """
+    path = _state_path(out_dir)
+    if not os.path.exists(path):
+        return None
+    return joblib.load(path)
+
+
+def _publish(state, out_dir):
+    # arrays + meta.json first (atomic for readers), then the state that records the offset;
+    # a crash in between only means the same feedback is applied again next time
+    export_model(state["model"], state["vectorizer"], out_dir)
+    tmp = _state_path(out_dir) + ".tmp"
+    joblib.dump(state, tmp)
+    os.replace(tmp, _state_path(out_dir))
+
+
+# ---- Feedback ----
+
+def resolve_tag(correction, classes, category_map):
+    """
+    Map a correction to a model class: a tag is used as is, a category only
+    if exactly one known tag maps to it. Returns None when ambiguous/unknown.
+    """
+    if correction in classes:
+        return correction
+    candidates = [t for t, c in category_map.items() if c == correction and t in classes]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def _category_map():
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("category_map", {})
+    except Exception:
+        return {}
+
+
+# ---- Training ----
+
+def bootstrap(train_path=TRAIN_PATH, out_dir=DEFAULT_ONLINE_DIR, store_dir=DEFAULT_STORE_DIR,
+              n_features=DEFAULT_N_FEATURES, alpha=1e-4):
+    """
+    Fit the online model from the training CSV and publish version 1.
+    Feedback already in the store is skipped: the offset starts at its end.
+    Labels are model tags, read like train.py reads them (rows without one are dropped).
+    """
+    from .pipeline import load_training_data
+
+    raw, labels = load_training_data(train_path, _category_map())
+    texts = [clean_transaction(t) for t in raw]
+    vect = HashedTfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), n_features=n_features)
+    X = vect.fit_transform(texts)
+    model = SGDClassifier(loss="log_loss", alpha=alpha, random_state=0)
+    model.fit(X, np.asarray(labels, dtype=object))
+
+    with DirLock(out_dir):
+        state = {
+            "model": model,
+            "vectorizer": vect,
+            "store_dir": os.path.abspath(store_dir),
+            "offset": FeedbackStore(store_dir).end_offset(),
+            "version": 1,
+            "applied": 0,
+        }
+        _publish(state, out_dir)
+    return {"rows": len(texts), "classes": len(model.classes_), "version": 1}
+
+
+def update(store_dir=None, out_dir=DEFAULT_ONLINE_DIR, epochs=3, category_map=None):
+    """
+    Apply feedback appended since the last update and publish a new version.
+    Returns a summary dict; nothing is published when there is no usable feedback.
+    """
+    start = time.perf_counter()
+    with DirLock(out_dir):
+        state = load_state(out_dir)
+        if state is None:
+            raise RuntimeError("online model not bootstrapped; run `python -m finsort.online bootstrap`")
+        entries, offset = [], state["offset"]
+        for off, event in FeedbackStore(store_dir or state["store_dir"]).read(state["offset"]):
+            entries.append((event["cleaned"], event["corrected"]))
+            offset = off + 1
+
+        model, vect = state["model"], state["vectorizer"]
+        classes = set(model.classes_)
+        category_map = _category_map() if category_map is None else category_map
+        texts, tags = [], []
+        for cleaned, correction in entries:
+            tag = resolve_tag(correction, classes, category_map)
+            if tag is not None:
+                texts.append(cleaned)
+                tags.append(tag)
+
+        if texts:
+            X = vect.transform(texts)
+            y = np.asarray(tags)
+            for _ in range(max(1, int(epochs))):
+                model.partial_fit(X, y)
+            state["version"] += 1
+            state["applied"] += len(texts)
+        read_to, state["offset"] = state["offset"], offset
+        if texts:
+            _publish(state, out_dir)
+        elif offset != read_to:
+            # only unusable events: remember we read them, the model is unchanged
+            tmp = _state_path(out_dir) + ".tmp"
+            joblib.dump(state, tmp)
+            os.replace(tmp, _state_path(out_dir))
+
+    return {
+        "read": len(entries),
+        "applied": len(texts),
+        "skipped": len(entries) - len(texts),
+        "offset": offset,
+        "version": state["version"],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.online", description="Incremental learning from feedback.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("bootstrap", help="fit the online model from the training CSV")
+    b.add_argument("--train", default=TRAIN_PATH)
+    b.add_argument("--n-features", type=int, default=DEFAULT_N_FEATURES)
+    for name in ("update", "watch"):
+        p = sub.add_parser(name, help="apply new feedback" + (" every --interval seconds" if name == "watch" else ""))
+        p.add_argument("--epochs", type=int, default=3, help="partial_fit passes over each new batch")
+        if name == "watch":
+            p.add_argument("--interval", type=float, default=2.0)
+    for p in sub.choices.values():
+        p.add_argument("--store", default=DEFAULT_STORE_DIR)
+        p.add_argument("--out", default=DEFAULT_ONLINE_DIR)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "bootstrap":
+        print(json.dumps(bootstrap(args.train, args.out, args.store, n_features=args.n_features)))
+        return
+    while True:
+        summary = update(args.store, args.out, epochs=args.epochs)
+        if args.cmd == "update" or summary["applied"]:
+            print(json.dumps(summary), flush=True)
+        if args.cmd == "update":
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+# finsort/pipeline.py
+"""
+Building blocks for train.py: loading labelled data, parallel cleaning, an
+on-disk cache of the cleaned corpus and fitted features, and per-stage
+wall-clock timing.
+
+The cache lives in one directory (TRAIN_CACHE, default .cache/train):
+    cleaned/<key>.pkl   cleaned texts of one chunk of rows; key = hash of
+                        the chunk's raw texts + CLEANER_VERSION
+    features/<key>.pkl  (vectorizer, X, labels); key = hash of the input
+                        CSV + CLEANER_VERSION + vectorizer settings
+
+Chunk-level keys mean that when rows are appended to a CSV (as the feedback
+retrain loop does), only the chunks that changed are cleaned again. The
+cache can be deleted at any time; it is rebuilt on the next run.
+"""
+
+import os
+import time
+import hashlib
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import pandas as pd
+
+from .cleaner import CLEANER_VERSION
+from .frame import clean_series
+from .online import resolve_tag
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "train")
+DEFAULT_CHUNK_SIZE = 10000
+KEEP_FEATURE_SETS = 2
+
+
+def resolve_jobs(n_jobs):
+    """
+    joblib-style worker count: -1 = all cores, None/0 = 1.
+    """
+    cpus = os.cpu_count() or 1
+    if not n_jobs:
+        return 1
+    return max(1, cpus + 1 + n_jobs) if n_jobs < 0 else min(n_jobs, cpus)
+
+
+def file_digest(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _key(*parts):
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(str(p).encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()[:32]
+
+
+# ---- Data ----
+
+def load_training_data(path, category_map=None):
+    """
+    Read a labelled CSV; returns (texts, labels). Labels are model tags:
+    the `tag` column where set, else `category` mapped back to its tag via
+    `category_map` (feedback rows carry a tag or a category name), or to the
+    tag it equals ignoring case. A category that maps to no single tag is
+    kept as a label of its own.
+    """
+    df = pd.read_csv(path)
+    # Try to find right column names
+    for col in ("transaction", "raw"):
+        if col in df.columns:
+            texts = df[col]
+            break
+    else:
+        texts = df.iloc[:, 0]  # fallback: first column
+
+    if "tag" in df.columns or "category" in df.columns:
+        tags = df["tag"] if "tag" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        known = set(tags.dropna().astype(str)) | set(category_map or {})
+        if "category" in df.columns:
+            missing = tags.isna() & df["category"].notna()
+            lower = {t.lower(): t for t in known}
+            resolve = lambda c: resolve_tag(c, known, category_map or {}) or lower.get(c.lower(), c)
+            tags = tags.astype(object).where(~missing, df["category"].astype(str).map(resolve, na_action="ignore"))
+        labels = tags
+    else:
+        labels = df.iloc[:, -1]  # fallback: last column
+
+    keep = labels.notna()
+    return texts[keep].astype(str).tolist(), labels[keep].astype(str).tolist()
+
+
+# ---- Timing ----
+
+class StageTimer:
+    """
+    Wall-clock seconds per named stage, in the order the stages ran.
+        with timer.stage("clean"): ...
+    """
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+    def report(self):
+        total = sum(self.seconds.values())
+        lines = ["{:<12} {:>8.2f}s".format(name, s) for name, s in self.seconds.items()]
+        lines.append("{:<12} {:>8.2f}s".format("total", total))
+        return "\n".join(lines)
+
+
+# ---- Cache ----
+
+class TrainCache:
+    """
+    On-disk cache for train.py; `path=None` disables it (every get misses).
+    Entries are written to a temp file and renamed, so a crashed run never
+    leaves a half-written entry behind.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_DIR):
+        self.path = path
+
+    def _file(self, kind, key):
+        return os.path.join(self.path, kind, key + ".pkl")
+
+    def _get(self, kind, key):
+        if self.path is None:
+            return None
+        try:
+            return joblib.load(self._file(kind, key))
+        except Exception:
+            # missing or unreadable (e.g. written by another library version): a miss
+            return None
+
+    def _put(self, kind, key, value):
+        if self.path is None:
+            return
+        path = self._file(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        joblib.dump(value, tmp)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def chunk_key(texts):
+        return _key(CLEANER_VERSION, len(texts), *texts)
+
+    def get_cleaned(self, key):
+        return self._get("cleaned", key)
+
+    def put_cleaned(self, key, cleaned):
+        self._put("cleaned", key, cleaned)
+
+    @staticmethod
+    def features_key(csv_digest, settings):
+        return _key(csv_digest, CLEANER_VERSION, sorted(settings.items()))
+
+    def get_features(self, key):
+        return self._get("features", key)
+
+    def put_features(self, key, vectorizer, X, labels):
+        if self.path is not None:
+            self._put("features", key, (vectorizer, X, labels))
+            self._prune("features", KEEP_FEATURE_SETS)
+
+    def _prune(self, kind, keep):
+        # feature matrices are large: keep only the most recently written sets
+        folder = os.path.join(self.path, kind)
+        entries = sorted((e for e in os.scandir(folder) if e.name.endswith(".pkl")),
+                         key=lambda e: e.stat().st_mtime, reverse=True)
+        for e in entries[keep:]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+
+# ---- Cleaning ----
+
+def _clean_chunk(texts):
+    return clean_series(texts).tolist()
+
+
+def clean_corpus(texts, n_jobs=-1, chunk_size=DEFAULT_CHUNK_SIZE, cache=None):
+    """
+    Clean `texts` (list of str) in `chunk_size` chunks. Chunks found in `cache`
+    are reused; the rest are cleaned across `n_jobs` processes (in this process
+    when there is only one chunk or one job). Returns (cleaned, cache_hits).
+    """
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    cache = cache or TrainCache(None)
+    keys = [cache.chunk_key(c) for c in chunks]
+    results = [cache.get_cleaned(k) for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+
+    workers = min(resolve_jobs(n_jobs), len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, cleaned in zip(todo, pool.map(_clean_chunk, [chunks[i] for i in todo])):
+                results[i] = cleaned
+    else:
+        for i in todo:
+            results[i] = _clean_chunk(chunks[i])
+    for i in todo:
+        cache.put_cleaned(keys[i], results[i])
+
+    out = []
+    for r in results:
+        out.extend(r)
+    return out, len(chunks) - len(todo)
@@ -0,0 +1,120 @@
+# finsort/predictor.py
+"""
+Thread-safe predictor over one pinned model snapshot.
+
+A Predictor holds a single inference.Snapshot: the model, vectorizer,
+config and fingerprint index that were loaded together. None of it is
+written after loading, so any number of threads can share one Predictor
+without locks. The only shared mutable state it touches is the prediction
+cache and the index hit counters, and both are locked internally. Reloads
+never change a Predictor. Call refreshed() to pick up a newer model, and
+publish the result by rebinding one reference, which is atomic:
+
+    predictor = Predictor()
+    ...
+    predictor = predictor.refreshed()      # e.g. from a watcher thread
+
+predict_batch runs the columnar path (finsort.frame). Its heavy stages
+release the GIL while they run: the pyarrow cleaning and rule-normalization
+kernels, the sparse matrix product and the NumPy probability math. A
+thread pool splitting a large batch across predict_batch calls can
+therefore use more than one core. Rule matching, fingerprint hashing and
+n-gram analysis stay in Python.
+benchmarks/bench_threads.py measures throughput against the number of threads.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from . import inference
+from .results import _batch_result
+
+
+class Predictor:
+    """
+    Predictions from one immutable model snapshot; safe to share across threads.
+    """
+
+    __slots__ = ("_snap",)
+
+    def __init__(self, snapshot=None):
+        snap = snapshot or inference._load()
+        if snap.stamps is None:
+            raise ValueError("snapshot has not been loaded")
+        object.__setattr__(self, "_snap", snap)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Predictor is immutable; use refreshed() for a newer model")
+
+    def __repr__(self):
+        return "Predictor(bundle={!r}, snapshot={})".format(self._snap.bundle, self._snap.version)
+
+    @property
+    def snapshot(self):
+        return self._snap
+
+    @property
+    def bundle(self):
+        """
+        Registry version of the pinned model, or None for legacy model files.
+        """
+        return self._snap.bundle
+
+    def refreshed(self):
+        """
+        A Predictor on the currently served snapshot (self if it has not changed).
+        """
+        snap = inference._load()
+        return self if snap is self._snap else Predictor(snap)
+
+    def predict(self, raw_text, merchant_code=None, top_k=None):
+        """
+        Same dict as inference.predict_category, from the pinned snapshot.
+        """
+        m = inference._METRICS
+        if m is not None:
+            return inference._predict_category_timed(raw_text, m, self._snap, merchant_code, top_k)
+        return inference._predict_with(raw_text, self._snap, merchant_code, top_k)
+
+    def predict_many(self, raw_texts, chunk_size=inference.DEFAULT_CHUNK_SIZE, merchant_codes=None, top_k=None):
+        """
+        Same list of dicts as inference.predict_categories, from the pinned snapshot.
+        """
+        if chunk_size is None or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        texts = list(raw_texts)
+        codes = list(merchant_codes) if merchant_codes is not None else None
+        out = []
+        for start in range(0, len(texts), chunk_size):
+            chunk_codes = codes[start:start + chunk_size] if codes is not None else None
+            out.extend(inference._predict_chunk(texts[start:start + chunk_size], self._snap, chunk_codes, top_k))
+        return out
+
+    def predict_batch(self, raw_texts, merchant_codes=None, top_k=None):
+        """
+        Columnar results (a finsort.results.BatchResult) from the pinned snapshot.
+        """
+        return _batch_result(raw_texts, self._snap, merchant_codes, top_k)
+
+    def map_batches(self, raw_texts, threads=4, chunk_size=inference.DEFAULT_CHUNK_SIZE,
+                    merchant_codes=None, top_k=None):
+        """
+        predict_batch over `chunk_size`-row slices on a pool of `threads`
+        threads, with `merchant_codes` sliced alongside the texts. Returns
+        one BatchResult per slice, in input order.
+        """
+        if chunk_size is None or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        texts = list(raw_texts)
+        codes = list(merchant_codes) if merchant_codes is not None else None
+        starts = range(0, len(texts), chunk_size)
+        chunks = [texts[i:i + chunk_size] for i in starts]
+        code_chunks = [codes[i:i + chunk_size] for i in starts] if codes is not None else [None] * len(chunks)
+
+        def run(chunk, chunk_codes):
+            return self.predict_batch(chunk, chunk_codes, top_k)
+
+        if threads <= 1 or len(chunks) <= 1:
+            return [run(c, k) for c, k in zip(chunks, code_chunks)]
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="finsort-predict") as pool:
+            return list(pool.map(run, chunks, code_chunks))
+
@@ -0,0 +1,306 @@
+# finsort/registry.py
+"""
+Versioned model registry: one immutable bundle per trained model.
+
+Layout (default finsort/models):
+    versions/v0001/model.pkl        WrappedModel (or any classifier with classes_)
+    versions/v0001/vectorizer.pkl
+    versions/v0001/config.json      config at publish time (tag -> category map, thresholds)
+    versions/v0001/export/          NumPy export for FINSORT_BACKEND=npy
+    versions/v0001/export_linear/   collapsed export for FINSORT_BACKEND=linear
+    versions/v0001/manifest.json    version, file checksums, classes, training metadata
+    CURRENT                         {"version": ..., "previous": ...}
+
+A bundle is written into a temp directory and renamed into versions/ in one
+step, then made read-only; it is never modified afterwards. Serving
+processes follow CURRENT, which is replaced atomically, so they only ever
+see a complete bundle: there is no window in which a new model can be
+paired with an old vectorizer. Rolling back is re-pointing CURRENT.
+
+Usage:
+    python -m finsort.registry list
+    python -m finsort.registry activate v0003
+    python -m finsort.registry rollback
+    python -m finsort.registry verify [v0003]
+    python -m finsort.registry prune --keep 5
+"""
+
+import os
+import json
+import stat
+import time
+import shutil
+import hashlib
+import argparse
+
+import joblib
+
+from .export import export_model
+from .feedback import DirLock
+
+BASE = os.path.dirname(__file__)
+DEFAULT_REGISTRY_DIR = os.path.join(BASE, "models")
+MODEL_FILE = "model.pkl"
+VECT_FILE = "vectorizer.pkl"
+CONFIG_FILE = "config.json"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+# backend name -> export subdirectory inside a bundle
+EXPORTS = {"npy": "export", "linear": "export_linear"}
+
+
+# ---- Paths ----
+
+def _versions_dir(root):
+    return os.path.join(root, "versions")
+
+
+def bundle_path(version, root=DEFAULT_REGISTRY_DIR):
+    return os.path.join(_versions_dir(root), version)
+
+
+def list_versions(root=DEFAULT_REGISTRY_DIR):
+    """
+    Published versions, oldest first.
+    """
+    try:
+        names = os.listdir(_versions_dir(root))
+    except FileNotFoundError:
+        return []
+    return sorted(n for n in names if n.startswith("v") and n[1:].isdigit())
+
+
+def _sha256(path, block_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _bundle_files(path):
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            full = os.path.join(dirpath, name)
+            rel = os.path.relpath(full, path).replace(os.sep, "/")
+            if rel != MANIFEST_FILE:
+                yield rel, full
+
+
+def _write_json(path, data):
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ---- Pointer ----
+
+def read_pointer(root=DEFAULT_REGISTRY_DIR):
+    """
+    The CURRENT pointer as a dict ({"version", "previous", "activated"}), or None.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def current_version(root=DEFAULT_REGISTRY_DIR):
+    pointer = read_pointer(root)
+    return pointer["version"] if pointer else None
+
+
+def _activate(root, version):
+    if not os.path.exists(os.path.join(bundle_path(version, root), MANIFEST_FILE)):
+        raise ValueError("unknown model version {!r} in {}".format(version, root))
+    pointer = read_pointer(root) or {}
+    old = pointer.get("version")
+    new = {
+        "version": version,
+        "previous": pointer.get("previous") if old == version else old,
+        "activated": time.time(),
+    }
+    _write_json(os.path.join(root, CURRENT_FILE), new)
+    return new
+
+
+def activate(version, root=DEFAULT_REGISTRY_DIR):
+    """
+    Point CURRENT at `version`; the version it replaces becomes `previous`.
+    """
+    with DirLock(root):
+        return _activate(root, version)
+
+
+def rollback(root=DEFAULT_REGISTRY_DIR):
+    """
+    Point CURRENT back at the previously active version. Returns the new pointer.
+    """
+    with DirLock(root):
+        pointer = read_pointer(root)
+        if not pointer or not pointer.get("previous"):
+            raise RuntimeError("no previous model version to roll back to")
+        return _activate(root, pointer["previous"])
+
+
+# ---- Publishing ----
+
+def publish(model, vectorizer, config=None, root=DEFAULT_REGISTRY_DIR, meta=None, exports=True, make_current=True):
+    """
+    Write a new immutable bundle and (by default) make it current.
+    `meta` is stored in the manifest (training data hash, timings, ...).
+    Exports the backends in EXPORTS unless exports=False; a model the
+    exporter does not support is published without them.
+    Returns the manifest dict.
+    """
+    os.makedirs(_versions_dir(root), exist_ok=True)
+    with DirLock(root):
+        existing = list_versions(root)
+        version = "v{:04d}".format(int(existing[-1][1:]) + 1 if existing else 1)
+        tmp = os.path.join(root, ".tmp-{}-{}".format(version, os.getpid()))
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        try:
+            joblib.dump(model, os.path.join(tmp, MODEL_FILE))
+            joblib.dump(vectorizer, os.path.join(tmp, VECT_FILE))
+            with open(os.path.join(tmp, CONFIG_FILE), "w", encoding="utf-8") as f:
+                json.dump(config or {}, f, indent=2)
+
+            exported, export_errors = [], {}
+            for backend, sub in (EXPORTS.items() if exports else ()):
+                try:
+                    export_model(model, vectorizer, os.path.join(tmp, sub), collapse=(backend == "linear"))
+                    exported.append(backend)
+                except ValueError as e:
+                    shutil.rmtree(os.path.join(tmp, sub), ignore_errors=True)
+                    export_errors[backend] = str(e)
+
+            manifest = {
+                "version": version,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "classes": [str(c) for c in getattr(model, "classes_", [])],
+                "exports": exported,
+                "files": {rel: _sha256(full) for rel, full in sorted(_bundle_files(tmp))},
+                "meta": meta or {},
+            }
+            if export_errors:
+                manifest["export_errors"] = export_errors
+            _write_json(os.path.join(tmp, MANIFEST_FILE), manifest)
+
+            for full in [f for _, f in _bundle_files(tmp)] + [os.path.join(tmp, MANIFEST_FILE)]:
+                os.chmod(full, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            os.rename(tmp, bundle_path(version, root))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        if make_current:
+            _activate(root, version)
+    return manifest
+
+
+# ---- Loading ----
+
+def load_manifest(version, root=DEFAULT_REGISTRY_DIR):
+    with open(os.path.join(bundle_path(version, root), MANIFEST_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_config(version, root=DEFAULT_REGISTRY_DIR):
+    with open(os.path.join(bundle_path(version, root), CONFIG_FILE), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify(version, root=DEFAULT_REGISTRY_DIR):
+    """
+    Files of `version` whose checksum no longer matches the manifest (empty list = intact).
+    """
+    path = bundle_path(version, root)
+    bad = []
+    for rel, digest in load_manifest(version, root)["files"].items():
+        full = os.path.join(path, rel)
+        if not os.path.exists(full) or _sha256(full) != digest:
+            bad.append(rel)
+    return bad
+
+
+def load_bundle(version=None, root=DEFAULT_REGISTRY_DIR, check=False):
+    """
+    Load (model, vectorizer, config, manifest) of `version` (default: current).
+    check=True verifies the checksums first and raises on a mismatch.
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError("no current model version in {}".format(root))
+    if check:
+        bad = verify(version, root)
+        if bad:
+            raise ValueError("model bundle {} is corrupt: {}".format(version, ", ".join(bad)))
+    path = bundle_path(version, root)
+    manifest = load_manifest(version, root)
+    model = joblib.load(os.path.join(path, MODEL_FILE))
+    vectorizer = joblib.load(os.path.join(path, VECT_FILE))
+    return model, vectorizer, load_config(version, root), manifest
+
+
+def prune(keep=5, root=DEFAULT_REGISTRY_DIR):
+    """
+    Delete all but the newest `keep` versions; current and previous are always kept.
+    Returns the removed versions.
+    """
+    with DirLock(root):
+        pointer = read_pointer(root) or {}
+        pinned = {pointer.get("version"), pointer.get("previous")}
+        versions = list_versions(root)
+        removed = [v for v in versions[:max(0, len(versions) - keep)] if v not in pinned]
+        for v in removed:
+            path = bundle_path(v, root)
+            for dirpath, _, files in os.walk(path):
+                for name in files:
+                    os.chmod(os.path.join(dirpath, name), stat.S_IRUSR | stat.S_IWUSR)
+            shutil.rmtree(path)
+    return removed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.registry", description="Manage versioned model bundles.")
+    ap.add_argument("--root", default=DEFAULT_REGISTRY_DIR)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list", help="published versions (* = current)")
+    a = sub.add_parser("activate", help="make VERSION current")
+    a.add_argument("version")
+    sub.add_parser("rollback", help="make the previous version current")
+    v = sub.add_parser("verify", help="check bundle checksums")
+    v.add_argument("version", nargs="?")
+    p = sub.add_parser("prune", help="delete old versions")
+    p.add_argument("--keep", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "list":
+        current = current_version(args.root)
+        for version in list_versions(args.root):
+            m = load_manifest(version, args.root)
+            print("{} {} {}  {} classes  exports: {}".format(
+                "*" if version == current else " ", version, m["created"], len(m["classes"]),
+                ",".join(m["exports"]) or "-"))
+    elif args.cmd in ("activate", "rollback"):
+        pointer = activate(args.version, args.root) if args.cmd == "activate" else rollback(args.root)
+        print(json.dumps(pointer))
+    elif args.cmd == "verify":
+        version = args.version or current_version(args.root)
+        if version is None:
+            raise SystemExit("no current version")
+        bad = verify(version, args.root)
+        print("{}: {}".format(version, "ok" if not bad else "CORRUPT " + ", ".join(bad)))
+        if bad:
+            raise SystemExit(1)
+    else:
+        print(json.dumps({"removed": prune(args.keep, args.root)}))
+
+
+if __name__ == "__main__":
+    main()
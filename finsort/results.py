@@ -0,0 +1,249 @@
+# finsort/results.py
+"""
+Columnar results for bulk categorization.
+
+A list of predict_categories dicts costs roughly a kilobyte per row: seven
+keys, a float and fresh references to the raw, cleaned, tag and category
+strings. BatchResult stores the same information as a few flat arrays
+instead:
+
+    raw_codes, cleaned_codes    int32 (or smaller) codes into the distinct raw / cleaned texts
+    tag_codes, category_codes   int8/int16 codes into small label tables
+    confidence                  float32
+    flags                       uint8 bitmask (LOW_CONFIDENCE | BY_RULE | BY_INDEX | BY_CODE | ABSTAIN)
+
+which is at most 15-17 bytes per row plus the distinct strings. With
+top_k, each row also holds k tag/category codes and k float32 confidences
+for its suggestions, and the decision is read off the flags. to_pandas turns
+the label columns into Categoricals over the stored codes, so no per-row
+strings are created, and indexing still returns the familiar dict:
+
+    res = predict_batch(texts)
+    res[0]          # {"raw": ..., "cleaned": ..., "tag": ..., "category": ..., ...}
+    res.to_csv("categorized.csv")
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+from . import inference
+from .frame import _categorize_values
+
+LOW_CONFIDENCE = 1
+BY_RULE = 2
+BY_INDEX = 4
+BY_CODE = 8
+ABSTAIN = 16
+COLUMNS = ["raw", "cleaned", "tag", "category", "confidence", "low_confidence", "by_rule", "by_index", "by_code"]
+_FLAGS = {"low_confidence": LOW_CONFIDENCE, "by_rule": BY_RULE, "by_index": BY_INDEX, "by_code": BY_CODE, "abstain": ABSTAIN}
+
+
+def _code_dtype(n):
+    # smallest signed type pandas accepts as Categorical codes
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _encode(values):
+    """
+    (codes, table) for an object array: `table` holds each distinct value once, interned.
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    table = np.array([sys.intern(v) if type(v) is str else v for v in uniques], dtype=object)
+    return codes.astype(_code_dtype(len(table)), copy=False), table
+
+
+class BatchResult:
+    """
+    Categorization results for a batch, one entry per input row, stored column-wise.
+    """
+
+    def __init__(self, raw_codes, raws, cleaned_codes, cleaned, tag_codes, tags,
+                 category_codes, categories, confidence, flags,
+                 top_tag_codes=None, top_category_codes=None, top_confidence=None):
+        self.raw_codes = raw_codes
+        self.raws = raws
+        self.cleaned_codes = cleaned_codes
+        self.cleaned = cleaned
+        self.tag_codes = tag_codes
+        self.tags = tags
+        self.category_codes = category_codes
+        self.categories = categories
+        self.confidence = confidence
+        self.flags = flags
+        # (n, k) suggestion codes into tags / categories (-1 pads) and
+        # confidences (NaN pads), or None when top_k was not requested
+        self.top_tag_codes = top_tag_codes
+        self.top_category_codes = top_category_codes
+        self.top_confidence = top_confidence
+
+    def __len__(self):
+        return len(self.flags)
+
+    def __getitem__(self, i):
+        """
+        Row `i` as the dict predict_category returns.
+        """
+        if not -len(self) <= i < len(self):
+            raise IndexError("row {} out of range for {} rows".format(i, len(self)))
+        flags = int(self.flags[i])
+        out = {
+            "raw": self.raws[self.raw_codes[i]],
+            "cleaned": self.cleaned[self.cleaned_codes[i]],
+            "tag": self.tags[self.tag_codes[i]],
+            "category": self.categories[self.category_codes[i]],
+            "confidence": float(self.confidence[i]),
+            "low_confidence": bool(flags & LOW_CONFIDENCE),
+        }
+        if flags & BY_RULE:
+            out["by_rule"] = True
+        if flags & BY_INDEX:
+            out["by_index"] = True
+        if flags & BY_CODE:
+            out["by_code"] = True
+        if self.top_k:
+            out["decision"] = inference.DECISIONS[self._decision(flags)]
+            out["top_k"] = [
+                {"tag": self.tags[t], "category": self.categories[c], "confidence": float(p)}
+                for t, c, p in zip(self.top_tag_codes[i], self.top_category_codes[i], self.top_confidence[i])
+                if t >= 0
+            ]
+        return out
+
+    @staticmethod
+    def _decision(flags):
+        if flags & ABSTAIN:
+            return inference.ABSTAIN
+        return inference.REVIEW if flags & LOW_CONFIDENCE else inference.ACCEPT
+
+    @property
+    def top_k(self):
+        """
+        Number of suggestion slots per row (0 when top_k was not requested).
+        """
+        return 0 if self.top_tag_codes is None else self.top_tag_codes.shape[1]
+
+    def decisions(self):
+        """
+        uint8 array of decision codes (indices into inference.DECISIONS).
+        """
+        low = (self.flags & LOW_CONFIDENCE) != 0
+        abstain = (self.flags & ABSTAIN) != 0
+        return np.where(abstain, inference.ABSTAIN, np.where(low, inference.REVIEW, inference.ACCEPT)).astype(np.uint8)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_dicts(self):
+        return list(self)
+
+    def flag(self, name):
+        """
+        Boolean array for one flag: "low_confidence", "by_rule", "by_index", "by_code" or "abstain".
+        """
+        return (self.flags & _FLAGS[name]) != 0
+
+    @property
+    def nbytes(self):
+        """
+        Approximate memory held: the per-row arrays plus the distinct strings.
+        """
+        arrays = (self.raw_codes, self.cleaned_codes, self.tag_codes, self.category_codes,
+                  self.confidence, self.flags, self.raws, self.cleaned, self.tags, self.categories)
+        if self.top_k:
+            arrays += (self.top_tag_codes, self.top_category_codes, self.top_confidence)
+        strings = (self.raws, self.cleaned, self.tags, self.categories)
+        return sum(a.nbytes for a in arrays) + sum(sys.getsizeof(s) for t in strings for s in t)
+
+    def to_pandas(self, prefix="", index=None):
+        """
+        DataFrame with the COLUMNS (named with `prefix`). Text and label
+        columns are Categoricals over the stored codes; confidence stays float32.
+        With top_k, decision and top1_tag, top1_confidence, ... follow.
+        """
+        def cat(codes, table):
+            return pd.Categorical.from_codes(codes, categories=pd.Index(table, dtype=object), validate=False)
+
+        data = {
+            "raw": cat(self.raw_codes, self.raws),
+            "cleaned": cat(self.cleaned_codes, self.cleaned),
+            "tag": cat(self.tag_codes, self.tags),
+            "category": cat(self.category_codes, self.categories),
+            "confidence": self.confidence,
+        }
+        for name in COLUMNS[5:]:
+            data[name] = self.flag(name)
+        out = {prefix + k: data[k] for k in COLUMNS}
+        if self.top_k:
+            out[prefix + "decision"] = cat(self.decisions().astype(np.int8), list(inference.DECISIONS))
+            for j in range(self.top_k):
+                out["{}top{}_tag".format(prefix, j + 1)] = cat(self.top_tag_codes[:, j], self.tags)
+                out["{}top{}_confidence".format(prefix, j + 1)] = self.top_confidence[:, j]
+        return pd.DataFrame(out, index=index, copy=False)
+
+    def to_csv(self, path_or_buf=None, prefix="", **kwargs):
+        """
+        Write the COLUMNS as CSV (returns the text when `path_or_buf` is None).
+        """
+        return self.to_pandas(prefix).to_csv(path_or_buf, index=False, **kwargs)
+
+
+def predict_batch(raw_texts, merchant_codes=None, top_k=None):
+    """
+    Categorize a sequence of raw transaction strings (list, array or Series),
+    with an optional parallel sequence of merchant codes.
+    Same results as predict_categories, returned as a BatchResult;
+    confidences are float32.
+    """
+    return _batch_result(raw_texts, inference._load(), merchant_codes, top_k)
+
+
+def _batch_result(raw_texts, snap, merchant_codes=None, top_k=None):
+    if not hasattr(raw_texts, "__len__"):
+        raw_texts = list(raw_texts)
+    if merchant_codes is not None and not hasattr(merchant_codes, "__len__"):
+        merchant_codes = list(merchant_codes)
+    raw_codes, raws, result_codes, columns = _categorize_values(raw_texts, snap, merchant_codes, top_k)
+
+    # per-result-entry codes, then gathered to rows once; suggestions share
+    # the tag and category tables (None pads encode to -1)
+    n = len(columns["tag"])
+    tag_values, category_values = columns["tag"], columns["category"]
+    if top_k:
+        top_tags = columns["top_tags"]
+        cfg_map = (snap.config or {}).get("category_map", {})
+        tag_s = pd.Series(top_tags.ravel(), dtype=object)
+        top_cats = tag_s.map(cfg_map).fillna(tag_s).to_numpy(dtype=object).reshape(top_tags.shape)
+        same = top_tags[:, 0] == tag_values  # a row's own tag keeps its category
+        top_cats[same, 0] = category_values[same]
+        tag_values = np.concatenate([tag_values, top_tags.ravel()])
+        category_values = np.concatenate([category_values, top_cats.ravel()])
+    cleaned_codes, cleaned = _encode(columns["cleaned"])
+    tag_codes, tags = _encode(tag_values)
+    category_codes, categories = _encode(category_values)
+    flags = (columns["low_confidence"] * LOW_CONFIDENCE
+             | columns["by_rule"] * BY_RULE
+             | columns["by_index"] * BY_INDEX
+             | columns["by_code"] * BY_CODE
+             | (columns["decision"] == inference.ABSTAIN) * ABSTAIN).astype(np.uint8)
+    top = {}
+    if top_k:
+        top = {
+            "top_tag_codes": tag_codes[n:].reshape(n, top_tags.shape[1])[result_codes],
+            "top_category_codes": category_codes[n:].reshape(n, top_tags.shape[1])[result_codes],
+            "top_confidence": columns["top_confidence"].astype(np.float32)[result_codes],
+        }
+    row_dtype = _code_dtype(max(len(raws), len(cleaned)))
+    return BatchResult(
+        raw_codes.astype(row_dtype, copy=False), raws,
+        cleaned_codes.astype(row_dtype, copy=False)[result_codes], cleaned,
+        tag_codes[:n][result_codes], tags,
+        category_codes[:n][result_codes], categories,
+        columns["confidence"].astype(np.float32)[result_codes],
+        flags[result_codes],
+        **top
+    )
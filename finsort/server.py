@@ -0,0 +1,304 @@
+# finsort/server.py
+"""
+Local asyncio HTTP inference server with request micro-batching.
+
+Concurrent requests are queued and coalesced into one batch (up to
+`max_batch` rows, waiting at most `max_wait_ms` after the first row
+arrives); each batch is scored with a single predict_categories call,
+i.e. one vectorizer transform + predict_proba.
+
+Endpoints:
+    POST /predict          {"text": "..."}            -> result dict
+    POST /predict/batch    {"texts": ["...", ...]}    -> {"results": [...]}
+    GET  /stats            latency p50/p99, batch-size histogram and fingerprint index hit rate
+    GET  /metrics          inference metrics, Prometheus text (404 unless enabled)
+    GET  /health           status and the registry version being served
+
+Usage:
+    python -m finsort.server --port 8080 --max-batch 256 --max-wait-ms 5
+"""
+
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from . import inference
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+class LatencyStats:
+    """
+    Rolling request latencies (last `window` requests) plus a power-of-two
+    histogram of batch sizes.
+    """
+
+    def __init__(self, window=10000):
+        self.latencies_ms = deque(maxlen=window)
+        self.batch_hist = {}
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+
+    def record_request(self, ms, rows):
+        self.latencies_ms.append(ms)
+        self.requests += 1
+        self.rows += rows
+
+    def record_batch(self, size):
+        self.batches += 1
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        self.batch_hist[bucket] = self.batch_hist.get(bucket, 0) + 1
+
+    @staticmethod
+    def _percentile(sorted_vals, q):
+        if not sorted_vals:
+            return None
+        idx = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+        return sorted_vals[idx]
+
+    def snapshot(self):
+        vals = sorted(self.latencies_ms)
+        return {
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+            "latency_ms": {
+                "p50": self._percentile(vals, 0.50),
+                "p99": self._percentile(vals, 0.99),
+                "max": vals[-1] if vals else None,
+            },
+            # keys are upper bounds: "8" counts batches of 5..8 rows
+            "batch_size_hist": {str(k): v for k, v in sorted(self.batch_hist.items())},
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent prediction requests into batches.
+    `predict_many(texts)` runs in a worker thread so the event loop stays responsive.
+    """
+
+    def __init__(self, predict_many=None, max_batch=256, max_wait_ms=5.0, stats=None):
+        self.predict_many = predict_many or inference.predict_categories
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.stats = stats or LatencyStats()
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="finsort-batch")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, texts):
+        """
+        Queue `texts` (one request) and wait for its results.
+        """
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(texts), fut))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            rows = len(items[0][0])
+            deadline = loop.time() + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                rows += len(item[0])
+
+            texts = [t for req_texts, _ in items for t in req_texts]
+            self.stats.record_batch(len(texts))
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, lambda: self.predict_many(texts, chunk_size=max(len(texts), 1)))
+            except Exception as e:
+                for _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            pos = 0
+            for req_texts, fut in items:
+                if not fut.done():
+                    fut.set_result(results[pos:pos + len(req_texts)])
+                pos += len(req_texts)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class InferenceServer:
+    """
+    Minimal HTTP/1.1 (keep-alive, JSON only) server in front of a MicroBatcher.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, max_batch=256, max_wait_ms=5.0, predict_many=None):
+        self.host = host
+        self.port = port
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(predict_many, max_batch=max_batch, max_wait_ms=max_wait_ms, stats=self.stats)
+        self._server = None
+
+    async def start(self):
+        # load the model before accepting traffic
+        await asyncio.get_running_loop().run_in_executor(None, inference._load)
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        print("FinSort server listening on http://{}:{}".format(self.host, self.port))
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return {"status": "ok", "model_version": inference._SNAPSHOT.bundle}
+        if path == "/stats":
+            return dict(self.stats.snapshot(), index=inference.index_info())
+        if path == "/metrics":
+            registry = inference.metrics_registry()
+            if registry is None:
+                raise HTTPError(404, "metrics disabled; start with --metrics or FINSORT_METRICS=1")
+            return registry.to_prometheus()
+        if path not in ("/predict", "/predict/batch"):
+            raise HTTPError(404, "unknown path " + path)
+        if method != "POST":
+            raise HTTPError(405, "use POST")
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body is not valid JSON")
+
+        start = time.perf_counter()
+        if path == "/predict":
+            text = payload.get("text") if isinstance(payload, dict) else None
+            if not isinstance(text, str):
+                raise HTTPError(400, 'expected {"text": "..."}')
+            result = (await self.batcher.submit([text]))[0]
+            rows = 1
+        else:
+            texts = payload.get("texts") if isinstance(payload, dict) else None
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise HTTPError(400, 'expected {"texts": ["...", ...]}')
+            result = {"results": await self.batcher.submit(texts) if texts else []}
+            rows = len(texts)
+        self.stats.record_request((time.perf_counter() - start) * 1000.0, rows)
+        return result
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, "body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = 200, await self._route(method.upper(), path.split("?", 1)[0], body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                    keep_alive = keep_alive and e.status != 413
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            body, ctype = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, ctype = json.dumps(payload).encode("utf-8"), "application/json"
+        head = "HTTP/1.1 {} {}\r\nContent-Type: {}\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n".format(
+            status, _REASONS.get(status, ""), ctype, len(body), "keep-alive" if keep_alive else "close")
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.server", description="FinSort HTTP inference server.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--max-batch", type=int, default=256, help="max rows per model call")
+    ap.add_argument("--max-wait-ms", type=float, default=5.0, help="max time to wait for a batch to fill")
+    ap.add_argument("--metrics", action="store_true", help="record inference metrics and serve GET /metrics")
+    args = ap.parse_args(argv)
+    if args.metrics:
+        inference.enable_metrics()
+
+    server = InferenceServer(args.host, args.port, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# finsort/structured.py
+"""
+Columnar parsing of the structured statement columns: amount, date and
+merchant_code.
+
+Real feeds (see data/finsort_test_hard20.csv) carry these next to the
+free-text description, in whatever format the bank chose:
+
+    amount          "₹1,299.00", "32.00INR", "-250.50", "810.00 INR", 1200
+    date            2024/11/05, 08-11-24, 05-Nov, 06-Nov-24, 11/2024, Nov5
+    merchant_code   AMZ-UK, OLA-TRP, FUEL-HP
+
+Everything works on whole columns. Each distinct value is parsed once.
+Amounts are normalized with vectorized string ops. For dates, each value is
+reduced to a shape (digits -> 9, letters -> a, e.g. "99-aaa-99"), and the
+date formats a shape can match are worked out once per process and cached.
+Each shape group is then parsed with pd.to_datetime(format=...), one call
+per candidate format, and never value by value.
+
+Merchant codes are looked up in the config's "merchant_code_map"
+({code: tag}). finsort.inference checks this map before the text rules, and
+a coded row skips cleaning, rules, the fingerprint index and the model.
+`learn` proposes a map from labelled data.
+
+Usage:
+    python -m finsort.structured learn data/finsort_test_hard20.csv --tag-column expected_tag
+    python -m finsort.structured parse data/finsort_test_hard20.csv
+"""
+
+import re
+import json
+import argparse
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# currency markers and thousands separators dropped before parsing; "." is the decimal point
+_AMOUNT_NOISE = r"(?i)₹|\brs\.?|inr|usd|eur|gbp|[$€£,\s]"
+_AMOUNT_PARENS = r"^\((.*)\)$"
+_AMOUNT_TRAILING_MINUS = r"^(.*[0-9.])-$"
+# confidence reported for a merchant_code_map hit: an explicit assignment
+CODE_CONFIDENCE = 1.0
+
+# candidate formats in preference order; day-first formats come before
+# month-first ones unless dayfirst=False
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y%m%d",
+    "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+    "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%m-%d-%Y", "%m/%d/%Y",
+    "%d-%m-%y", "%d/%m/%y", "%d.%m.%y", "%m-%d-%y", "%m/%d/%y",
+    "%d-%b-%Y", "%d-%b-%y", "%d %b %Y", "%d %b %y", "%b %d %Y", "%b %d, %Y", "%d%b%Y", "%d%b%y",
+    "%m/%Y", "%m-%Y", "%Y-%m", "%b-%Y", "%b %Y", "%b-%y",
+    "%d-%b", "%d %b", "%b %d", "%b%d", "%d%b", "%d-%m", "%d/%m", "%d.%m", "%m-%d", "%m/%d",
+    # "09-11" is more likely 9 Nov than Sep 2011 on a statement
+    "%m-%y", "%m/%y",
+]
+# formats without a year; the year is filled in afterwards
+_YEARLESS = {f for f in DATE_FORMATS if "%Y" not in f and "%y" not in f}
+_DIRECTIVE_SHAPES = {"%Y": "9999", "%y": "99", "%m": "99?", "%d": "99?", "%H": "99", "%M": "99", "%S": "99",
+                     "%b": "aaa", "%B": "a{3,9}"}
+_DIRECTIVE = re.compile(r"%[A-Za-z]")
+
+
+def _distinct(values):
+    codes, uniques = pd.factorize(pd.Series(values, copy=False), sort=False)
+    return codes, uniques
+
+
+def _scatter(codes, distinct_values, index):
+    # code -1 (missing input) picks the appended NaN / NaT
+    missing = np.datetime64("NaT") if distinct_values.dtype.kind == "M" else np.nan
+    out = np.append(distinct_values, np.array([missing], dtype=distinct_values.dtype))[codes]
+    return pd.Series(out, index=index)
+
+
+# ---- Amounts ----
+
+def parse_amounts(values):
+    """
+    float64 Series of amounts (NaN where unparseable), aligned with `values`.
+    Currency symbols/codes, thousands separators and spaces are dropped;
+    "-12", "12-" and "(12)" are negative.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    series = pd.Series(values, copy=False)
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return pd.Series(series.to_numpy(dtype=np.float64), index=index)
+    codes, uniques = _distinct(series)
+    s = pd.Series(uniques, dtype="str").str.strip()
+    s = s.str.replace(_AMOUNT_NOISE, "", regex=True)
+    s = s.str.replace(_AMOUNT_PARENS, r"-\1", regex=True).str.replace(_AMOUNT_TRAILING_MINUS, r"-\1", regex=True)
+    parsed = pd.to_numeric(s, errors="coerce").to_numpy(dtype=np.float64)
+    return _scatter(codes, parsed, index)
+
+
+# ---- Dates ----
+
+def _shape_of(values):
+    s = pd.Series(values, dtype="str").str.strip()
+    return s.str.replace(r"\d", "9", regex=True).str.replace(r"[A-Za-z]", "a", regex=True).to_numpy(dtype=object)
+
+
+def _format_shape(fmt):
+    parts, pos = [], 0
+    for m in _DIRECTIVE.finditer(fmt):
+        parts.append(re.escape(fmt[pos:m.start()]))
+        parts.append(_DIRECTIVE_SHAPES[m.group(0)])
+        pos = m.end()
+    parts.append(re.escape(fmt[pos:]))
+    return re.compile("".join(parts) + "$")
+
+
+_FORMAT_SHAPES = [(f, _format_shape(f)) for f in DATE_FORMATS]
+
+
+@lru_cache(maxsize=1024)
+def formats_for_shape(shape, dayfirst=True):
+    """
+    Candidate formats for a value shape such as "99-aaa-99", in preference order (cached).
+    """
+    fmts = [f for f, pattern in _FORMAT_SHAPES if pattern.match(shape)]
+    if not dayfirst:
+        # try month-first before day-first for the same separators
+        fmts.sort(key=lambda f: 0 if f.startswith("%m") else 1)
+    return tuple(fmts)
+
+
+def parse_dates(values, dayfirst=True, default_year=None):
+    """
+    datetime64 Series (NaT where unparseable), aligned with `values`.
+    Each value takes the first candidate format of its shape that parses it.
+    Dates without a year ("05-Nov") get `default_year`, or, when that is
+    None, the most common year among the column's full dates.
+    """
+    index = values.index if isinstance(values, pd.Series) else None
+    codes, uniques = _distinct(pd.Series(values, copy=False).astype("str").where(pd.notna(values), ""))
+    uniques = np.asarray(uniques, dtype=object)
+    parsed = np.full(len(uniques), np.datetime64("NaT"), dtype="datetime64[ns]")
+    yearless = np.zeros(len(uniques), dtype=bool)
+
+    stripped = pd.Series(uniques, dtype="str").str.strip().to_numpy(dtype=object)
+    shape_codes, shapes = pd.factorize(_shape_of(uniques), sort=False)
+    for k, shape in enumerate(shapes):
+        pending = np.flatnonzero(shape_codes == k)
+        for fmt in formats_for_shape(shape, dayfirst):
+            if not len(pending):
+                break
+            group, no_year = pd.Series(stripped[pending], dtype=object), fmt in _YEARLESS
+            if no_year:
+                # parse in a leap year so 29-Feb survives; the real year is set below
+                group, fmt = group + " 2000", fmt + " %Y"
+            got = pd.to_datetime(group, format=fmt, errors="coerce").to_numpy(dtype="datetime64[ns]")
+            ok = ~np.isnat(got)
+            parsed[pending[ok]] = got[ok]
+            yearless[pending[ok]] = no_year
+            pending = pending[~ok]
+
+    if yearless.any():
+        year = default_year
+        if year is None:
+            full = ~yearless & ~np.isnat(parsed)
+            dated = codes[full[codes]]  # one entry per row, so the mode is over rows
+            if len(dated):
+                years = parsed[dated].astype("datetime64[Y]").astype(int) + 1970
+                year = int(np.bincount(years).argmax())
+        fixed = pd.DatetimeIndex(parsed[yearless])
+        parsed[yearless] = (fixed + pd.DateOffset(years=year - 2000)).to_numpy() if year else np.datetime64("NaT")
+    return _scatter(codes, parsed, index)
+
+
+# ---- Merchant codes ----
+
+def normalize_code(code):
+    """
+    Lookup key for a merchant code: stripped and upper-cased ("" for missing).
+    """
+    if code is None or (isinstance(code, float) and code != code):
+        return ""
+    return str(code).strip().upper()
+
+
+def code_map(config):
+    """
+    The config's merchant_code_map with normalized keys.
+    """
+    return {normalize_code(k): v for k, v in ((config or {}).get("merchant_code_map") or {}).items()
+            if normalize_code(k)}
+
+
+def lookup_codes(codes, mapping):
+    """
+    Object array of tags (None where unmapped), one per code; each distinct code is looked up once.
+    """
+    if not mapping:
+        return np.full(len(codes), None, dtype=object)
+    c, uniques = _distinct(codes)
+    tags = np.array([mapping.get(normalize_code(u)) for u in uniques] + [None], dtype=object)
+    return tags[c]  # -1 (missing) picks the trailing None
+
+
+def learn_code_map(codes, tags, min_agreement=0.9, min_count=1):
+    """
+    {code: tag} for codes whose labelled rows agree on one tag
+    (at least `min_agreement` of at least `min_count` rows).
+    """
+    votes = defaultdict(Counter)
+    for code, tag in zip(codes, tags):
+        key = normalize_code(code)
+        if key and isinstance(tag, str) and tag:
+            votes[key][tag] += 1
+    out = {}
+    for key, counts in sorted(votes.items()):
+        tag, n = counts.most_common(1)[0]
+        total = sum(counts.values())
+        if total >= min_count and n >= min_agreement * total:
+            out[key] = tag
+    return out
+
+
+def parse_columns(df, amount="amount", date="date", prefix="", dayfirst=True, default_year=None):
+    """
+    Copy of `df` with `{prefix}amount_value` (float64) and `{prefix}date_value`
+    (datetime64) added for whichever of the two columns `df` has.
+    """
+    out = {}
+    if amount in df.columns:
+        out[prefix + "amount_value"] = parse_amounts(df[amount])
+    if date in df.columns:
+        out[prefix + "date_value"] = parse_dates(df[date], dayfirst=dayfirst, default_year=default_year)
+    return df.assign(**out)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m finsort.structured",
+                                 description="Parse amount/date columns and learn merchant-code maps.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    le = sub.add_parser("learn", help="print a merchant_code_map learned from a labelled CSV")
+    le.add_argument("csv")
+    le.add_argument("--code-column", default="merchant_code")
+    le.add_argument("--tag-column", default="tag")
+    le.add_argument("--min-agreement", type=float, default=0.9)
+    le.add_argument("--min-count", type=int, default=1)
+    pa_ = sub.add_parser("parse", help="print parsed amount/date columns of a CSV")
+    pa_.add_argument("csv")
+    pa_.add_argument("--month-first", action="store_true", help="prefer month-first dates (default: day-first)")
+    args = ap.parse_args(argv)
+
+    df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    if args.cmd == "learn":
+        mapping = learn_code_map(df[args.code_column], df[args.tag_column], args.min_agreement, args.min_count)
+        print(json.dumps({"merchant_code_map": mapping}, indent=2, ensure_ascii=False))
+        return
+    out = parse_columns(df, dayfirst=not args.month_first)
+    cols = [c for c in ("amount", "amount_value", "date", "date_value") if c in out.columns]
+    print(out[cols].to_string())
+
+
+if __name__ == "__main__":
+    main()
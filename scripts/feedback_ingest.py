@@ -1,28 +1,37 @@
 # scripts/feedback_ingest.py
+# Appends feedback events added since the last run to data/feedback.csv.
 import os
-import json
+import sys
 import pandas as pd
 
-BASE = os.path.dirname(os.path.dirname(__file__))
-LOG_PATH = os.path.join(BASE, "finsort", "feedback.log")
+BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE)
+
+from finsort.feedback import FeedbackStore, DEFAULT_STORE_DIR, LEGACY_LOG
+
 OUT_PATH = os.path.join(BASE, "data", "feedback.csv")
+OFFSET_PATH = OUT_PATH + ".offset"
+
+def read_offset():
+    # only trust the offset if the CSV it describes still exists
+    if not os.path.exists(OUT_PATH) or not os.path.exists(OFFSET_PATH):
+        return 0
+    with open(OFFSET_PATH, "r", encoding="utf-8") as fh:
+        return int(fh.read().strip() or 0)
+
+def write_offset(offset):
+    tmp = OFFSET_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(str(offset))
+    os.replace(tmp, OFFSET_PATH)
 
-def load_feedback_entries():
+def load_feedback_entries(store, offset):
+    """Return (events, next_offset) for events appended since `offset`."""
     entries = []
-    if not os.path.exists(LOG_PATH):
-        print("No feedback.log at", LOG_PATH)
-        return entries
-    with open(LOG_PATH, "r", encoding="utf-8") as fh:
-        for line in fh:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                entries.append(obj)
-            except Exception:
-                print("Skipping invalid JSON line:", line[:200])
-    return entries
+    for off, e in store.read(offset):
+        entries.append(e)
+        offset = off + 1
+    return entries, offset
 
 def normalize(entries):
     rows = []
@@ -30,23 +39,28 @@ def normalize(entries):
         rows.append({
             "raw": e.get("raw"),
             "cleaned": e.get("cleaned"),
-            "predicted_tag": e.get("predicted_tag") or e.get("tag"),
-            "predicted_category": e.get("predicted_category") or e.get("category"),
+            "predicted_tag": e.get("predicted_tag"),
+            "predicted_category": e.get("predicted_category"),
             "confidence": e.get("confidence"),
-            "corrected_category": e.get("corrected_category")
+            "corrected_category": e.get("corrected")
         })
     return pd.DataFrame(rows)
 
 def main():
-    print("Reading feedback log:", LOG_PATH)
-    entries = load_feedback_entries()
-    print("Loaded entries:", len(entries))
+    store = FeedbackStore(DEFAULT_STORE_DIR)
+    print("Reading feedback store:", store.path)
+    if os.path.exists(LEGACY_LOG) and store.end_offset() == 0:
+        print("Found legacy", LEGACY_LOG, "- run `python -m finsort.feedback import-legacy` to migrate it.")
+    offset = read_offset()
+    entries, next_offset = load_feedback_entries(store, offset)
+    print("New entries since offset {}: {}".format(offset, len(entries)))
     if not entries:
         print("Nothing to write.")
         return
     df = normalize(entries)
     os.makedirs(os.path.join(BASE, "data"), exist_ok=True)
-    df.to_csv(OUT_PATH, index=False)
+    df.to_csv(OUT_PATH, mode="a" if offset else "w", header=not offset, index=False)
+    write_offset(next_offset)
     print("Wrote feedback CSV:", OUT_PATH)
 
 if __name__ == "__main__":
@@ -19,7 +19,7 @@ def main():
     env['TRAIN_PATH'] = AUG
     print("Training using augmented dataset:", AUG)
     subprocess.check_call([sys.executable, TRAIN_PY], env=env)
-    print("Retrain finished. New model saved to finsort/model.pkl")
+    print("Retrain finished. New model version published to finsort/models")
 
 if __name__ == "__main__":
     main()
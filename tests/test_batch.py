@@ -0,0 +1,57 @@
+import csv
+import json
+from finsort.batch import categorize_file
+from finsort.inference import predict_category
+
+TEXTS = ['SQ *COFFEE-SPOT 123', 'AMAZON MKTPLACE PMTS', 'tomato 2kg', '', 'HPCL POS 2456 BLR#']
+
+
+def _write_csv(path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(['id', 'transaction'])
+        for i, t in enumerate(TEXTS):
+            w.writerow([i, t])
+
+
+def test_categorize_file_csv_in_order(tmp_path):
+    """Test that the streaming CSV categorizer keeps input order and columns."""
+    src, dst = tmp_path / 'in.csv', tmp_path / 'out.csv'
+    _write_csv(src)
+    summary = categorize_file(str(src), str(dst), workers=0, chunk_size=2)
+
+    with open(dst, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert summary['rows'] == len(TEXTS)
+    assert [r['id'] for r in rows] == [str(i) for i in range(len(TEXTS))]
+    for text, row in zip(TEXTS, rows):
+        assert row['tag'] == predict_category(text)['tag']
+
+
+def test_categorize_file_process_pool_jsonl(tmp_path):
+    """Test the process-pool path writing JSONL with a column prefix."""
+    src, dst = tmp_path / 'in.csv', tmp_path / 'out.jsonl'
+    _write_csv(src)
+    categorize_file(str(src), str(dst), workers=2, chunk_size=2, prefix='pred_')
+
+    with open(dst, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert [r['transaction'] for r in rows] == TEXTS
+    assert all('pred_tag' in r and 'pred_confidence' in r for r in rows)
+
+
+def test_categorize_file_dedupe_matches_row_by_row(tmp_path):
+    """Test that deduplicated categorization writes the same rows and reports the dedupe ratio."""
+    src = tmp_path / 'in.csv'
+    with open(src, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(['id', 'transaction'])
+        for i, t in enumerate(TEXTS * 4 + ['  sq *coffee-spot 123 ']):
+            w.writerow([i, t])
+    fast = categorize_file(str(src), str(tmp_path / 'a.csv'), workers=0, chunk_size=100)
+    slow = categorize_file(str(src), str(tmp_path / 'b.csv'), workers=0, chunk_size=100, dedupe=False)
+
+    assert (tmp_path / 'a.csv').read_text(encoding='utf-8') == (tmp_path / 'b.csv').read_text(encoding='utf-8')
+    assert fast['rows'] == slow['rows'] == 21
+    assert fast['distinct'] == len(TEXTS) and fast['dedupe_ratio'] == 21 / len(TEXTS)
+    assert slow['dedupe_ratio'] == 1.0
@@ -0,0 +1,30 @@
+import time
+from finsort.cache import LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    """Test that the oldest untouched entry is evicted first and counted."""
+    c = LRUCache(maxsize=2)
+    c.put('a', 1)
+    c.put('b', 2)
+    assert c.get('a') == 1
+    c.put('c', 3)
+
+    assert c.get('b') is None
+    assert c.get('a') == 1 and c.get('c') == 3
+    info = c.info()
+    assert info['evictions'] == 1
+    assert info['hits'] == 3 and info['misses'] == 1
+
+
+def test_lru_ttl_and_disable():
+    """Test TTL expiry and that maxsize=0 disables caching."""
+    c = LRUCache(maxsize=10, ttl=0.01)
+    c.put('a', 1)
+    time.sleep(0.02)
+    assert c.get('a') is None
+    assert c.info()['expirations'] == 1
+
+    off = LRUCache(maxsize=0)
+    off.put('a', 1)
+    assert off.get('a') is None and len(off) == 0
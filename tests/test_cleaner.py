@@ -1,4 +1,4 @@
-from finsort.cleaner import clean_transaction
+from finsort.cleaner import clean_transaction, clean_transaction_legacy, CompiledCleaner
 
 
 def test_clean_empty_string():
@@ -49,3 +49,16 @@ def test_clean_preserves_words():
     result = clean_transaction('SQ *COFFEE-SPOT 123')
     assert 'coffee' in result
     assert 'company' not in result
+
+
+def test_compiled_cleaner_matches_legacy():
+    """Test that the compiled cleaner is byte-identical to the legacy cleaner."""
+    cleaner = CompiledCleaner()
+    samples = [
+        'AMZN MKTP AY12B3 *PRIME', 'amzn mtp x', 'UPI-AXIS/9845123456-PAY',
+        'upi/ref inv-123456789 cr', 'PAYTM*BILLPAY/EB/093', 'SWP *NETFLIXCOM 11/2024',
+        'GPAY CCD  amazonpay', 'café​\u0000 amz_1', 'ZOMATO*ORD/₹499-0001',
+        'AMZN123456 mkt', '', None, 123,
+    ]
+    for s in samples:
+        assert cleaner.clean(s) == clean_transaction_legacy(s), repr(s)
@@ -0,0 +1,53 @@
+import numpy as np
+
+from finsort import inference
+from finsort.inference import ACCEPT, REVIEW, ABSTAIN, top_k_per_row, _decide
+from finsort.predictor import Predictor
+
+TEXTS = ['STARBUCKS INDIA *STAR 09', 'tomato 2kg', 'AMZN MKTP AY12B3 *PRIME',
+         'REFUND AMAZON ORDER#77882', 'unknown merchant xyz', 'qq zz 991 lorem', '']
+
+
+def test_top_k_and_decisions_are_vectorized_correctly():
+    """Test that top_k_per_row matches a full sort and thresholds pick accept/review/abstain."""
+    rng = np.random.default_rng(0)
+    probs = rng.dirichlet(np.ones(7), size=50)
+    full = np.argsort(-probs, axis=1, kind="stable")
+    for k in (1, 3, 7, 10):
+        idx, p = top_k_per_row(probs, k)
+        assert idx.shape == (50, min(k, 7))
+        assert (idx == full[:, :min(k, 7)]).all()
+        assert np.allclose(p, np.take_along_axis(probs, full[:, :min(k, 7)], axis=1))
+
+    labels = np.array(["a", "b"], dtype=object)
+    config = {"confidence_threshold": 0.6, "per_tag_threshold": {"b": 0.9}, "abstain_threshold": 0.3}
+    low, decision = _decide(labels, np.array([0, 0, 1, 1, 0]), np.array([0.7, 0.5, 0.85, 0.95, 0.2]), config)
+    assert low.tolist() == [False, True, True, False, True]
+    assert decision.tolist() == [ACCEPT, REVIEW, REVIEW, ACCEPT, ABSTAIN]
+
+
+def test_top_k_same_across_dict_and_columnar_paths():
+    """Test that single, chunked and columnar predictions agree on decision and suggestions."""
+    snap = inference._load()
+    cfg = dict(snap.config or {}, abstain_threshold=0.5)
+    p = Predictor(snap._replace(config=cfg))
+    inference.cache_clear()
+    try:
+        single = [p.predict(t, top_k=3) for t in TEXTS]
+        many = p.predict_many(TEXTS, chunk_size=3, top_k=3)
+        batch = p.predict_batch(TEXTS, top_k=3)
+    finally:
+        inference.cache_clear()
+
+    assert [r['decision'] for r in single] == [r['decision'] for r in many] == [r['decision'] for r in batch]
+    for a, b in zip(many, batch):
+        assert [s['tag'] for s in a['top_k']] == [s['tag'] for s in b['top_k']]
+        assert [s['category'] for s in a['top_k']] == [s['category'] for s in b['top_k']]
+        assert np.allclose([s['confidence'] for s in a['top_k']], [s['confidence'] for s in b['top_k']], atol=1e-6)
+    for r in many:
+        confs = [s['confidence'] for s in r['top_k']]
+        assert 1 <= len(confs) <= 3 and confs == sorted(confs, reverse=True)
+        assert r['top_k'][0]['tag'] == r['tag']
+        if r['decision'] == 'abstain':
+            assert r['confidence'] < 0.5 and r['low_confidence']
+    assert 'decision' not in p.predict(TEXTS[0]) and batch.to_pandas()['top3_confidence'].dtype == np.float32
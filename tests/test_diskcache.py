@@ -0,0 +1,55 @@
+from multiprocessing import Pool
+
+from finsort import inference
+from finsort.diskcache import PredictionCache, config_key
+from finsort.predictor import Predictor
+
+TEXTS = ['STARBUCKS INDIA *STAR 09', 'unknown merchant xyz', 'qq zz 991 lorem', 'HPCL POS 2456 BLR#',
+         'unknown merchant xyz', '']
+
+
+def _write(args):
+    path, worker = args
+    cache = PredictionCache(path)
+    for i in range(20):
+        texts = ['text {}'.format(j) for j in range(i, i + 50)]
+        cache.put_many('m', 'c', texts, ['tag{}'.format(worker)] * 50, [0.5] * 50)
+    return cache.get_many('m', 'c', ['text 0', 'text 68', 'missing'])[0].tolist()
+
+
+def test_disk_cache_keys_and_concurrent_writers(tmp_path):
+    """Test that presentation-only config keys share a cache key and that processes can write at once."""
+    cfg = {'confidence_threshold': 0.6, 'category_map': {'a': 'A'}}
+    assert config_key(cfg) == config_key(dict(cfg, category_map={'a': 'B'}, per_tag_threshold={'a': 0.9}))
+    assert config_key(cfg) != config_key(dict(cfg, rules_version=2))
+
+    path = str(tmp_path / 'p.sqlite')
+    with Pool(3) as pool:
+        results = pool.map(_write, [(path, w) for w in range(3)])
+    assert all(r[0] is not None and r[1] is not None and r[2] is None for r in results)
+    info = PredictionCache(path).info()
+    assert info['entries'] == 69 and info['keys'] == 1
+
+
+def test_disk_cache_serves_model_scores_and_remaps_categories(tmp_path):
+    """Test that cached scores give identical results and a category_map change needs no model call."""
+    snap = inference._load()
+    expected = Predictor(snap).predict_many(TEXTS)
+    dc = inference.enable_disk_cache(str(tmp_path / 'p.sqlite'))
+    try:
+        inference.cache_clear()
+        assert Predictor(snap).predict_many(TEXTS) == expected
+        misses = dc.info()['misses']
+        assert misses > 0 and dc.info()['entries'] > 0
+
+        tag = expected[1]['tag']
+        cfg = dict(snap.config, category_map=dict(snap.config.get('category_map', {}), **{tag: 'Renamed'}))
+        inference.cache_clear()
+        remapped = Predictor(snap._replace(config=cfg)).predict_many(TEXTS)
+        assert dc.info()['misses'] == misses  # every model score came from disk
+        assert remapped[1]['category'] == 'Renamed'
+        assert [r['tag'] for r in remapped] == [r['tag'] for r in expected]
+        assert [r['confidence'] for r in remapped] == [r['confidence'] for r in expected]
+    finally:
+        inference.disable_disk_cache()
+        inference.cache_clear()
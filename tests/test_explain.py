@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.preprocessing import LabelEncoder
+
+from finsort.cleaner import clean_transaction
+from finsort.explain import Explainer, explain_prediction
+from finsort.features import HashedTfidfVectorizer
+from finsort.model import WrappedModel
+
+
+def _corpus(n=600):
+    df = pd.read_csv('data/finsort_train.csv').head(n)
+    return [clean_transaction(t) for t in df['transaction']], df['tag'].tolist()
+
+
+def test_explainer_averages_calibrated_folds():
+    """Test that calibrated models are explained with the mean fold coefficients of the predicted class."""
+    texts, y = _corpus()
+    vect = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), max_features=3000)
+    X = vect.fit_transform(texts)
+    le = LabelEncoder()
+    clf = CalibratedClassifierCV(LogisticRegression(max_iter=500), method='sigmoid', cv=3)
+    model = WrappedModel(clf.fit(X, le.fit_transform(y)), le)
+
+    explainer = Explainer(model, vect)
+    batch = explainer.explain_many(texts[:20], top_k=4)
+    assert [explainer.explain_many([t], top_k=4)[0] for t in texts[:20]] == batch
+
+    row = X[0].toarray()[0]
+    pred = int(np.argmax(model.predict_proba(X[0])))
+    folds = [m.estimator.coef_[pred] for m in clf.calibrated_classifiers_]
+    contrib = row * np.mean(folds, axis=0)
+    names = vect.get_feature_names_out()
+    expected = sorted(((names[j], contrib[j]) for j in np.flatnonzero(row)), key=lambda p: -p[1])[:4]
+    assert [n for n, _ in batch[0]] == [n for n, _ in expected]
+    assert np.allclose([w for _, w in batch[0]], [w for _, w in expected])
+
+
+def test_explainer_hashed_names_and_unknown_tags():
+    """Test that hashed columns are named by the row's own n-grams and non-model tags give []."""
+    texts, y = _corpus()
+    vect = HashedTfidfVectorizer(n_features=2 ** 14)
+    model = LogisticRegression(max_iter=500).fit(vect.fit_transform(texts), y)
+
+    out = Explainer(model, vect).explain_many([texts[0], texts[1]], top_k=3, tags=[y[0], 'not-a-tag'])
+    grams = set(vect.hasher.build_analyzer()(texts[0]))
+    assert len(out[0]) == 3 and all(name in grams for name, _ in out[0])
+    assert out[1] == []
+
+
+def test_explain_prediction_uses_loaded_model():
+    """Test the module-level helper against the shared inference snapshot."""
+    result = explain_prediction('SQ *COFFEE-SPOT 123', top_k=3)
+    assert len(result) == 3
+    assert all(isinstance(n, str) and isinstance(w, float) for n, w in result)
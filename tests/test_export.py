@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.calibration import CalibratedClassifierCV
+from sklearn.preprocessing import LabelEncoder
+
+from finsort.cleaner import clean_transaction
+from finsort.export import export_model, load_exported
+from finsort.model import WrappedModel
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    df = pd.read_csv('data/finsort_train.csv').head(800)
+    return [clean_transaction(t) for t in df['transaction']], df['tag'].tolist()
+
+
+def test_export_matches_calibrated_wrapped_model(corpus, tmp_path):
+    """Test that the NumPy scorer reproduces a calibrated, label-encoded model."""
+    texts, y = corpus
+    vect = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), max_features=3000)
+    X = vect.fit_transform(texts)
+    le = LabelEncoder()
+    clf = CalibratedClassifierCV(LogisticRegression(max_iter=500), method='sigmoid', cv=3)
+    model = WrappedModel(clf.fit(X, le.fit_transform(y)), le)
+
+    export_model(model, vect, str(tmp_path))
+    em, ev = load_exported(str(tmp_path))
+    probe = texts[:50] + ['', 'unseen merchant xyz']
+
+    assert abs(ev.transform(probe) - vect.transform(probe)).max() < 1e-12
+    assert np.allclose(em.predict_proba(ev.transform(probe)), model.predict_proba(vect.transform(probe)), atol=1e-10)
+    assert list(em.classes_) == list(model.classes_)
+
+
+def test_export_word_ngrams_logistic(corpus, tmp_path):
+    """Test the word-analyzer vectorizer and a plain multinomial LogisticRegression."""
+    texts, y = corpus
+    vect = TfidfVectorizer(max_features=2000, ngram_range=(1, 2))
+    lr = LogisticRegression(max_iter=500).fit(vect.fit_transform(texts), y)
+
+    export_model(lr, vect, str(tmp_path))
+    em, ev = load_exported(str(tmp_path), mmap=False)
+    probe = texts[:50]
+    assert np.allclose(em.predict_proba(ev.transform(probe)), lr.predict_proba(vect.transform(probe)), atol=1e-10)
+    assert list(em.predict(ev.transform(probe))) == list(lr.predict(vect.transform(probe)))
+
+
+def test_collapsed_scorer_tracks_calibrated_ensemble(corpus, tmp_path):
+    """Test that the single-matrix scorer agrees with the fold ensemble."""
+    from finsort.export import parity_report
+    texts, y = corpus
+    vect = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5), max_features=3000)
+    clf = CalibratedClassifierCV(LogisticRegression(max_iter=500), method='sigmoid', cv=3)
+    clf.fit(vect.fit_transform(texts), y)
+
+    meta = export_model(clf, vect, str(tmp_path), collapse=True)
+    em, ev = load_exported(str(tmp_path))
+    assert meta['collapsed'] and em.n_members == 1
+    assert em.coef.shape == (3000, len(clf.classes_))
+
+    proba = em.predict_proba(ev.transform(texts))
+    assert np.allclose(proba.sum(axis=1), 1.0)
+    report = parity_report((clf, vect), (em, ev), texts, y)
+    assert report['argmax_agreement'] > 0.97
+    assert report['mean_abs_confidence_diff'] < 0.05
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+from sklearn.linear_model import LogisticRegression
+
+from finsort.cleaner import clean_transaction
+from finsort.export import export_model, load_exported
+from finsort.features import HashedTfidfVectorizer
+
+
+def _texts(n=600):
+    df = pd.read_csv('data/finsort_train.csv').head(n)
+    return [clean_transaction(t) for t in df['transaction']], df['tag'].tolist()
+
+
+def test_hashed_tfidf_matches_sklearn_and_streams():
+    """Test that chunked fitting gives the same idf and features as TfidfTransformer over hashed counts."""
+    texts, _ = _texts()
+    vect = HashedTfidfVectorizer(n_features=2 ** 12).fit(texts, chunk_size=97)
+    counts = HashingVectorizer(analyzer='char_wb', ngram_range=(3, 5), n_features=2 ** 12,
+                               alternate_sign=False, norm=None).transform(texts)
+    ref = TfidfTransformer().fit(counts)
+
+    assert np.allclose(vect.idf_, ref.idf_)
+    assert abs(vect.transform(texts) - ref.transform(counts)).max() < 1e-12
+    assert abs(vect.fit_transform(texts) - vect.transform(texts)).max() < 1e-12
+
+
+def test_hashed_export_round_trip(tmp_path):
+    """Test that a hashed featurizer exports as a bare idf array and reloads to identical features."""
+    texts, y = _texts()
+    vect = HashedTfidfVectorizer(n_features=2 ** 12)
+    model = LogisticRegression(max_iter=500).fit(vect.fit_transform(texts), y)
+
+    export_model(model, vect, str(tmp_path))
+    em, ev = load_exported(str(tmp_path))
+    probe = texts[:50] + ['', 'unseen merchant xyz']
+
+    assert isinstance(ev, HashedTfidfVectorizer)
+    assert abs(ev.transform(probe) - vect.transform(probe)).max() < 1e-12
+    assert np.allclose(em.predict_proba(ev.transform(probe)), model.predict_proba(vect.transform(probe)))
+
+
+def test_hashed_tfidf_refit_resets_idf():
+    """Test that refitting on an empty iterable leaves an idf_ matching the zeroed counts."""
+    vec = HashedTfidfVectorizer(n_features=256).fit(['SQ *COFFEE-SPOT 123', 'tomato 2kg'])
+    assert not np.allclose(vec.idf_, 1.0)
+    vec.fit([])
+    assert vec.n_docs_ == 0 and vec.df_.sum() == 0
+    assert np.allclose(vec.idf_, 1.0)
@@ -0,0 +1,91 @@
+import os
+import threading
+
+from finsort.feedback import FeedbackStore, FeedbackWriter, make_event, parse_legacy_line, import_legacy_log
+
+
+def test_concurrent_group_commits_and_offset_reads(tmp_path):
+    """Test that concurrent writers get unique, gapless offsets across segment rolls."""
+    store = FeedbackStore(str(tmp_path), segment_bytes=4096, fsync=False)
+
+    def worker(n):
+        with FeedbackWriter(FeedbackStore(str(tmp_path), segment_bytes=4096, fsync=False), max_batch=7) as w:
+            for i in range(200):
+                w.add(make_event('MERCHANT {} {}'.format(n, i), 'fuel', cleaned='m{}-{}'.format(n, i)))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    events = list(store.read())
+    assert [o for o, _ in events] == list(range(800))
+    assert len({e['cleaned'] for _, e in events}) == 800
+    assert store.stats()['segments'] > 1
+    assert [o for o, _ in store.read(555)] == list(range(555, 800))
+
+
+def test_torn_append_is_truncated_and_invisible(tmp_path):
+    """Test that an unindexed log tail is never read and is dropped by the next append."""
+    store = FeedbackStore(str(tmp_path), fsync=False)
+    store.append_many([make_event('A', 'fuel'), make_event('B', 'travel')])
+    seg = store._read_manifest()['segments'][-1]['name']
+    with open(os.path.join(str(tmp_path), seg + '.log'), 'ab') as f:
+        f.write(b'{"raw": "half wri')
+    with open(os.path.join(str(tmp_path), seg + '.idx'), 'ab') as f:
+        f.write(b'\x01\x02\x03')
+
+    assert [e['raw'] for _, e in store.read()] == ['A', 'B']
+    assert store.append(make_event('C', 'fuel')) == 2
+    assert [e['raw'] for _, e in store.read()] == ['A', 'B', 'C']
+
+
+def test_clean_append_reads_only_the_index_tail(tmp_path, monkeypatch):
+    """Test that appends to a consistent segment never load its whole index, and a torn tail still recovers."""
+    store = FeedbackStore(str(tmp_path), fsync=False)
+    store.append_many([make_event('A{}'.format(i), 'fuel') for i in range(50)])
+
+    def full_index(name):
+        raise AssertionError('full index read on the append path')
+
+    with monkeypatch.context() as m:
+        m.setattr(store, '_index', full_index)
+        assert store.append(make_event('B', 'travel')) == 50
+        assert store.append(make_event('C', 'travel')) == 51
+        assert store.end_offset() == 52
+
+    seg = store._read_manifest()['segments'][-1]['name']
+    with open(os.path.join(str(tmp_path), seg + '.log'), 'ab') as f:
+        f.write(b'{"raw": "torn')
+    assert store.append(make_event('D', 'fuel')) == 52
+    assert [e['raw'] for _, e in store.read(50)] == ['B', 'C', 'D']
+
+
+def test_compaction_keeps_latest_per_cleaned_text(tmp_path):
+    """Test that compaction dedupes by cleaned text, keeps offsets and leaves new appends intact."""
+    store = FeedbackStore(str(tmp_path), fsync=False)
+    store.append_many([make_event('UBER 1', 'fuel'), make_event('ZOMATO', 'dining'), make_event('UBER 1', 'transport')])
+    summary = store.compact()
+    store.append(make_event('UBER 1', 'travel'))
+
+    assert summary == {'before': 3, 'after': 2}
+    assert [(o, e['corrected']) for o, e in store.read()] == [(1, 'dining'), (2, 'transport'), (3, 'travel')]
+    assert [o for o, _ in store.read(2)] == [2, 3]
+    assert len([f for f in os.listdir(str(tmp_path)) if f.endswith('.log')]) == 2
+
+
+def test_legacy_log_formats_import_into_one_schema(tmp_path):
+    """Test that both old feedback.log line formats import with the same fields."""
+    log = tmp_path / 'feedback.log'
+    log.write_text('{"raw": "SQ *COFFEE", "corrected_category": "Food & Dining", "confidence": 0.4}\n'
+                   'AMZN, MKTPLACE,ecommerce\n'
+                   'garbage\n\n')
+    store = FeedbackStore(str(tmp_path / 'store'), fsync=False)
+
+    assert import_legacy_log(str(log), store) == (2, 1)
+    events = [e for _, e in store.read()]
+    assert [e['corrected'] for e in events] == ['Food & Dining', 'ecommerce']
+    assert events[1]['raw'] == 'AMZN, MKTPLACE'
+    assert set(events[0]) == set(events[1])
+    assert parse_legacy_line('   ') is None
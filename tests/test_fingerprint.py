@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from finsort.cleaner import clean_transaction
+from finsort.feedback import record_feedback
+from finsort.fingerprint import build_index, collect_labels, load_index
+
+
+def test_index_build_lookup_and_hit_rate(tmp_path):
+    """Test that labels come from CSV majority and feedback, and lookups are counted."""
+    csv = tmp_path / 'train.csv'
+    pd.DataFrame({
+        'transaction': ['IRCTC TKT 1234567', 'irctc tkt', 'MIXED SHOP', 'MIXED SHOP', 'JIO RECHARGE'],
+        'tag': ['travel', 'travel', 'grocery', 'electronics', 'bills'],
+    }).to_csv(csv, index=False)
+    store = str(tmp_path / 'feedback')
+    record_feedback('JIO RECHARGE 9876543', 'Shopping', store_dir=store, predicted_tag='bills', confidence=0.7)
+
+    mapping = collect_labels([str(csv)], store, {'ecommerce': 'Shopping'})
+    assert mapping == {'irctc tkt': 'travel', 'jio recharge': 'ecommerce'}  # ambiguous text left out
+
+    meta = build_index(mapping, str(tmp_path / 'idx'), sources=[str(csv)])
+    index = load_index(str(tmp_path / 'idx'))
+    assert meta['entries'] == len(index) == 2
+    assert isinstance(index.hashes, np.memmap)
+    assert index.lookup(clean_transaction('IRCTC TKT 7654321')) == 'travel'
+    assert index.lookup('mixed shop') is None
+    assert list(index.lookup_many(['jio recharge', 'nope', ''])) == ['ecommerce', None, None]
+    assert index.info()['lookups'] == 5 and index.info()['hits'] == 2
+
+    meta_path = tmp_path / 'idx' / 'meta.json'
+    meta['cleaner_version'] = 'other'
+    meta_path.write_text(json.dumps(meta))
+    assert load_index(str(tmp_path / 'idx')) is None  # keys from another cleaner would not match
+
+
+def test_inference_consults_index_between_rules_and_model(tmp_path, monkeypatch):
+    """Test that indexed descriptors skip the model in the single, batch and frame paths."""
+    from finsort import inference
+    from finsort.cache import LRUCache
+    from finsort.frame import categorize_frame
+
+    build_index({'irctc tkt': 'travel', 'starbucks': 'dining'}, str(tmp_path / 'idx'))
+    monkeypatch.setattr(inference, '_INDEX_DIR', str(tmp_path / 'idx'))
+    monkeypatch.setattr(inference, '_CACHE', LRUCache(maxsize=100))
+    inference._refresh(force=True)
+    try:
+        single = inference.predict_category('IRCTC TKT 1234567')
+        assert single['tag'] == 'travel' and single['by_index'] is True
+        assert single['confidence'] == inference.INDEX_CONFIDENCE
+        assert inference.predict_category('STARBUCKS')['by_rule'] is True  # rules come first
+
+        texts = ['irctc tkt 99887766', 'STARBUCKS', 'unknown merchant xyz']
+        inference.cache_clear()
+        batch = inference.predict_categories(texts)
+        assert [r.get('by_index', False) for r in batch] == [True, False, False]
+        frame = categorize_frame(pd.DataFrame({'transaction': texts}))
+        assert list(frame['tag']) == [r['tag'] for r in batch]
+        assert inference.index_info()['hits'] >= 3
+    finally:
+        monkeypatch.undo()
+        inference._refresh(force=True)
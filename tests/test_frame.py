@@ -0,0 +1,67 @@
+import random
+
+import pandas as pd
+
+from finsort.cleaner import clean_transaction
+from finsort.frame import clean_series, categorize_frame
+from finsort.inference import predict_categories
+
+SAMPLES = [
+    'AMZN MKTP AY12B3 *PRIME', 'amzn mtp x', 'UPI-AXIS/9845123456-PAY',
+    'upi/ref inv-123456789 cr', 'PAYTM*BILLPAY/EB/093', 'SWP *NETFLIXCOM 11/2024',
+    'GPAY CCD  amazonpay', 'café​\u0000 amz_1', 'ZOMATO*ORD/₹499-0001',
+    'AMZN123456 mkt', 'tab\there\x1f', 'SQ *COFFEE-SPOT 123', 'tomato 2kg', '', '   ', 123,
+]
+
+
+def test_clean_series_matches_clean_transaction():
+    """Test that the column cleaner is identical to clean_transaction, row by row."""
+    rng = random.Random(0)
+    alphabet = 'aZ09 *-_/.,#@\t\x01\x7fé€ amzn ref UPI- mktp'
+    fuzz = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))) for _ in range(500)]
+    values = pd.Series(SAMPLES + fuzz + SAMPLES, index=range(100, 100 + 2 * len(SAMPLES) + len(fuzz)))
+    cleaned = clean_series(values)
+    assert list(cleaned.index) == list(values.index)
+    assert list(cleaned) == [clean_transaction(v) for v in values]
+    assert list(clean_series([None, float('nan'), 'TXN'])) == ['', '', '']
+
+
+def test_categorize_frame_matches_batch_api():
+    """Test that categorize_frame adds the same results as predict_categories."""
+    texts = [s for s in SAMPLES if isinstance(s, str)] * 2
+    df = pd.DataFrame({'id': range(len(texts)), 'transaction': texts})
+    out = categorize_frame(df)
+    expected = predict_categories(texts)
+    assert list(out['id']) == list(df['id'])
+    for row, exp in zip(out.to_dict('records'), expected):
+        for field in ('cleaned', 'tag', 'category', 'low_confidence'):
+            assert row[field] == exp[field], (row, exp)
+        assert abs(row['confidence'] - exp['confidence']) < 1e-9
+        assert row['by_rule'] == exp.get('by_rule', False)
+        assert row['by_index'] == exp.get('by_index', False)
+    assert list(categorize_frame(df, prefix='p_').columns[-3:]) == ['p_low_confidence', 'p_by_rule', 'p_by_index']
+
+
+def test_categorize_frame_and_batch_file_flag_index_hits(tmp_path, monkeypatch):
+    """Test that a fingerprint-index hit is reported as by_index by categorize_frame and the batch CLI."""
+    from finsort import inference
+    from finsort.batch import categorize_file
+    from finsort.cache import LRUCache
+    from finsort.fingerprint import build_index
+
+    build_index({'irctc tkt': 'travel'}, str(tmp_path / 'idx'))
+    monkeypatch.setattr(inference, '_INDEX_DIR', str(tmp_path / 'idx'))
+    monkeypatch.setattr(inference, '_CACHE', LRUCache(maxsize=100))
+    inference._refresh(force=True)
+    texts = ['IRCTC TKT 1234567', 'STARBUCKS', 'unknown merchant xyz']
+    try:
+        out = categorize_frame(pd.DataFrame({'transaction': texts}))
+        pd.DataFrame({'transaction': texts}).to_csv(tmp_path / 'in.csv', index=False)
+        categorize_file(str(tmp_path / 'in.csv'), str(tmp_path / 'out.csv'), workers=0)
+        written = pd.read_csv(tmp_path / 'out.csv')
+    finally:
+        monkeypatch.undo()
+        inference._refresh(force=True)
+    assert list(out['by_index']) == [True, False, False]
+    assert list(out['by_rule']) == [False, True, False]
+    assert list(written['by_index']) == [True, False, False]
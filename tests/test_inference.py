@@ -1,5 +1,5 @@
 import pytest
-from finsort.inference import predict_category
+from finsort.inference import predict_category, predict_categories, cache_info, cache_clear
 
 
 def test_predict_category_returns_dict():
@@ -41,3 +41,58 @@ def test_predict_category_values():
     
     # confidence should be between 0 and 1
     assert 0.0 <= result['confidence'] <= 1.0
+
+
+def test_predict_categories_matches_single():
+    """Test that the batch API returns the same dicts as predict_category, in order."""
+    texts = ['SQ *COFFEE-SPOT 123', 'AMAZON MKTPLACE PMTS', '', 'tomato 2kg', 'HPCL POS 2456 BLR#']
+    batch = predict_categories(texts, chunk_size=2)
+
+    assert len(batch) == len(texts)
+    for text, result in zip(texts, batch):
+        assert result == predict_category(text)
+
+
+def test_predict_categories_rejects_bad_chunk_size():
+    """Test that a non-positive chunk size is rejected."""
+    with pytest.raises(ValueError):
+        predict_categories(['tomato 2kg'], chunk_size=0)
+
+
+def test_prediction_cache_counts_hits():
+    """Test that repeated descriptors (same cleaned text) are served from the cache."""
+    cache_clear()
+    before = cache_info()
+    first = predict_category('NETFLIX.COM 1234567')
+    second = predict_category('NETFLIX.COM 7654321')
+    after = cache_info()
+
+    assert first['cleaned'] == second['cleaned']
+    assert second['raw'] == 'NETFLIX.COM 7654321'
+    assert after['hits'] - before['hits'] >= 1
+    assert after['size'] >= 1
+
+
+def test_reload_is_throttled_and_swaps_snapshot(tmp_path, monkeypatch):
+    """Test that file checks are throttled and a reload swaps in a new snapshot."""
+    from finsort import inference
+
+    cfg = tmp_path / 'config.json'
+    cfg.write_text('{"category_map": {"fuel": "Fuel"}}')
+    monkeypatch.setattr(inference, '_CONFIG_PATH', str(cfg))
+    monkeypatch.setattr(inference, '_MODEL_PATH', str(tmp_path / 'missing_model.pkl'))
+    monkeypatch.setattr(inference, '_VECT_PATH', str(tmp_path / 'missing_vect.pkl'))
+    monkeypatch.setattr(inference, '_SNAPSHOT', inference.Snapshot(None, None, {}, None, 0))
+    monkeypatch.setattr(inference, 'RELOAD_INTERVAL', 3600)
+
+    snap = inference._load()
+    assert snap.config['category_map']['fuel'] == 'Fuel'
+
+    cfg.write_text('{"category_map": {"fuel": "Petrol & Diesel"}}')
+    assert inference._load() is snap  # no stat until the interval passes
+
+    new = inference._refresh()
+    assert new is not snap
+    assert new.version == snap.version + 1
+    assert new.config['category_map']['fuel'] == 'Petrol & Diesel'
+    assert inference._load() is new
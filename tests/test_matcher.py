@@ -0,0 +1,36 @@
+from finsort.matcher import MerchantMatcher
+from finsort.inference import MERCHANT_MAP, rule_override
+
+
+def test_matcher_requires_word_start():
+    """Test that keys do not match inside other words ('ola' in 'cola')."""
+    m = MerchantMatcher(MERCHANT_MAP)
+    assert m.find('coca cola granola') is None
+    assert m.find('ola trip')[0] == 'ola'
+    # trailing characters are allowed
+    assert m.find('netflix572')[0] == 'netflix'
+
+
+def test_matcher_longest_then_leftmost():
+    """Test the match priority: longest key first, then leftmost."""
+    m = MerchantMatcher(MERCHANT_MAP)
+    assert m.find('amazon marketplace')[0] == 'amazon marketplace'
+    assert m.find('apollopharmacy store')[0] == 'apollopharmacy'
+    assert m.find('refund amazon')[0] == 'refund'
+    assert m.find('amazon refund')[0] == 'amazon'
+
+
+def test_matcher_multi_word_keys_and_size():
+    """Test keys spanning words and that duplicate keys are counted once."""
+    m = MerchantMatcher({'coffee day': 1, 'Coffee  Day': 2, 'ccd': 3})
+    assert len(m) == 2
+    assert m.find('cafe coffee   day blr') == ('coffee day', 2)
+    assert m.find('') is None
+
+
+def test_rule_override_uses_matcher():
+    """Test that rule_override still maps merchants through config."""
+    r = rule_override('starbucks india', {'category_map': {'coffee_shop': 'Cafe'}})
+    assert r['tag'] == 'coffee_shop'
+    assert r['category'] == 'Cafe'
+    assert r['by_rule'] is True
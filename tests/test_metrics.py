@@ -0,0 +1,50 @@
+import json
+
+from finsort import inference
+from finsort.cache import LRUCache
+from finsort.metrics import MetricsRegistry
+
+
+def test_registry_json_and_prometheus_output():
+    """Test counters, gauges and histograms in both dump formats."""
+    reg = MetricsRegistry(help={'stage_seconds': 'Stage time.'})
+    reg.inc('predictions_total', labels={'source': 'rule'})
+    reg.inc('predictions_total', 2, labels={'source': 'rule'})
+    reg.set('snapshot_version', 3)
+    for s in (2e-6, 3e-5, 3e-5, 0.2):
+        reg.observe('stage_seconds', s, labels={'stage': 'clean'})
+
+    snap = json.loads(reg.to_json())
+    assert snap['counters']['predictions_total'] == {'source=rule': 3}
+    assert snap['gauges']['snapshot_version'] == {'': 3}
+    hist = snap['histograms']['stage_seconds']['stage=clean']
+    assert hist['count'] == 4 and hist['p50'] == 5e-5
+
+    text = reg.to_prometheus()
+    assert '# HELP finsort_stage_seconds Stage time.' in text
+    assert '# TYPE finsort_predictions_total counter' in text
+    assert 'finsort_predictions_total{source="rule"} 3' in text
+    assert 'finsort_stage_seconds_bucket{stage="clean",le="5e-06"} 1' in text
+    assert 'finsort_stage_seconds_bucket{stage="clean",le="+Inf"} 4' in text
+    assert 'finsort_stage_seconds_count{stage="clean"} 4' in text
+
+
+def test_inference_records_stages_and_sources(monkeypatch):
+    """Test that enabled metrics see stage timings, rule/ML counts and cache lookups; disabled records nothing."""
+    monkeypatch.setattr(inference, '_CACHE', LRUCache())
+    reg = inference.enable_metrics()
+    try:
+        inference.predict_category('AMAZON MKTPLACE PMTS')
+        inference.predict_category('AMAZON MKTPLACE PMTS')
+        inference.predict_categories(['SWP SWIGGY INTL 21811', 'ZQXWV TRADERS 4411'])
+    finally:
+        assert inference.disable_metrics() is reg
+    inference.predict_category('tomato 2kg')
+
+    snap = reg.snapshot()
+    sources = snap['counters']['predictions_total']
+    assert sum(sources.values()) == 4 and sources['source=rule'] >= 2
+    assert snap['counters']['cache_total'] == {'result=hit': 1, 'result=miss': 3}
+    stages = set(snap['histograms']['stage_seconds'])
+    assert {'stage=load', 'stage=clean', 'stage=cache', 'stage=rules', 'stage=total'} <= stages
+    assert 'stage=predict_proba' in snap['histograms']['batch_stage_seconds']
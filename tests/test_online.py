@@ -0,0 +1,80 @@
+from finsort import inference, online
+from finsort.cache import LRUCache
+from finsort.cleaner import clean_transaction
+from finsort.export import load_exported
+from finsort.feedback import FeedbackStore, make_event
+
+
+def _ml_tag(out_dir, text):
+    model, vect = load_exported(str(out_dir))
+    return model.predict(vect.transform([clean_transaction(text)]))[0]
+
+
+def test_update_applies_only_new_feedback(tmp_path):
+    """Test that updates read from the stored offset and publish a new version."""
+    store = FeedbackStore(str(tmp_path / 'feedback'), fsync=False)
+    store.append(make_event('OLD ENTRY 1', 'fuel'))
+    out = tmp_path / 'online'
+    online.bootstrap(out_dir=str(out), store_dir=store.path)
+    text = 'ZQXWV TRADERS 4411'
+    before = _ml_tag(out, text)
+    target = 'travel' if before != 'travel' else 'fuel'
+
+    store.append_many([make_event(text, target), make_event(text, target),
+                       make_event('SOMETHING ELSE', 'Not A Category')])
+    summary = online.update(out_dir=str(out), category_map={}, epochs=5)
+
+    assert (summary['read'], summary['applied'], summary['skipped']) == (3, 2, 1)
+    assert summary['version'] == 2
+    assert _ml_tag(out, text) == target
+    assert online.load_state(str(out))['offset'] == store.end_offset() == 4
+    assert online.update(out_dir=str(out))['read'] == 0
+
+
+def test_resolve_tag_maps_unambiguous_categories():
+    """Test that categories resolve to a tag only when exactly one class maps to them."""
+    cmap = {'coffee_shop': 'Food & Dining', 'restaurant': 'Food & Dining', 'fuel': 'Fuel'}
+    classes = {'coffee_shop', 'dining', 'fuel'}
+    assert online.resolve_tag('dining', classes, cmap) == 'dining'
+    assert online.resolve_tag('Fuel', classes, cmap) == 'fuel'
+    assert online.resolve_tag('Food & Dining', classes, {**cmap, 'dining': 'Food & Dining'}) is None
+    assert online.resolve_tag('Travel', classes, cmap) is None
+
+
+def test_online_backend_serves_published_versions(tmp_path, monkeypatch):
+    """Test that a running predictor swaps to a newly published online model on reload."""
+    store = FeedbackStore(str(tmp_path / 'feedback'), fsync=False)
+    out = tmp_path / 'online'
+    online.bootstrap(out_dir=str(out), store_dir=store.path)
+    monkeypatch.setattr(inference, '_ONLINE_DIR', str(out))
+    monkeypatch.setattr(inference, 'BACKEND', 'online')
+    monkeypatch.setattr(inference, '_SNAPSHOT', inference.Snapshot(None, None, {}, None, 0))
+    monkeypatch.setattr(inference, 'RELOAD_INTERVAL', 0)
+    monkeypatch.setattr(inference, '_CACHE', LRUCache())
+
+    text = 'ZQXWV TRADERS 4411'
+    first = inference.predict_category(text)
+    target = 'travel' if first['tag'] != 'travel' else 'fuel'
+    store.append_many([make_event(text, target)] * 3)
+    online.update(out_dir=str(out), epochs=5)
+
+    assert inference.predict_category(text)['tag'] == target
+
+
+def test_bootstrap_trains_on_tags_not_categories(tmp_path):
+    """Test that a CSV with both tag and category columns bootstraps on model tags."""
+    csv_path = tmp_path / 'train.csv'
+    rows = ['transaction,tag,category']
+    for i in range(10):
+        rows.append('STARBUCKS INDIA {},coffee_shop,'.format(i))
+        rows.append('HPCL POS {} BLR,fuel,'.format(i))
+        rows.append('APOLLO PHARMACY {},,Health'.format(i))   # category only: mapped back to its tag
+        rows.append('MYSTERY ROW {},,'.format(i))             # no label: dropped
+    csv_path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+    store = FeedbackStore(str(tmp_path / 'feedback'), fsync=False)
+    out = tmp_path / 'online'
+
+    summary = online.bootstrap(train_path=str(csv_path), out_dir=str(out), store_dir=store.path)
+    classes = set(online.load_state(str(out))['model'].classes_)
+    assert classes == {'coffee_shop', 'fuel', 'pharmacy'}
+    assert summary['rows'] == 30
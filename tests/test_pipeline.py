@@ -0,0 +1,36 @@
+from finsort.cleaner import clean_transaction
+from finsort.pipeline import TrainCache, clean_corpus, file_digest
+
+TEXTS = ['AMZN MKTP AY12B3 *PRIME', 'UPI-AXIS/9845123456-PAY', 'tomato 2kg', '', 'SQ *COFFEE-SPOT 123'] * 3
+
+
+def test_clean_corpus_reuses_cached_chunks(tmp_path):
+    """Test that appending rows only re-cleans the chunks that changed."""
+    cache = TrainCache(str(tmp_path))
+    cleaned, hits = clean_corpus(TEXTS, n_jobs=1, chunk_size=4, cache=cache)
+    assert cleaned == [clean_transaction(t) for t in TEXTS]
+    assert hits == 0
+
+    more = TEXTS + ['PAYTM BILLPAY EB 093']
+    cleaned, hits = clean_corpus(more, n_jobs=1, chunk_size=4, cache=cache)
+    assert cleaned == [clean_transaction(t) for t in more]
+    assert hits == 3  # the 4th chunk gained a row; the first three are unchanged
+
+
+def test_features_cache_roundtrip_and_keys(tmp_path):
+    """Test that feature sets are keyed by CSV content and settings and pruned to the newest."""
+    csv_a, csv_b = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    csv_a.write_text('transaction,tag\nx,bills\n')
+    csv_b.write_text('transaction,tag\nx,fuel\n')
+    cache = TrainCache(str(tmp_path / 'cache'))
+    ka = cache.features_key(file_digest(str(csv_a)), {'features': 'tfidf'})
+    assert ka != cache.features_key(file_digest(str(csv_b)), {'features': 'tfidf'})
+    assert ka != cache.features_key(file_digest(str(csv_a)), {'features': 'hashed'})
+
+    assert cache.get_features(ka) is None
+    cache.put_features(ka, 'vect', [1, 2], ['bills'])
+    assert cache.get_features(ka) == ('vect', [1, 2], ['bills'])
+    for i in range(3):
+        cache.put_features('k%d' % i, 'vect', [i], ['fuel'])
+    assert cache.get_features(ka) is None  # only the two newest sets are kept
+    assert TrainCache(None).get_features('k2') is None
@@ -0,0 +1,69 @@
+import threading
+
+import pytest
+
+from finsort import inference
+from finsort.predictor import Predictor
+
+TEXTS = ['STARBUCKS INDIA *STAR 09', 'tomato 2kg', 'AMZN MKTP AY12B3 *PRIME',
+         'REFUND AMAZON ORDER#77882', 'PAYTM BILLPAY EB 093', 'unknown merchant xyz']
+
+
+def test_predictor_matches_module_api_and_is_immutable():
+    """Test that a Predictor gives the module-level results and cannot be modified."""
+    p = Predictor()
+    assert p.snapshot is inference._load() and p.refreshed() is p
+    assert [p.predict(t) for t in TEXTS] == inference.predict_categories(TEXTS)
+    assert p.predict_many(TEXTS, chunk_size=4) == inference.predict_categories(TEXTS)
+    assert [r['tag'] for r in p.predict_batch(TEXTS)] == [r['tag'] for r in p.predict_many(TEXTS)]
+    with pytest.raises(AttributeError):
+        p._snap = None
+
+
+def test_predictor_shared_across_threads_survives_reloads():
+    """Test that threads sharing one Predictor get consistent results while the module reloads."""
+    p = Predictor()
+    expected = [r['tag'] for r in p.predict_many(TEXTS * 20)]
+    errors, stop = [], threading.Event()
+
+    def reload_loop():
+        while not stop.is_set():
+            inference._refresh(force=True)
+
+    def worker():
+        try:
+            for _ in range(3):
+                assert [r['tag'] for r in p.predict_many(TEXTS * 20)] == expected
+                batches = p.map_batches(TEXTS * 20, threads=2, chunk_size=25)
+                assert [r['tag'] for b in batches for r in b] == expected
+        except Exception as e:  # surfaced in the main thread below
+            errors.append(e)
+
+    reloader = threading.Thread(target=reload_loop)
+    reloader.start()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stop.set()
+    reloader.join()
+    assert errors == []
+    assert p.refreshed() is not p  # the module moved on; p kept its snapshot
+
+
+def test_map_batches_forwards_merchant_codes_and_top_k():
+    """Test that map_batches slices merchant codes with the texts and passes top_k to every slice."""
+    from finsort.structured import code_map
+
+    snap = inference._load()
+    cfg = dict(snap.config, merchant_code_map={'FUEL-HP': 'fuel'})
+    p = Predictor(snap._replace(config=cfg, codes=code_map(cfg)))
+    texts = TEXTS * 3
+    codes = [None, 'FUEL-HP', 'unmapped'] * 6
+    expected = p.predict_batch(texts, codes, top_k=2).to_dicts()
+    batches = p.map_batches(texts, threads=2, chunk_size=4, merchant_codes=codes, top_k=2)
+    got = [r for b in batches for r in b]
+    assert got == expected
+    assert [r.get('by_code', False) for r in got] == [c == 'FUEL-HP' for c in codes]
+    assert all('decision' in r and 1 <= len(r['top_k']) <= 2 for r in got)
@@ -0,0 +1,69 @@
+import os
+import stat
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from finsort import registry
+
+TEXTS = ['hpcl fuel', 'indianoil petrol', 'netflix', 'spotify music', 'bigbasket', 'dmart veg']
+TAGS = ['fuel', 'fuel', 'entertainment', 'entertainment', 'grocery', 'grocery']
+
+
+def _fit(C=1.0):
+    vect = TfidfVectorizer(analyzer='char_wb', ngram_range=(3, 5))
+    return LogisticRegression(C=C).fit(vect.fit_transform(TEXTS), TAGS), vect
+
+
+def test_publish_activate_rollback_and_prune(tmp_path):
+    """Test that bundles are immutable and CURRENT switches atomically between versions."""
+    root = str(tmp_path / 'models')
+    m1 = registry.publish(*_fit(1.0), config={'category_map': {'fuel': 'Fuel'}}, root=root, meta={'rows': 6})
+    m2 = registry.publish(*_fit(5.0), root=root)
+    assert (m1['version'], m2['version']) == ('v0001', 'v0002')
+    assert m1['exports'] == ['npy', 'linear'] and m1['meta'] == {'rows': 6}
+    assert registry.read_pointer(root)['previous'] == 'v0001'
+    assert registry.verify('v0002', root) == []
+    mode = os.stat(os.path.join(registry.bundle_path('v0001', root), registry.MODEL_FILE)).st_mode
+    assert not mode & stat.S_IWUSR
+
+    assert registry.rollback(root)['version'] == 'v0001'
+    model, _, config, manifest = registry.load_bundle(root=root, check=True)
+    assert manifest['version'] == 'v0001' and config['category_map']['fuel'] == 'Fuel'
+    assert registry.rollback(root)['version'] == 'v0002'  # and back again
+
+    registry.publish(*_fit(2.0), root=root)
+    assert registry.prune(keep=1, root=root) == ['v0001']
+    assert registry.list_versions(root) == ['v0002', 'v0003']
+    with pytest.raises(ValueError):
+        registry.activate('v0001', root)
+
+
+def test_inference_follows_current_and_rolls_back_without_reload(tmp_path, monkeypatch):
+    """Test that inference swaps whole bundles and keeps the previous one resident for rollback."""
+    from finsort import inference
+    from finsort.cache import LRUCache
+
+    root = str(tmp_path / 'models')
+    registry.publish(*_fit(1.0), root=root)
+    monkeypatch.setattr(inference, '_REGISTRY_DIR', root)
+    monkeypatch.setattr(inference, '_CONFIG_PATH', str(tmp_path / 'missing_config.json'))
+    monkeypatch.setattr(inference, 'BACKEND', 'pickle')
+    monkeypatch.setattr(inference, 'RELOAD_INTERVAL', 0)
+    monkeypatch.setattr(inference, '_SNAPSHOT', inference.Snapshot(None, None, {}, None, 0))
+    monkeypatch.setattr(inference, '_PREVIOUS', None)
+    monkeypatch.setattr(inference, '_CACHE', LRUCache(maxsize=100))
+
+    first = inference._load()
+    assert first.bundle == 'v0001' and inference.model_version() == 'v0001'
+    registry.publish(*_fit(5.0), root=root)
+    second = inference._load()
+    assert second.bundle == 'v0002' and second.model is not first.model
+
+    loads = []
+    monkeypatch.setattr(inference, '_load_pair', lambda *a: loads.append(a))
+    back = inference.rollback()
+    assert back.bundle == 'v0001' and back.model is first.model  # resident, nothing loaded
+    assert loads == [] and registry.current_version(root) == 'v0001'
+    assert inference.predict_category('hpcl fuel 99')['tag'] == 'fuel'
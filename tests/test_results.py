@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from finsort import inference
+from finsort.results import BY_RULE, LOW_CONFIDENCE, predict_batch
+
+TEXTS = ['STARBUCKS INDIA *STAR 09', 'tomato 2kg', None, 'STARBUCKS INDIA *STAR 09',
+         'unknown merchant xyz', 'AMZN MKTP AY12B3 *PRIME', 'tomato 2kg']
+
+
+def test_batch_result_rows_match_predict_categories():
+    """Test that each row view equals the predict_category dict (confidence to float32 precision)."""
+    inference.cache_clear()
+    res = predict_batch(TEXTS)
+    expected = inference.predict_categories(TEXTS)
+    assert len(res) == len(TEXTS)
+    for got, exp in zip(res, expected):
+        got, exp = dict(got), dict(exp)
+        assert abs(got.pop('confidence') - exp.pop('confidence')) < 1e-6
+        assert got == exp
+    assert res[-1] == res[1] and res[2]['raw'] == ''
+    assert res.flag('by_rule')[0] and res.flags[0] & BY_RULE
+    assert list(res.flag('low_confidence')) == [bool(f & LOW_CONFIDENCE) for f in res.flags]
+
+
+def test_batch_result_is_compact_and_converts_to_pandas_and_csv(tmp_path):
+    """Test the column dtypes, the deduplicated tables and the DataFrame/CSV output."""
+    res = predict_batch(pd.Series(TEXTS * 100))
+    assert res.confidence.dtype == np.float32 and res.flags.dtype == np.uint8
+    assert res.tag_codes.dtype == np.int8 and len(res.raws) == 5
+    assert len(res.tags) == len(set(r['tag'] for r in res))
+
+    df = res.to_pandas(prefix='pred_')
+    assert list(df.columns)[:4] == ['pred_raw', 'pred_cleaned', 'pred_tag', 'pred_category']
+    assert isinstance(df['pred_tag'].dtype, pd.CategoricalDtype)
+    assert df['pred_tag'].tolist() == [r['tag'] for r in res]
+    assert df['pred_by_rule'].tolist() == [r.get('by_rule', False) for r in res]
+
+    path = tmp_path / 'out.csv'
+    res.to_csv(path)
+    back = pd.read_csv(path, keep_default_na=False)
+    assert len(back) == len(res) and back['category'].tolist() == df['pred_category'].tolist()
+    np.testing.assert_allclose(back['confidence'], res.confidence, rtol=1e-6)
+
+
+def test_empty_batch_with_top_k():
+    """Test that an empty batch with top_k gives an empty result with k suggestion columns."""
+    res = predict_batch([], top_k=3)
+    assert len(res) == 0 and res.to_dicts() == []
+    assert res.top_tag_codes.shape == (0, 3) and res.top_confidence.shape == (0, 3)
+    assert len(res.to_pandas()) == 0 and 'top3_tag' in res.to_pandas().columns
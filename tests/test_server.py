@@ -0,0 +1,56 @@
+import json
+import asyncio
+from finsort.server import InferenceServer, LatencyStats
+from finsort.inference import predict_category
+
+
+async def _request(port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    writer.write('{} {} HTTP/1.1\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'.format(
+        method, path, len(body)).encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, data = raw.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(data)
+
+
+def test_server_micro_batches_concurrent_requests():
+    """Test that concurrent single and bulk requests are coalesced and answered correctly."""
+    texts = ['SQ *COFFEE-SPOT 123', 'AMAZON MKTPLACE PMTS', 'tomato 2kg', 'HPCL POS 2456 BLR#']
+
+    async def scenario():
+        server = await InferenceServer(port=0, max_batch=64, max_wait_ms=50).start()
+        try:
+            singles = await asyncio.gather(*[_request(server.port, 'POST', '/predict', {'text': t}) for t in texts])
+            bulk = await _request(server.port, 'POST', '/predict/batch', {'texts': texts})
+            bad = await _request(server.port, 'POST', '/predict', {'txt': 1})
+            stats = await _request(server.port, 'GET', '/stats')
+        finally:
+            await server.stop()
+        return singles, bulk, bad, stats
+
+    singles, bulk, bad, stats = asyncio.run(scenario())
+
+    for text, (status, result) in zip(texts, singles):
+        assert status == 200
+        assert result['tag'] == predict_category(text)['tag']
+    assert [r['tag'] for r in bulk[1]['results']] == [s[1]['tag'] for s in singles]
+    assert bad[0] == 400
+    # four concurrent singles within a 50ms window need fewer than four model calls
+    assert stats[1]['requests'] == 5
+    assert stats[1]['batches'] < 5
+
+
+def test_latency_stats_percentiles_and_histogram():
+    """Test percentile and batch-size bucket bookkeeping."""
+    s = LatencyStats()
+    for ms in range(1, 101):
+        s.record_request(float(ms), 1)
+    for size in (1, 3, 8, 9):
+        s.record_batch(size)
+    snap = s.snapshot()
+    assert snap['latency_ms']['p50'] in (50.0, 51.0)
+    assert snap['latency_ms']['p99'] == 99.0
+    assert snap['batch_size_hist'] == {'1': 1, '4': 1, '8': 1, '16': 1}
@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from finsort.structured import formats_for_shape, learn_code_map, parse_amounts, parse_columns, parse_dates
+
+HARD20 = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'finsort_test_hard20.csv')
+
+
+def test_parse_amounts_dates_and_learn_codes():
+    """Test bulk amount/date normalization on the mixed-format feed and learning a code map."""
+    df = pd.read_csv(HARD20, dtype=str, keep_default_na=False)
+    out = parse_columns(df)
+    amounts = dict(zip(df['amount'], out['amount_value']))
+    assert amounts['₹1,299.00'] == 1299.0 and amounts['32.00INR'] == 32.0 and amounts['-250.50'] == -250.5
+    assert out['amount_value'].notna().all() and out['date_value'].notna().all()
+    dates = dict(zip(df['date'], out['date_value'].dt.strftime('%Y-%m-%d')))
+    assert dates['2024/11/05'] == dates['05-Nov'] == dates['Nov5'] == dates['05.11.24'] == '2024-11-05'
+    assert dates['08-11-24'] == '2024-11-08' and dates['11/2024'] == '2024-11-01'
+
+    assert parse_amounts(['(12.5)', '40-', None, 'n/a']).tolist()[:2] == [-12.5, -40.0]
+    assert parse_dates(['03/04/2024'], dayfirst=False)[0] == pd.Timestamp('2024-03-04')
+    assert parse_dates(['05-Nov'], default_year=2023)[0] == pd.Timestamp('2023-11-05')
+    assert np.isnat(parse_dates(['garbage', None]).to_numpy()).all()
+    assert formats_for_shape('99-aaa-99')[0] == '%d-%b-%y'
+
+    codes = learn_code_map(['AMZ-UK', 'amz-uk ', 'OLA-TRP', 'MIX', 'MIX'], ['ecommerce', 'ecommerce', 'transport',
+                                                                          'fuel', 'dining'])
+    assert codes == {'AMZ-UK': 'ecommerce', 'OLA-TRP': 'transport'}
+
+
+def test_merchant_codes_answer_before_rules_and_skip_cleaning(tmp_path, monkeypatch):
+    """Test that a mapped merchant code decides the tag in the single, batch, frame and columnar paths."""
+    from finsort import inference
+    from finsort.frame import categorize_frame
+    from finsort.results import predict_batch
+
+    config = dict(inference._read_config())
+    config['merchant_code_map'] = {'amz-uk': 'ecommerce', 'FUEL-HP': 'fuel'}
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps(config))
+    monkeypatch.setattr(inference, '_CONFIG_PATH', str(path))
+    inference._refresh(force=True)
+    try:
+        cleaned = []
+        real_clean = inference.clean_transaction
+        monkeypatch.setattr(inference, 'clean_transaction', lambda t: cleaned.append(t) or real_clean(t))
+        r = inference.predict_category('STARBUCKS INDIA *STAR 09', merchant_code=' AMZ-UK')
+        assert r['tag'] == 'ecommerce' and r['by_code'] is True and r['cleaned'] == ''
+        assert r['category'] == 'Shopping' and r['confidence'] == 1.0 and cleaned == []
+
+        texts = ['STARBUCKS INDIA *STAR 09', 'HPCL POS 2456 BLR#', 'tomato 2kg', 'STARBUCKS INDIA *STAR 09']
+        codes = ['AMZ-UK', 'FUEL-HP', 'UNKNOWN', None]
+        batch = inference.predict_categories(texts, merchant_codes=codes)
+        assert [b['tag'] for b in batch] == ['ecommerce', 'fuel', 'grocery', 'coffee_shop']
+        assert [b.get('by_code', False) for b in batch] == [True, True, False, False]
+        assert cleaned == ['tomato 2kg', 'STARBUCKS INDIA *STAR 09']
+
+        frame = categorize_frame(pd.DataFrame({'transaction': texts, 'merchant_code': codes}),
+                                 code_column='merchant_code')
+        assert frame['tag'].tolist() == [b['tag'] for b in batch]
+        assert frame['by_code'].tolist() == [True, True, False, False]
+        res = predict_batch(texts, merchant_codes=codes)
+        assert [dict(r, confidence=round(r['confidence'], 5)) for r in res] == \
+            [dict(b, confidence=round(b['confidence'], 5)) for b in batch]
+    finally:
+        monkeypatch.undo()
+        inference._refresh(force=True)
@@ -2,61 +2,98 @@
 """
 Train script for FinSort.
 - Reads training CSV from TRAIN_PATH (env var or data/finsort_train.csv)
-- Expects CSV with 'transaction' and 'category' columns (or adapt)
+- Expects CSV with 'transaction' and 'tag' columns; rows that only have a
+  'category' (merged feedback) are mapped back to their tag
 - Trains a TF-IDF vectorizer and a calibrated logistic regression classifier
-- Saves vectorizer.pkl and model.pkl into finsort/
+  (FEATURES=hashed: hashed char n-grams + IDF array, no vocabulary dict)
+- Publishes model, vectorizer, config and exports as a new version in the
+  model registry (finsort/models, see finsort/registry.py) and makes it current
+- Rebuilds the exact-match fingerprint index from the training CSV and the
+  feedback store (finsort/fingerprints, see finsort/fingerprint.py)
+- Cleans in parallel and calibrates folds in parallel (N_JOBS, default all cores)
+- Caches cleaned chunks and the fitted feature matrix in TRAIN_CACHE
+  (default .cache/train, "off" disables); see finsort/pipeline.py
+- Prints wall time per stage
 """
 
 import os
-import pandas as pd
-import joblib
-import numpy as np
+import json
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.calibration import CalibratedClassifierCV
-from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
+from scipy.sparse import vstack
+
+from finsort.model import WrappedModel
+from finsort.features import HashedTfidfVectorizer, DEFAULT_N_FEATURES
+from finsort.pipeline import StageTimer, TrainCache, clean_corpus, file_digest, load_training_data, DEFAULT_CACHE_DIR
+from finsort import registry
+from finsort.fingerprint import collect_labels, build_index
+from finsort.feedback import DEFAULT_STORE_DIR
 
 BASE = os.path.dirname(__file__)
 TRAIN_PATH = os.environ.get("TRAIN_PATH", os.path.join(BASE, "data", "finsort_train.csv"))
-VECT_OUT = os.path.join(BASE, "finsort", "vectorizer.pkl")
-MODEL_OUT = os.path.join(BASE, "finsort", "model.pkl")
-
-def load_data(path):
-    df = pd.read_csv(path)
-    # Try to find right column names
-    if "transaction" in df.columns:
-        X = df["transaction"].astype(str).tolist()
-    elif "raw" in df.columns:
-        X = df["raw"].astype(str).tolist()
-    else:
-        # fallback: first column
-        X = df.iloc[:,0].astype(str).tolist()
+CONFIG_PATH = os.path.join(BASE, "finsort", "config.json")
+REGISTRY_DIR = os.environ.get("MODEL_REGISTRY", registry.DEFAULT_REGISTRY_DIR)
+# feature pipeline: "tfidf" (vocabulary) or "hashed" (stateless, streamed in chunks)
+FEATURES = os.environ.get("FEATURES", "tfidf")
+HASH_FEATURES = int(os.environ.get("HASH_FEATURES", DEFAULT_N_FEATURES))
+CHUNK_SIZE = 10000
+N_JOBS = int(os.environ.get("N_JOBS", -1))
+TRAIN_CACHE = os.environ.get("TRAIN_CACHE", DEFAULT_CACHE_DIR)
 
-    if "category" in df.columns:
-        y = df["category"].astype(str).tolist()
-    elif "tag" in df.columns:
-        y = df["tag"].astype(str).tolist()
-    else:
-        # fallback: last column
-        y = df.iloc[:,-1].astype(str).tolist()
-    return X, y
+def read_config():
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def make_vectorizer():
+    # vectorizer (word + char ngrams works well for noisy text)
+    if FEATURES == "hashed":
+        return HashedTfidfVectorizer(analyzer='char_wb', ngram_range=(3,5), n_features=HASH_FEATURES)
+    if FEATURES == "tfidf":
+        return TfidfVectorizer(analyzer='char_wb', ngram_range=(3,5), max_features=30000)
+    raise SystemExit("Unknown FEATURES={!r}; use 'tfidf' or 'hashed'".format(FEATURES))
+
+def vectorize(vect, X_texts):
+    if FEATURES == "hashed":
+        vect.fit(X_texts, chunk_size=CHUNK_SIZE)
+        return vstack([vect.transform(X_texts[i:i + CHUNK_SIZE]) for i in range(0, len(X_texts), CHUNK_SIZE)]).tocsr()
+    return vect.fit_transform(X_texts)
 
 def main():
+    timer = StageTimer()
+    cache = TrainCache(None if TRAIN_CACHE.lower() in ("", "0", "off", "none") else TRAIN_CACHE)
     print("Loading training data from:", TRAIN_PATH)
-    X_texts, y = load_data(TRAIN_PATH)
-    print("Rows:", len(X_texts))
 
-    # preprocessing: use cleaned texts via finsort.cleaner if available
-    try:
-        from finsort.cleaner import clean_transaction
-        X_texts = [clean_transaction(t) for t in X_texts]
-    except Exception as e:
-        print("Could not import clean_transaction:", e)
+    config = read_config()
+    category_map = config.get("category_map", {})
+    vect = make_vectorizer()
+    with timer.stage("hash"):
+        csv_digest = file_digest(TRAIN_PATH)
+        settings = dict(vect.get_params(), features=FEATURES, category_map=sorted(category_map.items()))
+        features_key = cache.features_key(csv_digest, settings)
+        cached = cache.get_features(features_key)
 
-    # vectorizer (word + char ngrams works well for noisy text)
-    vect = TfidfVectorizer(analyzer='char_wb', ngram_range=(3,5), max_features=30000)
-    X = vect.fit_transform(X_texts)
+    if cached is not None:
+        vect, X, y = cached
+        print("Rows:", len(y), "(features from cache)")
+    else:
+        with timer.stage("load"):
+            X_texts, y = load_training_data(TRAIN_PATH, category_map)
+        print("Rows:", len(X_texts))
+
+        # preprocessing: cleaned texts via finsort.cleaner, chunks reused from the cache
+        with timer.stage("clean"):
+            X_texts, hits = clean_corpus(X_texts, n_jobs=N_JOBS, chunk_size=CHUNK_SIZE, cache=cache)
+        if hits:
+            print("Cleaned chunks from cache:", hits)
+
+        with timer.stage("vectorize"):
+            X = vectorize(vect, X_texts)
+            cache.put_features(features_key, vect, X, y)
     print("Vectorized shape:", X.shape)
 
     # label encode
@@ -65,34 +102,39 @@ def main():
 
     # base classifier
     base = LogisticRegression(max_iter=1000, class_weight='balanced')
-    # calibrate probabilities
-    clf = CalibratedClassifierCV(base_estimator=base, method="sigmoid", cv=5)
+    # calibrate probabilities, one fold per core
+    try:
+        clf = CalibratedClassifierCV(estimator=base, method="sigmoid", cv=5, n_jobs=N_JOBS)
+    except TypeError:
+        # scikit-learn < 1.2
+        clf = CalibratedClassifierCV(base_estimator=base, method="sigmoid", cv=5, n_jobs=N_JOBS)
     print("Training classifier (this may take a few minutes)...")
-    clf.fit(X, y_enc)
-
-    # Create a small wrapper to restore original labels on predict
-    class WrappedModel:
-        def __init__(self, model, label_encoder):
-            self.model = model
-            self.le = label_encoder
-            # sklearn CalibratedClassifierCV keeps classes_ as encoded integers
-            self.classes_ = self.le.inverse_transform(np.arange(len(self.le.classes_)))
+    with timer.stage("calibrate"):
+        clf.fit(X, y_enc)
 
-        def predict_proba(self, X):
-            return self.model.predict_proba(X)
+    # wrapper restores original labels on predict (module-level so it can be unpickled)
+    wrapped = WrappedModel(clf, le)
 
-        def predict(self, X):
-            preds = self.model.predict(X)
-            return self.le.inverse_transform(preds)
+    # one immutable bundle: pickles, config and the flat NumPy exports (FINSORT_BACKEND=npy/linear);
+    # running predictors switch to it on their next reload check
+    with timer.stage("publish"):
+        meta = {
+            "train_path": os.path.abspath(TRAIN_PATH),
+            "train_sha256": csv_digest,
+            "rows": len(y),
+            "features": FEATURES,
+            "stage_seconds": {k: round(v, 3) for k, v in timer.seconds.items()},
+        }
+        manifest = registry.publish(wrapped, vect, config, root=REGISTRY_DIR, meta=meta)
+    print("Published model {} -> {}".format(manifest["version"], registry.bundle_path(manifest["version"], REGISTRY_DIR)))
 
-    wrapped = WrappedModel(clf, le)
+    with timer.stage("index"):
+        index_meta = build_index(collect_labels([TRAIN_PATH], DEFAULT_STORE_DIR, category_map), sources=[TRAIN_PATH])
+    print("Fingerprint index entries:", index_meta["entries"])
 
-    # Save vectorizer and model
-    os.makedirs(os.path.join(BASE, "finsort"), exist_ok=True)
-    joblib.dump(vect, VECT_OUT)
-    joblib.dump(wrapped, MODEL_OUT)
-    print("Saved vectorizer ->", VECT_OUT)
-    print("Saved model ->", MODEL_OUT)
+    print("Stage timings:")
+    print(timer.report())
+    return timer.seconds
 
 if __name__ == "__main__":
     main()